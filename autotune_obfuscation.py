@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+混淆选项自动调优
+
+在一部分样本文件上搜索controlFlowFlatteningThreshold、deadCodeInjectionThreshold、stringArrayThreshold
+和splitStringsChunkLength的组合，测量输出体积（以及可选的运行耗时），在用户给定的预算内选出混淆强度最高的一组，
+并以_load_config可读取的格式写入INI配置文件的新section。
+
+示例:
+    python autotune_obfuscation.py src/ --max-expansion 3 --bench-entry bench/entry.js --max-slowdown 2 \\
+        --ini obfuscator_config.ini --section-name AUTOTUNED
+"""
+
+import sys
+import math
+import random
+import argparse
+import itertools
+import configparser
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from js_obfuscator import JSObfuscator
+from benchmark_obfuscation import measure_code
+
+
+# 默认搜索空间，阈值为0表示关闭对应的选项，块长度为0表示关闭splitStrings
+DEFAULT_GRID = {
+    "controlFlowFlatteningThreshold": [0, 0.25, 0.5, 0.75, 1.0],
+    "deadCodeInjectionThreshold": [0, 0.2, 0.4],
+    "stringArrayThreshold": [0.5, 0.75, 1.0],
+    "splitStringsChunkLength": [0, 10, 5],
+}
+
+
+def candidate_strength(candidate):
+    """
+    混淆强度评分：各阈值之和，分割字符串的块越短强度越高
+
+    用于在满足预算的候选中选出最强的一组
+    """
+    strength = (candidate["controlFlowFlatteningThreshold"] + candidate["deadCodeInjectionThreshold"]
+                + candidate["stringArrayThreshold"])
+    if candidate["splitStringsChunkLength"]:
+        strength += 5 / candidate["splitStringsChunkLength"]
+    return strength
+
+
+def candidate_options(base_options, candidate):
+    """把候选参数转换为完整的混淆选项"""
+    options = dict(base_options)
+    options.update({
+        "controlFlowFlattening": candidate["controlFlowFlatteningThreshold"] > 0,
+        "controlFlowFlatteningThreshold": candidate["controlFlowFlatteningThreshold"] or base_options["controlFlowFlatteningThreshold"],
+        "deadCodeInjection": candidate["deadCodeInjectionThreshold"] > 0,
+        "deadCodeInjectionThreshold": candidate["deadCodeInjectionThreshold"] or base_options["deadCodeInjectionThreshold"],
+        "stringArray": candidate["stringArrayThreshold"] > 0,
+        "stringArrayThreshold": candidate["stringArrayThreshold"] or base_options["stringArrayThreshold"],
+        "splitStrings": candidate["splitStringsChunkLength"] > 0,
+        "splitStringsChunkLength": candidate["splitStringsChunkLength"] or base_options["splitStringsChunkLength"],
+    })
+    return options
+
+
+class Autotuner:
+    def __init__(self, obfuscator: JSObfuscator, sample_files: List[Path], max_expansion: Optional[float] = None,
+                 bench_entry: Optional[str] = None, workload: str = "workload", iterations: int = 500,
+                 max_slowdown: Optional[float] = None, workers: int = 4):
+        """
+        混淆选项自动调优器
+
+        Args:
+            obfuscator: 提供基础选项并执行混淆的JSObfuscator
+            sample_files: 用于测量输出体积的样本文件
+            max_expansion: 样本总输出/总输入的上限
+            bench_entry: 测量运行耗时的入口文件（可选）
+            workload: 入口文件中的全局workload函数名
+            iterations: 每次测量调用workload的次数
+            max_slowdown: 相对原始代码的运行减速比上限
+            workers: 并行评估的候选数
+        """
+        self.obfuscator = obfuscator
+        self.sample_files = sample_files
+        self.max_expansion = max_expansion
+        self.bench_entry = bench_entry
+        self.workload = workload
+        self.iterations = iterations
+        self.max_slowdown = max_slowdown
+        self.workers = workers
+        self.sources = {path: path.read_text(encoding='utf-8') for path in sample_files}
+        self.baseline_run_ms = None
+        if bench_entry:
+            self.bench_code = Path(bench_entry).read_text(encoding='utf-8')
+            self.baseline_run_ms = measure_code(self.bench_code, workload, iterations, repeat=3)["run_ms"]
+            print(f"⏱️  原始代码运行耗时: {self.baseline_run_ms:.2f} ms")
+
+    def evaluate(self, candidate, files) -> Dict[str, Any]:
+        """
+        在指定样本文件上评估一个候选
+
+        直接使用候选的选项混淆，不经过按文件大小分级和路径规则，避免大样本上被搜索的阈值被覆盖
+        """
+        base_options = candidate_options(self.obfuscator.options, candidate)
+        input_bytes = output_bytes = 0
+        for path in files:
+            js_code = self.sources[path]
+            obfuscated = self.obfuscator.obfuscate_js(js_code, str(path), base_options)
+            input_bytes += len(js_code.encode('utf-8'))
+            output_bytes += len(obfuscated.encode('utf-8'))
+
+        result = {
+            "candidate": candidate,
+            "strength": candidate_strength(candidate),
+            "expansion": output_bytes / input_bytes if input_bytes else 1.0,
+            "slowdown": None,
+        }
+        if self.bench_entry:
+            obfuscated = self.obfuscator.obfuscate_js(self.bench_code, self.bench_entry, base_options)
+            run_ms = measure_code(obfuscated, self.workload, self.iterations, repeat=3)["run_ms"]
+            result["slowdown"] = run_ms / self.baseline_run_ms if self.baseline_run_ms else None
+        result["feasible"] = self.is_feasible(result)
+        return result
+
+    def is_feasible(self, result):
+        """是否满足体积和运行耗时预算"""
+        if self.max_expansion is not None and result["expansion"] > self.max_expansion:
+            return False
+        if self.max_slowdown is not None and result["slowdown"] is not None and result["slowdown"] > self.max_slowdown:
+            return False
+        return True
+
+    def evaluate_all(self, candidates, files):
+        """并行评估一组候选"""
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(lambda candidate: self.evaluate(candidate, files), candidates))
+
+    def grid_search(self, candidates):
+        """在全部样本上评估所有候选"""
+        results = self.evaluate_all(candidates, self.sample_files)
+        for result in results:
+            self.print_result(result)
+        return self.best(results)
+
+    def successive_halving(self, candidates):
+        """
+        逐轮减半：先在少量样本上评估全部候选，只保留满足预算且强度最高的一半，
+        下一轮样本数加倍，直到只剩一个候选或用完全部样本
+
+        保留的候选在更多样本上全部超出预算时，改为在全部样本上重新评估之前各轮满足预算、但被淘汰的候选
+        """
+        rounds = max(1, math.ceil(math.log2(max(len(candidates), 1))))
+        sample_count = max(1, len(self.sample_files) >> (rounds - 1))
+        round_number = 1
+        discarded = []
+        while True:
+            files = self.sample_files[:sample_count]
+            print(f"\n🔍 第{round_number}轮: {len(candidates)} 个候选，{len(files)} 个样本文件")
+            results = self.evaluate_all(candidates, files)
+            for result in results:
+                self.print_result(result)
+
+            feasible = sorted((result for result in results if result["feasible"]), key=lambda r: r["strength"], reverse=True)
+            if not feasible:
+                if not discarded:
+                    return None
+                print(f"\n🔁 保留的候选都超出预算，在全部样本上重新评估之前淘汰的 {len(discarded)} 个候选")
+                results = self.evaluate_all(discarded, self.sample_files)
+                for result in results:
+                    self.print_result(result)
+                return self.best(results)
+            if len(feasible) == 1 or sample_count >= len(self.sample_files):
+                return feasible[0]
+
+            keep = math.ceil(len(feasible) / 2)
+            discarded += [result["candidate"] for result in feasible[keep:]]
+            candidates = [result["candidate"] for result in feasible[:keep]]
+            sample_count = min(sample_count * 2, len(self.sample_files))
+            round_number += 1
+
+    def best(self, results):
+        """满足预算的候选中强度最高的一个"""
+        feasible = [result for result in results if result["feasible"]]
+        return max(feasible, key=lambda r: r["strength"]) if feasible else None
+
+    def print_result(self, result):
+        candidate = result["candidate"]
+        slowdown = f"{result['slowdown']:.2f}x" if result["slowdown"] is not None else "-"
+        mark = "✅" if result["feasible"] else "❌"
+        print(f"  {mark} cff={candidate['controlFlowFlatteningThreshold']:<5} dci={candidate['deadCodeInjectionThreshold']:<5} "
+              f"sa={candidate['stringArrayThreshold']:<5} chunk={candidate['splitStringsChunkLength']:<3} "
+              f"强度={result['strength']:.2f} 膨胀率={result['expansion']:.2f}x 减速比={slowdown}")
+
+
+def build_candidates(grid):
+    """由搜索空间生成候选列表"""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def format_ini_value(value):
+    """把选项值格式化为_load_config可读取的INI值"""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    return str(value)
+
+
+def write_ini_section(config_file, section_name, options, comment_lines=()):
+    """
+    把选项作为新的section追加到INI配置文件（保留文件中已有的内容和注释）
+
+    Raises:
+        ValueError: section已存在
+    """
+    config_path = Path(config_file)
+    if config_path.exists():
+        config_parser = configparser.ConfigParser()
+        config_parser.read(config_path, encoding='utf-8')
+        if section_name in config_parser:
+            raise ValueError(f"section [{section_name}] 已存在于 {config_file}")
+
+    lines = [f"[{section_name}]"]
+    lines += [f"# {line}" for line in comment_lines]
+    lines += [f"{key} = {format_ini_value(value)}" for key, value in options.items()]
+
+    prefix = ""
+    if config_path.exists() and config_path.stat().st_size:
+        prefix = "\n" if config_path.read_text(encoding='utf-8').endswith("\n") else "\n\n"
+    with open(config_path, 'a', encoding='utf-8') as f:
+        f.write(prefix + "\n".join(lines) + "\n")
+
+
+def collect_sample_files(inputs, sample_size, obfuscator, seed=0):
+    """从输入文件或目录中收集需要混淆的JS文件并抽样"""
+    files = []
+    for input_path in inputs:
+        input_path = Path(input_path)
+        if input_path.is_file():
+            files.append(input_path)
+            continue
+        for js_file in sorted(input_path.rglob('*.js')):
+            category, _ = obfuscator.classify_js_file(js_file, js_file.relative_to(input_path))
+            if category == "obfuscate":
+                files.append(js_file)
+    random.Random(seed).shuffle(files)
+    return files[:sample_size] if sample_size else files
+
+
+def parse_grid_values(text):
+    return [float(value) if '.' in value else int(value) for value in text.split(',') if value.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='混淆选项自动调优')
+    parser.add_argument('inputs', nargs='+', help='样本JS文件或目录')
+    parser.add_argument('--ini', default='obfuscator_config.ini', help='基础配置及结果写入的INI文件 (默认: obfuscator_config.ini)')
+    parser.add_argument('--section', default='DEFAULT', help='作为基础配置的section (默认: DEFAULT)')
+    parser.add_argument('--section-name', default='AUTOTUNED', help='写入结果的新section名称 (默认: AUTOTUNED)')
+    parser.add_argument('--output', help='结果写入的INI文件 (默认与--ini相同)')
+    parser.add_argument('--sample', type=int, default=20, help='抽样的文件数，0表示全部 (默认: 20)')
+    parser.add_argument('--max-expansion', type=float, help='样本总输出/总输入的上限，如 3.0')
+    parser.add_argument('--bench-entry', help='测量运行耗时的入口文件，需要定义全局workload函数')
+    parser.add_argument('-w', '--workload', default='workload', help='workload函数名 (默认: workload)')
+    parser.add_argument('-n', '--iterations', type=int, default=500, help='每次测量调用workload的次数 (默认: 500)')
+    parser.add_argument('--max-slowdown', type=float, help='相对原始代码的运行减速比上限，如 2.0')
+    parser.add_argument('--method', choices=['halving', 'grid'], default='halving', help='搜索方法 (默认: halving)')
+    parser.add_argument('-j', '--workers', type=int, default=4, help='并行评估的候选数 (默认: 4)')
+    for key, flag in [("controlFlowFlatteningThreshold", "--cff"), ("deadCodeInjectionThreshold", "--dci"),
+                      ("stringArrayThreshold", "--sa"), ("splitStringsChunkLength", "--chunk")]:
+        parser.add_argument(flag, dest=key, help=f'{key}的候选值，逗号分隔 (默认: {",".join(map(str, DEFAULT_GRID[key]))})')
+
+    args = parser.parse_args()
+
+    if args.max_expansion is None and args.max_slowdown is None:
+        print("错误: 至少需要指定 --max-expansion 或 --max-slowdown")
+        return 1
+    if args.max_slowdown is not None and not args.bench_entry:
+        print("错误: --max-slowdown 需要同时指定 --bench-entry")
+        return 1
+
+    grid = {key: parse_grid_values(getattr(args, key)) if getattr(args, key) else values
+            for key, values in DEFAULT_GRID.items()}
+
+    try:
+        # 固定seed，候选之间的差异只来自选项本身
+        obfuscator = JSObfuscator(config_file=args.ini, config_section=args.section,
+                                  settings={"reproducible": True, "seedSalt": "autotune"})
+        sample_files = collect_sample_files(args.inputs, args.sample, obfuscator)
+        if not sample_files:
+            print("错误: 没有找到可用的样本JS文件")
+            return 1
+
+        tuner = Autotuner(obfuscator, sample_files, args.max_expansion, args.bench_entry, args.workload,
+                          args.iterations, args.max_slowdown, args.workers)
+        candidates = sorted(build_candidates(grid), key=candidate_strength, reverse=True)
+        print(f"🔍 搜索 {len(candidates)} 个候选，{len(sample_files)} 个样本文件")
+
+        if args.method == "grid":
+            best = tuner.grid_search(candidates)
+        else:
+            best = tuner.successive_halving(candidates)
+    except Exception as e:
+        print(f"错误: {str(e)}")
+        return 1
+
+    if not best:
+        print("❌ 没有满足预算的候选，请放宽预算或调整搜索空间")
+        return 1
+
+    print("\n🏆 最佳候选:")
+    tuner.print_result(best)
+
+    options = candidate_options(obfuscator.options, best["candidate"])
+    comments = [f"由autotune_obfuscation.py基于[{args.section}]生成，样本 {len(sample_files)} 个文件",
+                f"膨胀率 {best['expansion']:.2f}x" + (f"，减速比 {best['slowdown']:.2f}x" if best["slowdown"] else "")]
+    output_file = args.output or args.ini
+    try:
+        write_ini_section(output_file, args.section_name, options, comments)
+    except ValueError as e:
+        print(f"错误: {str(e)}")
+        return 1
+    print(f"📝 已写入 {output_file}[{args.section_name}]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
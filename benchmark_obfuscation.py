@@ -0,0 +1,455 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+混淆后代码的运行时开销基准测试
+
+对同一个JS入口文件，分别用INI配置文件中的多个section混淆，在Node中运行原始代码和各个混淆版本，
+比较输出大小、解析/编译耗时以及workload函数的执行耗时（相对原始代码的减速比）。
+也可以用同一批文件比较各混淆后端（npx、worker、embedded）的混淆耗时，
+以及Node编译缓存对冷启动（启动Node并加载javascript-obfuscator）耗时的影响，
+混淆前去掉注释和空白对混淆耗时和输出大小的影响。
+
+示例:
+    python benchmark_obfuscation.py bench/entry.js --workload runWorkload -n 2000 \\
+        --ini obfuscator_config.ini --sections DEFAULT,BALANCED,MINIMAL
+    python benchmark_obfuscation.py --corpus src/ --backends npx,worker,embedded
+    python benchmark_obfuscation.py --startup --backends npx,worker
+    python benchmark_obfuscation.py --corpus src/ --strip --repeat 3
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List
+
+from js_obfuscator import JSObfuscator, OBFUSCATOR_BACKENDS
+from js_source import strip_source
+
+
+# 在Node中加载代码并计时：new vm.Script 为解析/编译耗时，之后调用workload函数N次
+RUNNER_SCRIPT = r"""
+const fs = require('fs');
+const vm = require('vm');
+const [codeFile, workloadName, iterationsArg] = process.argv.slice(2);
+const iterations = parseInt(iterationsArg, 10);
+const code = fs.readFileSync(codeFile, 'utf8');
+
+let start = process.hrtime.bigint();
+const script = new vm.Script(code, { filename: codeFile });
+const compileNs = process.hrtime.bigint() - start;
+
+start = process.hrtime.bigint();
+script.runInThisContext();
+const loadNs = process.hrtime.bigint() - start;
+
+const workload = globalThis[workloadName];
+if (typeof workload !== 'function') {
+  console.error(`workload函数 ${workloadName} 不存在或不是全局函数`);
+  process.exit(2);
+}
+
+// 预热，让JIT稳定下来
+const warmup = Math.max(1, Math.floor(iterations / 10));
+for (let i = 0; i < warmup; i++) workload(i);
+
+start = process.hrtime.bigint();
+for (let i = 0; i < iterations; i++) workload(i);
+const runNs = process.hrtime.bigint() - start;
+
+process.stdout.write(JSON.stringify({
+  compile_ms: Number(compileNs) / 1e6,
+  load_ms: Number(loadNs) / 1e6,
+  run_ms: Number(runNs) / 1e6,
+}));
+"""
+
+
+def run_in_node(code_file, workload, iterations, timeout=600, node_args=None):
+    """
+    在新的Node进程中运行一次测量
+
+    Args:
+        code_file: JS代码文件
+        workload: 全局workload函数名
+        iterations: 调用次数
+        timeout: 超时时间（秒）
+        node_args: 额外的node参数
+
+    Returns:
+        包含compile_ms、load_ms、run_ms的字典
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.js', delete=False, encoding='utf-8') as f:
+        f.write(RUNNER_SCRIPT)
+        runner_path = f.name
+    try:
+        cmd = ["node"] + list(node_args or []) + [runner_path, str(code_file), workload, str(iterations)]
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            raise RuntimeError(f"运行 {code_file} 失败: {result.stderr.strip()}")
+        return json.loads(result.stdout)
+    finally:
+        os.unlink(runner_path)
+
+
+def measure_code(js_code, workload, iterations, repeat=5, timeout=600):
+    """
+    测量一段代码：重复运行repeat次，每项取中位数
+
+    Returns:
+        包含size、compile_ms、load_ms、run_ms的字典
+    """
+    with tempfile.NamedTemporaryFile('w', suffix='.js', delete=False, encoding='utf-8') as f:
+        f.write(js_code)
+        code_file = f.name
+    try:
+        samples = [run_in_node(code_file, workload, iterations, timeout) for _ in range(repeat)]
+    finally:
+        os.unlink(code_file)
+
+    result = {"size": len(js_code.encode('utf-8'))}
+    for key in ("compile_ms", "load_ms", "run_ms"):
+        result[key] = statistics.median(sample[key] for sample in samples)
+    return result
+
+
+def benchmark_profiles(entry_file, workload, iterations=1000, config_file=None, sections=None,
+                       repeat=5, settings=None, option_sets=None) -> List[Dict[str, Any]]:
+    """
+    比较原始代码与各配置混淆后代码的大小和运行开销
+
+    Args:
+        entry_file: JS入口文件，需要定义全局workload函数
+        workload: workload函数名
+        iterations: 每次测量调用workload的次数
+        config_file: INI配置文件
+        sections: 要比较的section列表（默认DEFAULT）
+        repeat: 每个版本重复测量的次数
+        settings: 传给JSObfuscator的运行设置
+        option_sets: 额外要比较的 {名称: 混淆选项}，不经过INI文件
+
+    Returns:
+        每个版本一条结果，第一条为原始代码
+    """
+    with open(entry_file, 'r', encoding='utf-8') as f:
+        js_code = f.read()
+
+    # 所有配置使用相同的seed，结果只反映选项的差异
+    settings = dict({"reproducible": True}, **(settings or {}))
+
+    print(f"⏱️  测量原始代码: {entry_file}")
+    baseline = measure_code(js_code, workload, iterations, repeat)
+    baseline.update({"profile": "original", "expansion_ratio": 1.0, "slowdown": 1.0})
+    results = [baseline]
+
+    variants = [(section, {"config_file": config_file, "config_section": section}) for section in (sections or ["DEFAULT"])]
+    variants += [(name, {"options": options}) for name, options in (option_sets or {}).items()]
+
+    for name, kwargs in variants:
+        print(f"⏱️  测量配置: {name}")
+        obfuscator = JSObfuscator(settings=settings, **kwargs)
+        obfuscated = obfuscator.obfuscate_js(js_code, str(entry_file))
+        result = measure_code(obfuscated, workload, iterations, repeat)
+        result.update({
+            "profile": name,
+            "expansion_ratio": result["size"] / baseline["size"],
+            "slowdown": result["run_ms"] / baseline["run_ms"] if baseline["run_ms"] else None,
+        })
+        results.append(result)
+
+    return results
+
+
+def _load_corpus(corpus):
+    """读取JS文件所在目录或JS文件列表，返回 [(文件, 内容)]"""
+    if isinstance(corpus, (str, Path)) and Path(corpus).is_dir():
+        files = sorted(Path(corpus).rglob('*.js'))
+    else:
+        files = [Path(file) for file in corpus]
+    sources = [(file, file.read_text(encoding='utf-8')) for file in files]
+    if not sources:
+        raise ValueError(f"{corpus} 中没有JS文件")
+    return sources
+
+
+def benchmark_backends(corpus, backends=None, config_file=None, section="DEFAULT", settings=None) -> List[Dict[str, Any]]:
+    """
+    用同一批文件比较各混淆后端的耗时
+    
+    每个后端依次混淆所有文件，第一个文件的耗时包含进程启动或加载javascript-obfuscator的开销。
+    使用可复现模式，各后端的输出与第一个后端逐字节比较
+    
+    Args:
+        corpus: JS文件所在目录或JS文件列表
+        backends: 要比较的后端名称（默认全部）
+        config_file: INI配置文件
+        section: 使用的section
+        settings: 传给JSObfuscator的运行设置
+        
+    Returns:
+        每个后端一条结果，包含files、bytes、first_ms、median_ms、total_s、throughput_kbps和same_output
+    """
+    sources = _load_corpus(corpus)
+    total_bytes = sum(len(js_code.encode('utf-8')) for _, js_code in sources)
+    
+    results = []
+    reference = None
+    for backend in backends or list(OBFUSCATOR_BACKENDS):
+        print(f"⏱️  测量后端: {backend}")
+        obfuscator = JSObfuscator(config_file=config_file, config_section=section,
+                                  settings=dict({"reproducible": True}, **(settings or {}), backend=backend))
+        timings = []
+        outputs = []
+        try:
+            for file, js_code in sources:
+                start = time.perf_counter()
+                outputs.append(obfuscator.obfuscate_js(js_code, str(file), rel_path=file.name))
+                timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            obfuscator.close()
+        
+        if reference is None:
+            reference = outputs
+        total_s = sum(timings) / 1000
+        results.append({
+            "backend": backend,
+            "files": len(sources),
+            "bytes": total_bytes,
+            "first_ms": timings[0],
+            "median_ms": statistics.median(timings),
+            "total_s": total_s,
+            "throughput_kbps": total_bytes / 1024 / total_s if total_s else None,
+            "same_output": outputs == reference,
+        })
+    return results
+
+
+def benchmark_strip(corpus, config_file=None, section="DEFAULT", settings=None, repeat=1) -> List[Dict[str, Any]]:
+    """
+    比较混淆前是否去掉注释和空白（stripSource）时的混淆耗时和输出大小
+    
+    两种情况使用相同的seed依次混淆所有文件，混淆耗时包括去掉注释和空白的时间，重复repeat次取中位数
+    
+    Args:
+        corpus: JS文件所在目录或JS文件列表
+        config_file: INI配置文件
+        section: 使用的section
+        settings: 传给JSObfuscator的运行设置
+        repeat: 每种情况混淆全部文件的次数
+        
+    Returns:
+        不去掉和去掉注释空白各一条结果，包含files、input_bytes（交给混淆器的大小）、output_bytes、
+        strip_ms、total_s，以及相对不去掉时的time_ratio和size_ratio
+    """
+    sources = _load_corpus(corpus)
+    results = []
+    for strip in (False, True):
+        print(f"⏱️  测量混淆前{'去掉' if strip else '保留'}注释和空白")
+        start = time.perf_counter()
+        inputs = [strip_source(js_code) if strip else js_code for _, js_code in sources]
+        strip_ms = (time.perf_counter() - start) * 1000 if strip else 0.0
+        
+        obfuscator = JSObfuscator(config_file=config_file, config_section=section,
+                                  settings=dict({"reproducible": True}, **(settings or {}), stripSource=strip))
+        totals = []
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                outputs = [obfuscator.obfuscate_js(js_code, str(file), rel_path=file.name) for file, js_code in sources]
+                totals.append(time.perf_counter() - start)
+        finally:
+            obfuscator.close()
+        
+        result = {
+            "strip": strip,
+            "files": len(sources),
+            "input_bytes": sum(len(js_code.encode('utf-8')) for js_code in inputs),
+            "output_bytes": sum(len(output.encode('utf-8')) for output in outputs),
+            "strip_ms": strip_ms,
+            "total_s": statistics.median(totals),
+        }
+        baseline = results[0] if results else result
+        result["time_ratio"] = result["total_s"] / baseline["total_s"] if baseline["total_s"] else None
+        result["size_ratio"] = result["output_bytes"] / baseline["output_bytes"] if baseline["output_bytes"] else None
+        results.append(result)
+    return results
+
+
+def benchmark_startup(backends=("npx", "worker"), repeat=5, settings=None) -> List[Dict[str, Any]]:
+    """
+    测量冷启动耗时：每次新建JSObfuscator并混淆一小段代码，比较不使用和使用Node编译缓存的情况
+    
+    使用编译缓存时第一次运行会生成缓存，单独记为first_ms；其余运行取中位数
+    
+    Args:
+        backends: 要测量的后端（embedded不启动Node，不受编译缓存影响）
+        repeat: 每种情况的运行次数
+        settings: 传给JSObfuscator的运行设置
+        
+    Returns:
+        每个后端、每种情况一条结果，包含first_ms、median_ms和cache_files（缓存文件数）
+    """
+    snippet = "function startup(a) { return a + 1; }\n"
+    results = []
+    with tempfile.TemporaryDirectory() as cache_root:
+        for backend in backends:
+            for compile_cache in (False, True):
+                cache_dir = str(Path(cache_root) / backend) if compile_cache else ""
+                print(f"⏱️  测量冷启动: {backend}，{'使用' if compile_cache else '不使用'}编译缓存")
+                timings = []
+                for _ in range(repeat + 1 if compile_cache else repeat):
+                    # 初始化时会运行 javascript-obfuscator --version，先禁用编译缓存，避免第一次计时前已生成缓存；
+                    # NODE_COMPILE_CACHE在创建后端时才读取，计时前再指向本次测量的缓存目录
+                    obfuscator = JSObfuscator(settings=dict(settings or {}, backend=backend, compileCacheDir=""))
+                    obfuscator.settings["compileCacheDir"] = cache_dir
+                    try:
+                        start = time.perf_counter()
+                        obfuscator.obfuscate_js(snippet)
+                        timings.append((time.perf_counter() - start) * 1000)
+                    finally:
+                        obfuscator.close()
+                
+                first_ms = timings.pop(0) if compile_cache else None
+                cache_files = sum(len(files) for _, _, files in os.walk(cache_dir)) if compile_cache else 0
+                results.append({
+                    "backend": backend,
+                    "compile_cache": compile_cache,
+                    "first_ms": first_ms,
+                    "median_ms": statistics.median(timings),
+                    "cache_files": cache_files,
+                })
+    return results
+
+
+def print_startup_results(results):
+    """以表格形式打印冷启动测量结果"""
+    header = f"{'后端':<12}{'编译缓存':>10}{'生成缓存(ms)':>16}{'冷启动中位数(ms)':>20}{'缓存文件':>10}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        first = f"{result['first_ms']:.1f}" if result["first_ms"] is not None else "-"
+        print(f"{result['backend']:<12}{'是' if result['compile_cache'] else '否':>10}{first:>16}"
+              f"{result['median_ms']:>20.1f}{result['cache_files']:>10}")
+
+
+def print_strip_results(results):
+    """以表格形式打印去掉注释和空白前后的比较结果"""
+    header = f"{'注释和空白':<10}{'输入(B)':>12}{'输出(B)':>12}{'去除(ms)':>11}{'混淆(s)':>10}{'耗时比':>9}{'体积比':>9}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        time_ratio = f"{result['time_ratio']:.2f}x" if result["time_ratio"] is not None else "-"
+        size_ratio = f"{result['size_ratio']:.2f}x" if result["size_ratio"] is not None else "-"
+        print(f"{'去掉' if result['strip'] else '保留':<10}{result['input_bytes']:>12}{result['output_bytes']:>12}"
+              f"{result['strip_ms']:>11.1f}{result['total_s']:>10.2f}{time_ratio:>9}{size_ratio:>9}")
+
+
+def print_backend_results(results):
+    """以表格形式打印后端比较结果"""
+    header = f"{'后端':<12}{'文件数':>8}{'首个(ms)':>12}{'中位数(ms)':>13}{'总计(s)':>10}{'KB/s':>10}{'输出一致':>10}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        throughput = f"{result['throughput_kbps']:.1f}" if result["throughput_kbps"] is not None else "-"
+        print(f"{result['backend']:<12}{result['files']:>8}{result['first_ms']:>12.1f}{result['median_ms']:>13.1f}"
+              f"{result['total_s']:>10.2f}{throughput:>10}{'是' if result['same_output'] else '否':>10}")
+
+
+def print_results(results):
+    """以表格形式打印基准测试结果"""
+    header = f"{'配置':<24}{'大小(B)':>12}{'膨胀率':>9}{'编译(ms)':>11}{'加载(ms)':>11}{'运行(ms)':>12}{'减速比':>9}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        slowdown = f"{result['slowdown']:.2f}x" if result["slowdown"] is not None else "-"
+        print(f"{result['profile']:<24}{result['size']:>12}{result['expansion_ratio']:>8.2f}x"
+              f"{result['compile_ms']:>11.2f}{result['load_ms']:>11.2f}{result['run_ms']:>12.2f}{slowdown:>9}")
+
+
+def write_json(results, json_file):
+    """把结果写入JSON文件（未指定文件时不写）"""
+    if json_file:
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"\n📝 结果已写入: {json_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='混淆后代码的运行时开销基准测试')
+    parser.add_argument('entry', nargs='?', help='JS入口文件，需要定义全局workload函数')
+    parser.add_argument('-w', '--workload', default='workload', help='workload函数名 (默认: workload)')
+    parser.add_argument('-n', '--iterations', type=int, default=1000, help='每次测量调用workload的次数 (默认: 1000)')
+    parser.add_argument('--repeat', type=int, default=5, help='每个版本重复测量的次数，取中位数 (默认: 5)')
+    parser.add_argument('--ini', default='obfuscator_config.ini', help='INI配置文件 (默认: obfuscator_config.ini)')
+    parser.add_argument('--sections', default='DEFAULT', help='要比较的section，逗号分隔 (默认: DEFAULT)')
+    parser.add_argument('--json', help='把结果写入JSON文件')
+    parser.add_argument('--corpus', help='比较混淆后端：JS文件所在目录')
+    parser.add_argument('--strip', action='store_true', help='与--corpus一起使用：比较混淆前是否去掉注释和空白')
+    parser.add_argument('--startup', action='store_true', help='测量冷启动耗时，比较不使用和使用Node编译缓存')
+    parser.add_argument('--backends', default=','.join(OBFUSCATOR_BACKENDS),
+                        help=f"要比较的混淆后端，逗号分隔 (默认: {','.join(OBFUSCATOR_BACKENDS)})")
+
+    args = parser.parse_args()
+
+    if args.startup:
+        try:
+            backends = [backend.strip() for backend in args.backends.split(',') if backend.strip() != "embedded"]
+            results = benchmark_startup(backends, args.repeat)
+        except Exception as e:
+            print(f"错误: {str(e)}")
+            return 1
+        print()
+        print_startup_results(results)
+        write_json(results, args.json)
+        return 0
+
+    if args.corpus and args.strip:
+        try:
+            backend = args.backends.split(',')[0].strip()
+            section = args.sections.split(',')[0].strip()
+            results = benchmark_strip(args.corpus, args.ini, section, {"backend": backend}, args.repeat)
+        except Exception as e:
+            print(f"错误: {str(e)}")
+            return 1
+        print()
+        print_strip_results(results)
+        write_json(results, args.json)
+        return 0
+
+    if args.corpus:
+        try:
+            backends = [backend.strip() for backend in args.backends.split(',') if backend.strip()]
+            section = args.sections.split(',')[0].strip()
+            results = benchmark_backends(args.corpus, backends, args.ini, section)
+        except Exception as e:
+            print(f"错误: {str(e)}")
+            return 1
+        print()
+        print_backend_results(results)
+        write_json(results, args.json)
+        return 0
+
+    if not args.entry or not Path(args.entry).is_file():
+        print(f"错误: 入口文件 '{args.entry}' 不存在")
+        return 1
+
+    try:
+        sections = [section.strip() for section in args.sections.split(',') if section.strip()]
+        results = benchmark_profiles(args.entry, args.workload, args.iterations, args.ini, sections, args.repeat)
+    except Exception as e:
+        print(f"错误: {str(e)}")
+        return 1
+
+    print()
+    print_results(results)
+    write_json(results, args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+远程结果缓存的参考服务器
+
+实现js_obfuscator.py使用的远程缓存协议，把条目保存在本地目录中，用于测试和小规模部署：
+    GET /<key>  命中返回200和混淆结果，未命中返回404
+    PUT /<key>  保存混淆结果，返回201
+
+示例:
+    python cache_server.py --dir .cache-server --port 8765
+    python js_obfuscator.py src -o dist -r --cache-dir .cache --cache-url http://127.0.0.1:8765
+"""
+
+import os
+import re
+import sys
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from js_obfuscator import parse_size
+
+
+# 缓存key为SHA-256的十六进制字符串
+_KEY_RE = re.compile(r'^/([0-9a-f]{64})$')
+
+
+class CacheRequestHandler(BaseHTTPRequestHandler):
+    """处理缓存条目的GET/PUT请求，条目目录、大小上限和token由服务器对象提供"""
+
+    def do_GET(self):
+        path = self._get_entry_path()
+        if path is None:
+            return
+        try:
+            data = path.read_bytes()
+        except OSError:
+            self._send(404)
+            return
+        self._send(200, data)
+
+    def do_PUT(self):
+        path = self._get_entry_path()
+        if path is None:
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        if self.server.max_entry_size and length > self.server.max_entry_size:
+            self._send(413)
+            return
+        data = self.rfile.read(length)
+
+        # 先写临时文件再替换，并发上传同一个key时不会读到写了一半的条目
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        temp_file.write_bytes(data)
+        os.replace(temp_file, path)
+        self._send(201)
+
+    def _get_entry_path(self):
+        """校验token和key，返回条目文件路径；校验失败时返回错误响应和None"""
+        if self.server.token and self.headers.get("Authorization") != f"Bearer {self.server.token}":
+            self._send(401)
+            return None
+        match = _KEY_RE.match(self.path)
+        if not match:
+            self._send(400)
+            return None
+        key = match.group(1)
+        return self.server.cache_dir / key[:2] / f"{key}.js"
+
+    def _send(self, status, body=b""):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/javascript; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def create_server(cache_dir, host="127.0.0.1", port=8765, max_entry_size=0, token=None, quiet=False):
+    """
+    创建缓存服务器（未启动），port为0时自动选择端口
+
+    Returns:
+        ThreadingHTTPServer，调用serve_forever()开始处理请求
+    """
+    server = ThreadingHTTPServer((host, port), CacheRequestHandler)
+    server.cache_dir = Path(cache_dir)
+    server.max_entry_size = max_entry_size
+    server.token = token
+    server.quiet = quiet
+    server.cache_dir.mkdir(parents=True, exist_ok=True)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='js_obfuscator远程结果缓存的参考服务器')
+    parser.add_argument('--dir', default='.cache-server', help='保存缓存条目的目录 (默认: .cache-server)')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址 (默认: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口 (默认: 8765)')
+    parser.add_argument('--max-entry-size', default='8MB', help='单个条目的大小上限，0表示不限制 (默认: 8MB)')
+    parser.add_argument('--token', help='要求请求携带 Authorization: Bearer <token>')
+
+    args = parser.parse_args()
+
+    server = create_server(args.dir, args.host, args.port, parse_size(args.max_entry_size), args.token)
+    print(f"💾 缓存服务器已启动: http://{args.host}:{server.server_address[1]}，目录: {args.dir}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
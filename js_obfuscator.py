@@ -2,21 +2,1793 @@
 # -*- coding: utf-8 -*-
 
 import os
+import io
 import sys
 import json
+import hashlib
+import gzip
 import jsbeautifier
 import subprocess
 import tempfile
 import shutil
 import argparse
 import re
+import struct
+import signal
+import threading
+import queue
+import collections
+import weakref
+import itertools
+import time
+import fnmatch
+import posixpath
+import urllib.request
+import urllib.error
+import zipfile
+import tarfile
+import copy
+import mmap
+import cProfile
+import pstats
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
 import configparser
-from typing import Dict, Any, Optional, Union
+from typing import Dict, Any, Optional, Union, List
+
+from js_source import JSSyntaxError, find_bundle_modules, global_declarations, identifier_names, strip_source
+
+try:
+    import psutil  # 可选依赖，用于统计混淆进程树的内存占用
+except ImportError:
+    psutil = None
+
+try:
+    import brotli  # 可选依赖，用于生成.br压缩副本
+except ImportError:
+    brotli = None
+
+try:
+    # 可选依赖，embedded后端在当前进程内运行javascript-obfuscator
+    from py_mini_racer import MiniRacer, JSTimeoutException, JSOOMException
+except ImportError:
+    MiniRacer = JSTimeoutException = JSOOMException = None
+
+
+# 按文件大小分级的配置section前缀，例如 [SIZE_TIER_1MB]
+SIZE_TIER_PREFIX = "SIZE_TIER"
+
+# 工具运行设置（非javascript-obfuscator选项）所在的section
+SETTINGS_SECTION = "SETTINGS"
+
+# 与体积基线比较时，单个文件增长不超过该字节数不算超出预算（随机seed会带来小幅波动）
+SIZE_GROWTH_SLACK = 1024
+
+# 按路径选择配置的规则所在的section，每行为 glob = section名称，按顺序匹配
+PATH_RULES_SECTION = "PATH_RULES"
+
+# 默认选项之外、出现在section中时才生效的混淆选项，值用于确定类型转换
+# 多变体构建时每个客户的section通常只在这些选项上不同
+EXTRA_OPTION_TYPES = {
+    "seed": 0,
+    "domainLock": [],
+    "domainLockRedirectUrl": "",
+    "debugProtectionInterval": 1000,
+    "reservedNames": [],
+    "reservedStrings": [],
+    "identifiersPrefix": "",
+    "target": "browser",
+}
+
+# 按模块拆分混淆打包文件时，运行时代码中代替模块函数的占位标识符，以及模块混淆结果导出函数用的变量
+# 两者在各自的程序中都是未声明的全局标识符，不会被javascript-obfuscator重命名
+BUNDLE_PLACEHOLDER_RE = re.compile(r"__js_obfuscator_module_(\d+)__")
+BUNDLE_EXPORT = "__js_obfuscator_exports__"
+
+# 超时降级时沿用原配置的选项：标识客户或授权范围，不能因为换用轻量配置而丢失
+PINNED_OPTIONS = ("seed", "domainLock", "domainLockRedirectUrl")
+
+# 估算单个混淆任务内存占用：Node进程及javascript-obfuscator的基础内存
+NODE_BASE_MEMORY = 128 * 1024 ** 2
+
+# 不小于该大小的输入文件用mmap映射后直接解码，不经过读缓冲区
+MMAP_MIN_SIZE = 64 * 1024
+
+# 判断是否为已压缩文件时读取的文件开头字节数
+CLASSIFY_SAMPLE_SIZE = 64 * 1024
+
+# 第三方库文件开头的许可证声明
+_LICENSE_MARKER_RE = re.compile(r'@license|@preserve|/\*!')
+_LICENSE_TEXT_RE = re.compile(r'copyright|\(c\)|licen[cs]e|\bMIT\b|\bBSD\b|\bApache\b', re.IGNORECASE)
+
+# 支持的归档格式：扩展名 -> (格式, tar压缩方式)
+_ARCHIVE_EXTENSIONS = [
+    (".zip", ("zip", None)), (".xpi", ("zip", None)), (".crx", ("crx", None)),
+    (".tar", ("tar", "")), (".tar.gz", ("tar", "gz")), (".tgz", ("tar", "gz")),
+    (".tar.bz2", ("tar", "bz2")), (".tbz2", ("tar", "bz2")), (".tar.xz", ("tar", "xz")), (".txz", ("tar", "xz")),
+]
+
+# 从归档条目原样复制数据时的块大小
+ARCHIVE_COPY_CHUNK = 1024 * 1024
+
+# 浏览器扩展中JS文件的角色，按优先级排列（同一文件被多处引用时取靠前的）
+EXTENSION_ROLES = ("background", "content", "web_accessible", "page")
+
+# manifest中指向扩展页面（HTML）的字段
+_MANIFEST_PAGE_FIELDS = [
+    ("action", "default_popup"), ("browser_action", "default_popup"), ("page_action", "default_popup"),
+    ("options_page",), ("options_ui", "page"), ("devtools_page",),
+    ("side_panel", "default_path"), ("sidebar_action", "default_panel"),
+]
+
+_HTML_SCRIPT_RE = re.compile(r'<script\b[^>]*?\bsrc\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+_JS_IMPORT_RE = re.compile(
+    r'\bimportScripts\s*\(([^)]*)\)'
+    r'|(?:\bimport|\bexport)\s*(?:[\w$*{}\s,]+?\s*from\s*)?["\']([^"\'\n]+)["\']')
+_STRING_LITERAL_RE = re.compile(r'["\']([^"\'\n]+)["\']')
+# 各角色使用的INI section对应的运行设置
+_ROLE_SECTION_SETTINGS = {
+    "background": "backgroundSection",
+    "content": "contentScriptSection",
+    "web_accessible": "webAccessibleSection",
+    "page": "pageScriptSection",
+}
+
+_JSON_COMMENT_RE = re.compile(r'^\s*//.*$', re.MULTILINE)
+
+_SIZE_UNITS = {"": 1, "B": 1, "K": 1024, "KB": 1024, "M": 1024 ** 2, "MB": 1024 ** 2, "G": 1024 ** 3, "GB": 1024 ** 3}
+
+
+def parse_size(value: Union[str, int, float]) -> int:
+    """
+    解析大小字符串为字节数
+    
+    Args:
+        value: 例如 1048576、"512KB"、"1MB"、"1.5G"
+        
+    Returns:
+        字节数
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r'\s*([\d.]+)\s*([a-zA-Z]*)\s*', str(value))
+    if not match or match.group(2).upper() not in _SIZE_UNITS:
+        raise ValueError(f"无法解析的大小: {value}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+class _SourceText(str):
+    """
+    从文件读入、带有原始UTF-8字节的代码文本
+    
+    data为与文本逐字节对应的bytes或mmap，path为未经修改的源文件路径。计算哈希和交给npx后端时
+    直接使用data或path，不再重新编码和写临时文件。切片、拼接、替换得到的都是普通str，不会带上过期的字节
+    """
+    data = None
+    path = None
+    
+    def release(self):
+        """关闭mmap（原地覆盖输入文件前调用，截断被映射的文件后再访问会导致进程崩溃）"""
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.data = None
+        self.path = None
+
+
+def _decode_source(data) -> str:
+    """把UTF-8字节解码为_SourceText并保留原始字节"""
+    text = _SourceText(data, 'utf-8')
+    text.data = data
+    return text
+
+
+def _read_source(path, keep_bytes=True) -> str:
+    """
+    以UTF-8读取代码文件，结果与文本模式读取相同（换行统一为\n）
+    
+    不小于MMAP_MIN_SIZE的文件用mmap映射后直接解码，不经过读缓冲区。keep_bytes为True且文件中没有\r时
+    返回带原始字节的_SourceText；有\r时换行转换后文本与字节不再对应，返回普通str
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_MIN_SIZE:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = f.read()
+    if keep_bytes and data.find(b"\r") < 0:
+        try:
+            return _decode_source(data)
+        except UnicodeDecodeError:
+            if isinstance(data, mmap.mmap):
+                data.close()
+            raise
+    try:
+        return str(data, 'utf-8').replace("\r\n", "\n").replace("\r", "\n")
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+
+def _source_bytes(text):
+    """代码文本的UTF-8字节，有原始字节时直接返回"""
+    data = getattr(text, "data", None)
+    return data if data is not None else text.encode('utf-8')
+
+
+# 写出代码时每次编码的字符数，编码后的字节攒到该大小后用一次writev写出
+_WRITE_CHUNK = 1024 * 1024
+
+
+def _write_source(path, parts):
+    """
+    把若干段代码文本依次写入文件
+    
+    POSIX下分块编码，攒够_WRITE_CHUNK后用os.writev一次写出多段，不需要先把各段拼接成一个字符串，
+    也不会同时存在整份输出的编码副本；Windows下仍按文本模式写入，保持原有的换行转换
+    """
+    if not hasattr(os, "writev"):
+        with open(path, 'w', encoding='utf-8') as f:
+            for part in parts:
+                f.write(part)
+        return
+    
+    def write_all(fd, buffers):
+        buffers = [memoryview(buffer) for buffer in buffers]
+        while buffers:
+            written = os.writev(fd, buffers)
+            while buffers and written >= len(buffers[0]):
+                written -= len(buffers[0])
+                buffers.pop(0)
+            if buffers:
+                buffers[0] = buffers[0][written:]
+    
+    with open(path, 'wb') as f:
+        batch = []
+        batch_size = 0
+        for part in parts:
+            for start in range(0, len(part), _WRITE_CHUNK):
+                chunk = part[start:start + _WRITE_CHUNK].encode('utf-8')
+                batch.append(chunk)
+                batch_size += len(chunk)
+                if batch_size >= _WRITE_CHUNK:
+                    write_all(f.fileno(), batch)
+                    batch = []
+                    batch_size = 0
+        write_all(f.fileno(), batch)
+
+
+def format_size(size: int) -> str:
+    """把字节数格式化为 512B、12.3KB、1.5MB 形式"""
+    for unit in ("B", "KB", "MB"):
+        if abs(size) < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}GB"
+
+
+def get_archive_format(path) -> Optional[tuple]:
+    """
+    根据扩展名判断归档格式
+    
+    Returns:
+        (格式, tar压缩方式)，格式为 "zip"、"crx" 或 "tar"；不是支持的归档时返回None
+    """
+    name = str(path).lower()
+    for extension, archive_format in _ARCHIVE_EXTENSIONS:
+        if name.endswith(extension):
+            return archive_format
+    return None
+
+
+def _copy_zip_entry_raw(source: zipfile.ZipFile, target: zipfile.ZipFile, info: zipfile.ZipInfo):
+    """
+    把zip条目的压缩数据原样写入另一个zip，不解压也不重新压缩
+    
+    zipfile没有公开的原样复制接口，这里按zip格式直接写本地文件头和数据，再登记到target的中央目录。
+    用到了zipfile的内部属性（_FH_*、_strip_extra、NameToInfo、start_dir、_didModify），
+    已在CPython 3.11上核对，升级Python时先运行test_archive_raw_copy确认
+    """
+    source.fp.seek(info.header_offset)
+    header = struct.unpack(zipfile.structFileHeader, source.fp.read(zipfile.sizeFileHeader))
+    source.fp.seek(header[zipfile._FH_FILENAME_LENGTH] + header[zipfile._FH_EXTRA_FIELD_LENGTH], os.SEEK_CUR)
+    
+    # 大小和CRC已知，写在本地文件头中，不再使用数据描述符
+    entry = copy.copy(info)
+    entry.flag_bits &= ~0x08
+    entry.extra = zipfile._strip_extra(info.extra, (1,))
+    entry.header_offset = target.fp.tell()
+    target.fp.write(entry.FileHeader())
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = source.fp.read(min(remaining, ARCHIVE_COPY_CHUNK))
+        if not chunk:
+            raise zipfile.BadZipFile(f"条目 {info.filename} 的数据不完整")
+        target.fp.write(chunk)
+        remaining -= len(chunk)
+    
+    target.filelist.append(entry)
+    target.NameToInfo[entry.filename] = entry
+    target.start_dir = target.fp.tell()
+    target._didModify = True
+
+
+def _resolve_extension_path(reference, base_dir="", relative_only=False):
+    """
+    把manifest、HTML或JS中引用的路径解析为扩展根目录下的相对路径
+    
+    外部URL、超出扩展根目录的路径，以及relative_only时不以 ./ ../ / 开头的模块名返回None
+    """
+    reference = reference.strip().split('#')[0].split('?')[0]
+    if not reference or "://" in reference or reference.startswith(("//", "data:", "blob:")):
+        return None
+    if relative_only and not reference.startswith(('.', '/')):
+        return None
+    if reference.startswith('/'):
+        path = reference.lstrip('/')
+    else:
+        path = posixpath.join(base_dir, reference)
+    path = posixpath.normpath(path)
+    if path == '.' or path.startswith('../'):
+        return None
+    return path
+
+
+def collect_extension_roles(manifest, paths, read_text) -> Dict[str, str]:
+    """
+    根据浏览器扩展的manifest.json确定各JS文件的角色，不扫描源码来判断类型
+    
+    支持MV2的background.scripts/page和MV3的background.service_worker、content_scripts、
+    web_accessible_resources，以及popup、options等扩展页面中的<script src>。
+    扩展包内的其他HTML页面可以通过URL打开，其中的脚本也视为被引用；
+    被引用的脚本通过importScripts和静态import引入的文件继承引用者的角色
+    
+    Args:
+        manifest: 解析后的manifest.json
+        paths: 扩展包内所有文件的相对路径集合（统一使用/分隔）
+        read_text: read_text(相对路径)返回文件内容，读取失败时返回None
+        
+    Returns:
+        {JS文件相对路径: 角色}，角色见EXTENSION_ROLES
+    """
+    roles = {}
+    pending = []
+    visited_pages = set()
+    
+    def add(reference, role, base_dir=""):
+        path = _resolve_extension_path(reference, base_dir)
+        if path is None or path not in paths:
+            return
+        if path.endswith(('.html', '.htm')):
+            if (path, role) in visited_pages:
+                return
+            visited_pages.add((path, role))
+            html = read_text(path) or ""
+            for src in _HTML_SCRIPT_RE.findall(html):
+                add(src, role, posixpath.dirname(path))
+            return
+        if not path.endswith('.js'):
+            return
+        current = roles.get(path)
+        if current is None or EXTENSION_ROLES.index(role) < EXTENSION_ROLES.index(current):
+            roles[path] = role
+            pending.append(path)
+    
+    background = manifest.get("background") or {}
+    if background.get("service_worker"):
+        add(background["service_worker"], "background")
+    for script in background.get("scripts") or []:
+        add(script, "background")
+    if background.get("page"):
+        add(background["page"], "background")
+    
+    for content_script in manifest.get("content_scripts") or []:
+        for script in content_script.get("js") or []:
+            add(script, "content")
+    
+    # MV2为glob列表，MV3为 {"resources": [...], "matches": [...]} 列表
+    for entry in manifest.get("web_accessible_resources") or []:
+        patterns = (entry.get("resources") or []) if isinstance(entry, dict) else [entry]
+        for pattern in patterns:
+            pattern = pattern.lstrip('/')
+            for path in sorted(paths):
+                if fnmatch.fnmatch(path, pattern):
+                    add(path, "page" if path.endswith(('.html', '.htm')) else "web_accessible")
+    
+    pages = []
+    for field in _MANIFEST_PAGE_FIELDS:
+        value = manifest
+        for key in field:
+            value = value.get(key) if isinstance(value, dict) else None
+        if isinstance(value, str):
+            pages.append(value)
+    pages.extend(value for value in (manifest.get("chrome_url_overrides") or {}).values() if isinstance(value, str))
+    pages.extend((manifest.get("sandbox") or {}).get("pages") or [])
+    pages.extend(sorted(path for path in paths if path.endswith(('.html', '.htm'))))
+    for page in pages:
+        add(page, "page")
+    
+    # 被引用脚本中importScripts和静态import引入的文件
+    while pending:
+        path = pending.pop()
+        js_code = read_text(path) or ""
+        base_dir = posixpath.dirname(path)
+        for import_scripts, module in _JS_IMPORT_RE.findall(js_code):
+            if import_scripts:
+                for reference in _STRING_LITERAL_RE.findall(import_scripts):
+                    add(reference, roles[path], base_dir)
+            elif _resolve_extension_path(module, base_dir, relative_only=True):
+                add(module, roles[path], base_dir)
+    
+    return roles
+
+
+class ObfuscationTimeoutError(RuntimeError):
+    """混淆进程超过超时时间被终止"""
+
+
+# cgroup文件系统的挂载点；容器内当前进程的cgroup通常直接挂载在根目录
+_CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+# cgroup v1中表示不限制内存的值接近2**63
+_CGROUP_UNLIMITED = 2 ** 60
+
+_priority_lowered = False
+
+
+def _get_cgroup_dirs(controller=None) -> List[Path]:
+    """
+    当前进程所在cgroup及其各级父cgroup的目录，从内到外排列
+    
+    Args:
+        controller: cgroup v1的控制器名（如cpu、memory），None表示cgroup v2统一层级
+    """
+    if controller is None:
+        bases = [_CGROUP_ROOT, _CGROUP_ROOT / "unified"]
+    else:
+        bases = [_CGROUP_ROOT / controller]
+    paths = ["/"]
+    try:
+        with open("/proc/self/cgroup", 'r', encoding='utf-8') as f:
+            for line in f:
+                _, controllers, path = line.rstrip("\n").split(":", 2)
+                if (controllers == "") if controller is None else controller in controllers.split(","):
+                    paths.insert(0, path)
+                    if controller is not None and controllers != controller:
+                        bases.append(_CGROUP_ROOT / controllers)
+    except (OSError, ValueError):
+        pass
+    
+    # /proc/self/cgroup中的路径在容器内不一定存在，逐级向上直到挂载点根目录
+    dirs = []
+    for path in paths:
+        parts = [part for part in path.split("/") if part]
+        for depth in range(len(parts), -1, -1):
+            for base in bases:
+                directory = base.joinpath(*parts[:depth])
+                if directory not in dirs and directory.is_dir():
+                    dirs.append(directory)
+    return dirs
+
+
+def get_cpu_limit() -> int:
+    """
+    获取当前进程实际可用的CPU数
+    
+    取CPU亲和性（taskset/cpuset）和各级cgroup的CPU配额（v2的cpu.max，v1的cpu.cfs_quota_us）中最小者，
+    容器内os.cpu_count()返回的是宿主机的核数。配额不足一个核时按1计算
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count() or 1
+    
+    quotas = []
+    for directory in _get_cgroup_dirs():
+        try:
+            quota, period = (directory / "cpu.max").read_text().split()[:2]
+            if quota != "max":
+                quotas.append(int(quota) / int(period))
+        except (OSError, ValueError):
+            continue
+    for directory in _get_cgroup_dirs("cpu"):
+        try:
+            quota = int((directory / "cpu.cfs_quota_us").read_text())
+            period = int((directory / "cpu.cfs_period_us").read_text())
+            if quota > 0 and period > 0:
+                quotas.append(quota / period)
+        except (OSError, ValueError):
+            continue
+    
+    if quotas:
+        cpus = min(cpus, max(int(min(quotas)), 1))
+    return cpus
+
+
+def get_cgroup_memory_limit() -> Optional[int]:
+    """获取各级cgroup内存上限（v2的memory.max，v1的memory.limit_in_bytes）中最小者，未限制时返回None"""
+    limits = []
+    for directory, name in ([(directory, "memory.max") for directory in _get_cgroup_dirs()]
+                            + [(directory, "memory.limit_in_bytes") for directory in _get_cgroup_dirs("memory")]):
+        try:
+            value = (directory / name).read_text().strip()
+            if value != "max" and int(value) < _CGROUP_UNLIMITED:
+                limits.append(int(value))
+        except (OSError, ValueError):
+            continue
+    return min(limits) if limits else None
+
+
+def lower_process_priority() -> List[str]:
+    """
+    降低当前进程的CPU和IO优先级，之后启动的Node子进程继承同样的优先级
+    
+    POSIX下nice值加10；Linux下IO调度改为best-effort最低优先级（需要psutil或ionice命令）；
+    Windows下优先级类改为BELOW_NORMAL。同一进程中只降低一次
+    
+    Returns:
+        已生效的调整说明列表
+    """
+    global _priority_lowered
+    if _priority_lowered:
+        return []
+    _priority_lowered = True
+    
+    applied = []
+    if sys.platform == "win32":
+        import ctypes
+        BELOW_NORMAL_PRIORITY_CLASS = 0x4000
+        kernel32 = ctypes.windll.kernel32
+        if kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), BELOW_NORMAL_PRIORITY_CLASS):
+            applied.append("优先级类 BELOW_NORMAL")
+        return applied
+    
+    try:
+        applied.append(f"nice {os.nice(10)}")
+    except OSError as e:
+        print(f"⚠️  降低CPU优先级失败: {e}")
+    
+    if sys.platform.startswith("linux") and psutil:
+        try:
+            psutil.Process().ionice(psutil.IOPRIO_CLASS_BE, 7)
+            applied.append("ionice best-effort 7")
+        except psutil.Error as e:
+            print(f"⚠️  降低IO优先级失败: {e}")
+    elif sys.platform.startswith("linux") and shutil.which("ionice"):
+        try:
+            subprocess.run(["ionice", "-c", "2", "-n", "7", "-p", str(os.getpid())],
+                           check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            applied.append("ionice best-effort 7")
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"⚠️  降低IO优先级失败: {e}")
+    return applied
+
+
+def get_total_memory() -> Optional[int]:
+    """获取可用的内存总量（字节）：物理内存，在容器中不超过cgroup内存上限；无法获取时返回None"""
+    total = _get_physical_memory()
+    limit = get_cgroup_memory_limit() if sys.platform.startswith("linux") else None
+    if limit and (total is None or limit < total):
+        return limit
+    return total
+
+
+def _get_physical_memory() -> Optional[int]:
+    """获取物理内存总量（字节），无法获取时返回None"""
+    try:
+        if sys.platform == "win32":
+            import ctypes
+
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                            ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                            ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                            ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                            ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+            status = MEMORYSTATUSEX()
+            status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status))
+            return int(status.ullTotalPhys)
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """
+    把按路径分段匹配的glob转换为正则（不含锚点）：* 和 ? 不匹配 /，** 匹配任意多级目录
+    
+    例如 src/*.js 只匹配 src 下一级的文件，**/crypto*.js 匹配任意目录中的文件
+    """
+    parts = []
+    index = 0
+    pattern = pattern.lstrip('/')
+    while index < len(pattern):
+        char = pattern[index]
+        if pattern.startswith('**/', index):
+            parts.append('(?:.*/)?')
+            index += 3
+        elif pattern.startswith('**', index):
+            parts.append('.*')
+            index += 2
+        elif char == '*':
+            parts.append('[^/]*')
+            index += 1
+        elif char == '?':
+            parts.append('[^/]')
+            index += 1
+        elif char == '[' and ']' in pattern[index + 2:]:
+            end = pattern.index(']', index + 2)
+            body = pattern[index + 1:end]
+            negate = body.startswith('!')
+            body = body[1:] if negate else body
+            parts.append(f"[{'^/' if negate else ''}{body.replace(chr(92), chr(92) * 2)}]")
+            index = end + 1
+        else:
+            parts.append(re.escape(char))
+            index += 1
+    return "".join(parts)
+
+
+class _MemoryGate:
+    """
+    按估算内存准入任务：已运行任务的估算总和不超过预算（预算为0表示不限制），
+    同时运行的任务数不超过slots（0表示不限制）
+    """
+    
+    # 当前线程所在任务的 (准入控制, 预留的内存)
+    _local = threading.local()
+    
+    def __init__(self, budget: int, slots: int = 0):
+        self.budget = budget
+        self.slots = slots
+        self.in_use = 0
+        self.running = 0
+        self._condition = threading.Condition()
+    
+    @classmethod
+    def current(cls):
+        """当前线程所在任务的 (准入控制, 预留的内存)，不在任务中时为 (None, 0)"""
+        return getattr(cls._local, "reservation", (None, 0))
+    
+    @contextmanager
+    def reserve(self, amount: int):
+        self._acquire(amount)
+        previous = self.current()
+        self._local.reservation = (self, amount)
+        try:
+            yield
+        finally:
+            self._local.reservation = previous
+            self._release(amount)
+    
+    @contextmanager
+    def suspend(self):
+        """暂时归还当前线程预留的内存和任务数，等待各自预留的子任务（如打包文件的模块）时使用，避免互相等待"""
+        gate, amount = self.current()
+        if gate is not self:
+            yield
+            return
+        self._release(amount)
+        self._local.reservation = (None, 0)
+        try:
+            yield
+        finally:
+            self._acquire(amount)
+            self._local.reservation = (self, amount)
+    
+    def _acquire(self, amount):
+        with self._condition:
+            # 没有任务在运行时总是放行，避免超出预算的单个任务永远等待
+            while ((self.budget and self.in_use and self.in_use + amount > self.budget)
+                   or (self.slots and self.running >= self.slots)):
+                self._condition.wait()
+            self.in_use += amount
+            self.running += 1
+    
+    def _release(self, amount):
+        with self._condition:
+            self.in_use -= amount
+            self.running -= 1
+            self._condition.notify_all()
+
+
+class _Precompressor:
+    """在线程池中为输出文件生成.gz/.br压缩副本，与混淆过程并行"""
+    
+    SUFFIXES = {"gzip": ".gz", "brotli": ".br"}
+    
+    def __init__(self, formats, extensions, gzip_level=9, brotli_quality=11, workers=None):
+        self.formats = [fmt for fmt in formats if fmt in self.SUFFIXES]
+        if "brotli" in self.formats and brotli is None:
+            print("⚠️  未安装brotli，跳过.br压缩副本（pip install brotli）")
+            self.formats.remove("brotli")
+        self.extensions = {ext.lower() for ext in extensions}
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.compressed = 0
+        self.unchanged = 0
+        self.failed = []
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self._futures = []
+    
+    def submit(self, path, duplicates=()):
+        """提交一个输出文件，duplicates为内容相同、直接复用压缩副本的其他输出"""
+        if self.formats and Path(path).suffix.lower() in self.extensions:
+            self._futures.append(self._executor.submit(self._compress, Path(path), [Path(p) for p in duplicates]))
+    
+    def close(self):
+        """等待所有压缩任务完成"""
+        for future in self._futures:
+            future.result()
+        self._executor.shutdown()
+    
+    def _compress(self, path, duplicates):
+        try:
+            data = path.read_bytes()
+            for fmt in self.formats:
+                sibling = Path(str(path) + self.SUFFIXES[fmt])
+                if self._is_unchanged(sibling, data, fmt):
+                    with self._lock:
+                        self.unchanged += 1
+                else:
+                    self._write_atomic(sibling, self._compress_data(data, fmt))
+                    with self._lock:
+                        self.compressed += 1
+                for duplicate in duplicates:
+                    duplicate_sibling = Path(str(duplicate) + self.SUFFIXES[fmt])
+                    if os.path.lexists(duplicate_sibling):
+                        os.unlink(duplicate_sibling)
+                    try:
+                        os.link(sibling, duplicate_sibling)
+                    except OSError:
+                        shutil.copyfile(sibling, duplicate_sibling)
+        except Exception as e:
+            print(f"生成压缩副本 {path} 时出错: {e}")
+            with self._lock:
+                self.failed.append(str(path))
+    
+    def _compress_data(self, data, fmt):
+        if fmt == "gzip":
+            # 固定mtime，相同内容得到相同的压缩结果
+            return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+        return brotli.compress(data, quality=self.brotli_quality)
+    
+    def _is_unchanged(self, sibling, data, fmt):
+        """已有的压缩副本解压后与当前内容相同时无需重新压缩"""
+        if not sibling.exists():
+            return False
+        try:
+            compressed = sibling.read_bytes()
+            if fmt == "gzip":
+                return gzip.decompress(compressed) == data
+            return brotli.decompress(compressed) == data
+        except Exception:
+            return False
+    
+    def _write_atomic(self, path, data):
+        temp_path = Path(f"{path}.tmp{os.getpid()}.{threading.get_ident()}")
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+
+
+# HTML中的内联脚本和事件属性（onclick="foo()"）可能引用全局名称，符号索引把其中所有单词都当作引用
+_WORD_RE = re.compile(r'[A-Za-z_$][\w$]*')
+
+# 全局符号索引中的文件类型
+SYMBOL_INDEX_SUFFIXES = ('.js', '.mjs', '.html', '.htm')
+
+
+def _index_source_file(path):
+    """
+    分析符号索引中的一个文件（在子进程中运行）
+    
+    Returns:
+        (顶层声明的名称列表, 出现的全部名称列表)；HTML文件没有声明。
+        无法切分的JS文件把出现的所有单词都当作声明，宁可多保留也不误改名
+    """
+    text = Path(path).read_text(encoding='utf-8', errors='ignore')
+    if path.endswith(('.html', '.htm')):
+        return [], sorted(set(_WORD_RE.findall(text)))
+    try:
+        return sorted(global_declarations(text)), sorted(identifier_names(text))
+    except JSSyntaxError:
+        words = sorted(set(_WORD_RE.findall(text)))
+        return words, words
+
+
+class _SymbolIndex:
+    """
+    输入目录的全局符号索引：每个JS/HTML文件顶层声明的全局名称和出现的全部名称
+    
+    按文件大小和修改时间增量更新，只重新分析变化的文件（多进程并行），结果保存为JSON
+    """
+    VERSION = 1
+    
+    def __init__(self, index_file=None):
+        self.index_file = Path(index_file) if index_file else None
+        self.files = {}
+        if self.index_file and self.index_file.exists():
+            try:
+                data = json.loads(self.index_file.read_text(encoding='utf-8'))
+                if data.get("version") == self.VERSION:
+                    self.files = data["files"]
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️  读取符号索引 {self.index_file} 失败，重新建立: {e}")
+    
+    def update(self, input_dir, paths, workers=1):
+        """
+        按当前文件列表更新索引，删除已不存在的文件
+        
+        Returns:
+            重新分析的文件数
+        """
+        current = {}
+        changed = []
+        for path in paths:
+            rel_path = path.relative_to(input_dir).as_posix()
+            stat = path.stat()
+            entry = self.files.get(rel_path)
+            if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                current[rel_path] = entry
+            else:
+                current[rel_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+                changed.append((rel_path, path))
+        
+        # 词法分析是纯Python代码，用多进程才能并行
+        sources = [str(path) for _, path in changed]
+        if workers > 1 and len(changed) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(changed))) as executor:
+                results = list(executor.map(_index_source_file, sources, chunksize=max(len(sources) // (workers * 4), 1)))
+        else:
+            results = [_index_source_file(source) for source in sources]
+        for (rel_path, _), (declared, names) in zip(changed, results):
+            current[rel_path].update(declared=declared, names=names)
+        
+        removed = len(self.files) - (len(current) - len(changed))
+        self.files = current
+        if changed or removed:
+            self.save()
+        return len(changed)
+    
+    def shared_globals(self):
+        """
+        每个文件中需要保留原名的全局名称：本文件顶层声明、且在其他文件中出现的名称
+        
+        Returns:
+            相对路径 -> 排序后的名称列表
+        """
+        document_counts = collections.Counter()
+        for entry in self.files.values():
+            document_counts.update(set(entry["names"]) | set(entry["declared"]))
+        shared = {}
+        for rel_path, entry in self.files.items():
+            own = set(entry["names"]) | set(entry["declared"])
+            shared[rel_path] = sorted(name for name in entry["declared"]
+                                      if document_counts[name] - (name in own) > 0)
+        return shared
+    
+    def save(self):
+        if not self.index_file:
+            return
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.index_file.with_name(f"{self.index_file.name}.{os.getpid()}.tmp")
+            temp_file.write_text(json.dumps({"version": self.VERSION, "files": self.files}), encoding='utf-8')
+            os.replace(temp_file, self.index_file)
+        except OSError as e:
+            print(f"⚠️  保存符号索引失败: {e}")
+
+
+class _ResultCache:
+    """
+    混淆结果缓存：本地目录，以及其后可选的远程HTTP缓存
+    
+    远程缓存协议：GET {url}/{key} 返回200和混淆结果或404，PUT {url}/{key} 上传混淆结果。
+    远程请求出错或超时按未命中处理，连续出错后本次运行不再访问远程缓存
+    """
+    
+    # 连续出错达到该次数后停用远程缓存
+    MAX_REMOTE_ERRORS = 3
+    
+    def __init__(self, local_dir=None, remote_url=None, token=None, timeout=5, max_entry_size=0, concurrency=16):
+        self.local_dir = Path(local_dir) if local_dir else None
+        self.remote_url = remote_url.rstrip('/') if remote_url else None
+        self.token = token
+        self.timeout = timeout
+        self.max_entry_size = max_entry_size
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+        self.uploads = 0
+        self._lock = threading.Lock()
+        self._prefetched = {}
+        self._uploads = []
+        self._remote_errors = 0
+        self._executor = ThreadPoolExecutor(max_workers=concurrency) if self.remote_url else None
+    
+    def prefetch(self, key):
+        """在后台查询远程缓存，之后get时直接使用查询结果，多个查询并发进行"""
+        local_path = self._local_path(key)
+        if not self._remote_enabled() or (local_path and local_path.is_file()):
+            return
+        with self._lock:
+            if key not in self._prefetched:
+                self._prefetched[key] = self._executor.submit(self._remote_get, key)
+    
+    def get(self, key):
+        """
+        查询缓存
+        
+        Returns:
+            (混淆结果, "local"/"remote")，未命中时返回 (None, None)
+        """
+        local_path = self._local_path(key)
+        if local_path:
+            try:
+                code = local_path.read_text(encoding='utf-8')
+                with self._lock:
+                    self.local_hits += 1
+                return code, "local"
+            except OSError:
+                pass
+        
+        if self._remote_enabled():
+            with self._lock:
+                future = self._prefetched.pop(key, None)
+            code = future.result() if future else self._remote_get(key)
+            if code is not None:
+                self._write_local(key, code)
+                with self._lock:
+                    self.remote_hits += 1
+                return code, "remote"
+        
+        with self._lock:
+            self.misses += 1
+        return None, None
+    
+    def put(self, key, code):
+        """写入本地缓存，并在后台上传到远程缓存"""
+        self._write_local(key, code)
+        if self._remote_enabled() and not self._too_large(len(_source_bytes(code))):
+            with self._lock:
+                self._uploads.append(self._executor.submit(self._remote_put, key, code))
+    
+    def flush(self):
+        """等待后台上传完成"""
+        with self._lock:
+            uploads, self._uploads = self._uploads, []
+        for upload in uploads:
+            upload.result()
+    
+    def close(self):
+        self.flush()
+        if self._executor:
+            self._executor.shutdown(wait=True)
+    
+    def _local_path(self, key):
+        if not self.local_dir:
+            return None
+        return self.local_dir / key[:2] / f"{key}.js"
+    
+    def _write_local(self, key, code):
+        local_path = self._local_path(key)
+        if not local_path:
+            return
+        try:
+            local_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = local_path.with_name(f"{local_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            _write_source(temp_file, [code])
+            os.replace(temp_file, local_path)
+        except OSError as e:
+            print(f"⚠️  写入本地缓存失败: {e}")
+    
+    def _too_large(self, size):
+        return bool(self.max_entry_size) and size > self.max_entry_size
+    
+    def _remote_enabled(self):
+        return self.remote_url is not None and self._remote_errors < self.MAX_REMOTE_ERRORS
+    
+    def _remote_request(self, key, data=None):
+        headers = {"Content-Type": "application/javascript; charset=utf-8"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return urllib.request.Request(f"{self.remote_url}/{key}", data=data, headers=headers,
+                                      method="PUT" if data is not None else "GET")
+    
+    def _remote_get(self, key):
+        """从远程缓存读取，未命中、超过大小上限或出错时返回None"""
+        if not self._remote_enabled():
+            return None
+        try:
+            with urllib.request.urlopen(self._remote_request(key), timeout=self.timeout) as response:
+                length = response.headers.get("Content-Length")
+                if length and self._too_large(int(length)):
+                    return None
+                data = response.read(self.max_entry_size + 1) if self.max_entry_size else response.read()
+            self._remote_errors = 0
+            if self._too_large(len(data)):
+                return None
+            return data.decode('utf-8')
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            self._remote_failed(e)
+        except (OSError, ValueError) as e:
+            self._remote_failed(e)
+        return None
+    
+    def _remote_put(self, key, code):
+        """上传到远程缓存，出错时只记录"""
+        if not self._remote_enabled():
+            return
+        try:
+            with urllib.request.urlopen(self._remote_request(key, bytes(_source_bytes(code))), timeout=self.timeout):
+                pass
+            with self._lock:
+                self.uploads += 1
+        except (OSError, ValueError) as e:
+            self._remote_failed(e)
+    
+    def _remote_failed(self, error):
+        with self._lock:
+            self._remote_errors += 1
+            if self._remote_errors == 1:
+                print(f"⚠️  远程缓存请求失败，按未命中处理: {error}")
+            elif self._remote_errors == self.MAX_REMOTE_ERRORS:
+                print(f"⚠️  远程缓存连续 {self.MAX_REMOTE_ERRORS} 次请求失败，本次运行不再使用")
+
+
+class _ProcessTreeMonitor:
+    """后台采样当前进程及所有子进程的RSS总和，记录峰值"""
+    
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.peak_rss = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def start(self):
+        self._thread.start()
+    
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+        # 无法采样时退回到单个子进程的峰值RSS
+        if not self.peak_rss and sys.platform != "win32":
+            import resource
+            max_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+            self.peak_rss = max_rss if sys.platform == "darwin" else max_rss * 1024
+    
+    def _run(self):
+        while not self._stop_event.is_set():
+            rss = self._sample()
+            if rss:
+                self.peak_rss = max(self.peak_rss, rss)
+            self._stop_event.wait(self.interval)
+    
+    def _sample(self) -> Optional[int]:
+        if psutil:
+            try:
+                process = psutil.Process()
+                total = process.memory_info().rss
+                for child in process.children(recursive=True):
+                    try:
+                        total += child.memory_info().rss
+                    except psutil.Error:
+                        pass
+                return total
+            except psutil.Error:
+                return None
+        if os.path.isdir("/proc/self"):
+            return self._sample_procfs()
+        return None
+    
+    def _sample_procfs(self) -> Optional[int]:
+        """Linux下不依赖psutil，从/proc读取进程树的RSS"""
+        children = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat", 'r') as f:
+                    stat = f.read()
+                # 进程名可能包含空格和括号，ppid位于最后一个')'之后的第二个字段
+                ppid = int(stat[stat.rindex(')') + 2:].split()[1])
+                children.setdefault(ppid, []).append(int(entry))
+            except (OSError, ValueError):
+                continue
+        
+        page_size = os.sysconf('SC_PAGE_SIZE')
+        total = 0
+        pending = [os.getpid()]
+        while pending:
+            pid = pending.pop()
+            try:
+                with open(f"/proc/{pid}/statm", 'r') as f:
+                    total += int(f.read().split()[1]) * page_size
+            except (OSError, ValueError, IndexError):
+                pass
+            pending.extend(children.get(pid, []))
+        return total
+
+
+class _PythonProfiler:
+    """
+    用cProfile和tracemalloc分析Python侧编排本身的开销（选项计算、正则分析、路径处理、日志输出等）
+    
+    Python 3.12起cProfile基于sys.monitoring，一个Profile即覆盖所有线程；
+    更早的版本通过threading.setprofile为之后启动的每个线程单独启用一个Profile，结束时合并
+    """
+    
+    # 快照中排除tracemalloc自身和导入机制的分配
+    TRACE_FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    )
+    
+    def __init__(self, profile_file=None, trace_file=None, interval=1000, top=20):
+        self.profile_file = profile_file
+        self.trace_file = trace_file
+        self.interval = max(int(interval), 1)
+        self.top = top
+        self.files = 0
+        self._profiles = []
+        self._lock = threading.Lock()
+        self._report = None
+        self._previous = None
+    
+    def start(self):
+        if self.profile_file:
+            if sys.version_info < (3, 12):
+                threading.setprofile(self._profile_thread)
+            profile = cProfile.Profile()
+            self._profiles.append(profile)
+            profile.enable()
+        if self.trace_file:
+            self._report = open(self.trace_file, 'w', encoding='utf-8')
+            tracemalloc.start()
+            self._snapshot("开始")
+    
+    def file_done(self):
+        """每处理完一个文件调用一次，每interval个文件做一次内存快照"""
+        if self._report is None:
+            return
+        with self._lock:
+            self.files += 1
+            if self.files % self.interval == 0:
+                self._snapshot(f"{self.files} 个文件")
+    
+    def stop(self):
+        """停止分析并写出pstats和内存分配报告"""
+        if self.profile_file:
+            threading.setprofile(None)
+            for profile in self._profiles:
+                profile.disable()
+            stats = pstats.Stats(*self._profiles)
+            stats.dump_stats(self.profile_file)
+            # 按自身耗时排序：等待Node进程的时间集中在poll、acquire等几项，其余即为编排本身的开销
+            print(f"🐍 Python侧耗时（自身耗时前{self.top}项），完整数据: {self.profile_file}（python -m pstats 查看）")
+            stats.sort_stats("tottime").print_stats(self.top)
+        if self._report is not None:
+            with self._lock:
+                if self.files % self.interval:
+                    self._snapshot(f"结束（{self.files} 个文件）")
+            tracemalloc.stop()
+            self._report.close()
+            self._report = None
+            print(f"🧠 内存分配报告: {self.trace_file}")
+    
+    def _profile_thread(self, frame, event, arg):
+        """新线程的第一个profile事件：为该线程启用一个Profile"""
+        profile = cProfile.Profile()
+        with self._lock:
+            self._profiles.append(profile)
+        profile.enable()
+    
+    def _snapshot(self, title):
+        snapshot = tracemalloc.take_snapshot().filter_traces(self.TRACE_FILTERS)
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [f"=== {title}: 当前 {current / 1024 ** 2:.1f} MB，峰值 {peak / 1024 ** 2:.1f} MB ===", "分配最多的位置:"]
+        lines += [f"  {stat}" for stat in snapshot.statistics("lineno")[:self.top]]
+        if self._previous is not None:
+            growth = [stat for stat in snapshot.compare_to(self._previous, "lineno") if stat.size_diff > 0]
+            lines.append("相比上一次快照增长最多的位置:")
+            lines += [f"  {stat}" for stat in growth[:self.top]]
+        self._previous = snapshot
+        self._report.write("\n".join(lines) + "\n\n")
+        self._report.flush()
+
+
+def _run_process(cmd, timeout=None, env=None):
+    """
+    运行子进程，超时则终止整个进程树
+    
+    Args:
+        cmd: 命令列表
+        timeout: 超时时间（秒），None或0表示不限制
+        env: 子进程环境变量（默认继承当前环境）
+        
+    Returns:
+        (stdout, stderr)
+    """
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env,
+                               **_process_group_kwargs())
+    try:
+        stdout, stderr = process.communicate(timeout=timeout or None)
+    except subprocess.TimeoutExpired:
+        _kill_process_tree(process)
+        process.communicate()
+        raise ObfuscationTimeoutError(f"混淆超时（{timeout}秒）")
+    except BaseException:
+        _kill_process_tree(process)
+        raise
+    
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+    return stdout, stderr
+
+
+def _process_group_kwargs() -> Dict[str, Any]:
+    """新建进程组的Popen参数，超时时可以一并终止子进程"""
+    if sys.platform == "win32":
+        # 使用shell=True在Windows上更可靠（npx为.cmd脚本）
+        return {"shell": True, "creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    # 新建进程组，超时时可以一并终止npx启动的node子进程
+    return {"start_new_session": True}
+
+
+def _kill_process_tree(process):
+    """终止进程及其所有子进程"""
+    try:
+        if sys.platform == "win32":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+    process.kill()
+
+
+def get_default_compile_cache_dir() -> Path:
+    """默认的Node编译缓存目录：用户缓存目录下的js-obfuscator/node-compile-cache"""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "js-obfuscator" / "node-compile-cache"
+
+
+_npm_global_root = None
+
+
+def find_obfuscator_package() -> Optional[Path]:
+    """
+    查找javascript-obfuscator的npm包目录：依次查找当前目录和本工具目录的node_modules，以及npm全局目录
+    
+    Returns:
+        包目录，未安装时返回None
+    """
+    global _npm_global_root
+    candidates = [Path.cwd() / "node_modules", Path(__file__).resolve().parent / "node_modules"]
+    if _npm_global_root is None:
+        try:
+            npm = "npm.cmd" if sys.platform == "win32" else "npm"
+            result = subprocess.run([npm, "root", "-g"], capture_output=True, text=True, timeout=60)
+            _npm_global_root = result.stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            _npm_global_root = ""
+    if _npm_global_root:
+        candidates.append(Path(_npm_global_root))
+    
+    for node_modules in candidates:
+        package_dir = node_modules / "javascript-obfuscator"
+        if (package_dir / "package.json").is_file():
+            return package_dir
+    return None
+
+
+class ObfuscatorBackend:
+    """
+    混淆后端：把代码和选项交给javascript-obfuscator，返回混淆后的代码
+    
+    新的后端继承该类并注册到OBFUSCATOR_BACKENDS，obfuscate可能在多个线程中同时调用
+    """
+    name = ""
+    
+    def __init__(self, env: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            env: 启动Node进程时额外设置的环境变量（如NODE_COMPILE_CACHE）
+        """
+        self.env = dict(env or {})
+    
+    def obfuscate(self, js_code: str, options: Dict[str, Any], timeout: Optional[float] = None,
+                  heap_limit: Optional[int] = None) -> str:
+        """
+        混淆一段代码
+        
+        Args:
+            js_code: JS代码
+            options: javascript-obfuscator选项
+            timeout: 超时时间（秒），超时抛出ObfuscationTimeoutError
+            heap_limit: JS堆上限（MB）
+        """
+        raise NotImplementedError
+    
+    def version(self) -> str:
+        """javascript-obfuscator的版本，参与结果缓存的key"""
+        if getattr(self, "_version", None) is None:
+            package_dir = find_obfuscator_package()
+            if package_dir:
+                with open(package_dir / "package.json", 'r', encoding='utf-8') as f:
+                    self._version = json.load(f).get("version", "unknown")
+            else:
+                stdout, _ = _run_process(["npx", "javascript-obfuscator", "--version"], timeout=120)
+                self._version = stdout.strip()
+        return self._version
+    
+    def close(self):
+        """释放后端占用的进程等资源"""
+
+
+class NpxBackend(ObfuscatorBackend):
+    """每个文件启动一次npx javascript-obfuscator，通过临时文件传递代码和选项"""
+    name = "npx"
+    
+    def obfuscate(self, js_code, options, timeout=None, heap_limit=None):
+        # 未经修改的源文件直接交给javascript-obfuscator读取，否则写入临时文件
+        source_path = getattr(js_code, "path", None)
+        temp_in_path = None
+        if not (source_path and source_path.endswith('.js')):
+            with tempfile.NamedTemporaryFile(suffix='.js', delete=False) as temp_in:
+                temp_in.write(_source_bytes(js_code))
+                temp_in_path = source_path = temp_in.name
+            
+        with tempfile.NamedTemporaryFile(suffix='.js', delete=False) as temp_out:
+            temp_out_path = temp_out.name
+            
+        # 创建配置文件
+        config_path = tempfile.mktemp(suffix='.json')
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump(options, f)
+            
+        try:
+            # 构建javascript-obfuscator命令
+            cmd = ["npx", "javascript-obfuscator", 
+                  source_path, 
+                  "--output", temp_out_path,
+                  "--config", config_path]
+            
+            # 按输入大小设置Node堆上限
+            env = dict(os.environ, **self.env)
+            if heap_limit:
+                env["NODE_OPTIONS"] = f"{env.get('NODE_OPTIONS', '')} --max-old-space-size={heap_limit}".strip()
+            
+            # 执行混淆命令，超时后终止整个进程树
+            _run_process(cmd, timeout, env=env)
+            
+            # 读取混淆后的代码（大文件用mmap直接解码）
+            return _read_source(temp_out_path, keep_bytes=False)
+        
+        except ObfuscationTimeoutError:
+            raise
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"JavaScript混淆失败: {e.stderr}")
+        except Exception as e:
+            raise RuntimeError(f"JavaScript混淆失败: {str(e)}")
+        finally:
+            # 清理临时文件
+            for path in [temp_in_path, temp_out_path, config_path]:
+                if path is None:
+                    continue
+                try:
+                    os.unlink(path)
+                except:
+                    pass
+
+
+# 常驻Node进程：从stdin逐行读取JSON请求，混淆后逐行写回JSON结果
+NODE_WORKER_SCRIPT = r"""
+const readline = require('readline');
+const JavaScriptObfuscator = require(process.argv[process.argv.length - 1]);
+const rl = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+rl.on('line', (line) => {
+  const request = JSON.parse(line);
+  let response;
+  try {
+    const code = JavaScriptObfuscator.obfuscate(request.code, request.options).getObfuscatedCode();
+    response = { id: request.id, code };
+  } catch (e) {
+    response = { id: request.id, error: String((e && e.stack) || e) };
+  }
+  process.stdout.write(JSON.stringify(response) + '\n');
+});
+rl.on('close', () => process.exit(0));
+"""
+
+
+class _NodeWorker:
+    """一个常驻的Node进程，通过stdin/stdout逐行收发JSON请求和响应"""
+    
+    def __init__(self, script, args=(), heap_limit=None, env=None, node_args=()):
+        self.heap_limit = heap_limit
+        cmd = ["node", *node_args]
+        if heap_limit:
+            cmd.append(f"--max-old-space-size={heap_limit}")
+        cmd += ["-e", script, *[str(arg) for arg in args]]
+        popen_kwargs = _process_group_kwargs()
+        popen_kwargs.pop("shell", None)
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                        text=True, encoding='utf-8', bufsize=1, env=dict(os.environ, **(env or {})),
+                                        **popen_kwargs)
+        self.responses = queue.Queue()
+        self.stderr = collections.deque(maxlen=20)
+        self.ids = itertools.count(1)
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+        threading.Thread(target=self._read_stderr, daemon=True).start()
+    
+    def _read_stdout(self):
+        for line in self.process.stdout:
+            self.responses.put(line)
+        self.responses.put(None)
+    
+    def _read_stderr(self):
+        for line in self.process.stderr:
+            self.stderr.append(line.rstrip())
+    
+    def request(self, payload, timeout=None):
+        """发送一个请求并等待响应，超时抛出TimeoutError，进程退出时抛出RuntimeError"""
+        request_id = next(self.ids)
+        self.process.stdin.write(json.dumps(dict(payload, id=request_id)) + "\n")
+        self.process.stdin.flush()
+        try:
+            line = self.responses.get(timeout=timeout or None)
+        except queue.Empty:
+            raise TimeoutError(f"Node进程{timeout}秒内没有响应")
+        if line is None:
+            self.process.wait()
+            raise RuntimeError(f"Node进程已退出（{self.process.returncode}）: " + "\n".join(self.stderr))
+        
+        response = json.loads(line)
+        if response["id"] != request_id:
+            raise RuntimeError("Node进程的响应与请求不对应")
+        return response
+    
+    def close(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            _kill_process_tree(self.process)
+    
+    def kill(self):
+        _kill_process_tree(self.process)
+        self.process.wait()
+
+
+class NodeWorkerBackend(ObfuscatorBackend):
+    """
+    常驻Node进程池，进程启动和加载javascript-obfuscator只发生一次
+    
+    每个并行任务使用一个空闲进程，没有空闲进程时新建；超时或出错的进程会被终止，之后按需重建。
+    堆上限在进程启动时设置，任务需要更大的堆时重启该进程
+    """
+    name = "worker"
+    
+    def __init__(self, env=None):
+        super().__init__(env)
+        self.package_dir = find_obfuscator_package()
+        if not self.package_dir:
+            raise RuntimeError("worker后端需要本地或全局安装的javascript-obfuscator: npm install -g javascript-obfuscator")
+        self._idle = queue.LifoQueue()
+    
+    def obfuscate(self, js_code, options, timeout=None, heap_limit=None):
+        worker = self._acquire(heap_limit)
+        try:
+            response = worker.request({"code": js_code, "options": options}, timeout)
+        except TimeoutError:
+            worker.kill()
+            raise ObfuscationTimeoutError(f"混淆超时（{timeout}秒）")
+        except Exception:
+            if worker.process.poll() is None:
+                self._idle.put(worker)
+            raise
+        self._idle.put(worker)
+        if "error" in response:
+            raise RuntimeError(f"JavaScript混淆失败: {response['error']}")
+        return response["code"]
+    
+    def _acquire(self, heap_limit):
+        """取出一个空闲进程，堆上限不够或已退出时重启"""
+        try:
+            worker = self._idle.get_nowait()
+        except queue.Empty:
+            return _NodeWorker(NODE_WORKER_SCRIPT, [self.package_dir], heap_limit, self.env)
+        if worker.process.poll() is not None or (heap_limit and (worker.heap_limit or 0) < heap_limit):
+            worker.close()
+            return _NodeWorker(NODE_WORKER_SCRIPT, [self.package_dir], heap_limit, self.env)
+        return worker
+    
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# 在嵌入式引擎中调用javascript-obfuscator浏览器版的入口
+EMBEDDED_ENTRY_SCRIPT = """
+function __obfuscate(code, options) {
+  return JavaScriptObfuscator.obfuscate(code, options).getObfuscatedCode();
+}
+"""
+
+
+class EmbeddedBackend(ObfuscatorBackend):
+    """
+    在当前进程内的V8（可选依赖mini-racer）中运行javascript-obfuscator的浏览器版脚本
+    
+    不启动任何进程，适合大量小片段的场景。每个并行任务使用一个独立的V8上下文，
+    超时或内存耗尽的上下文会被丢弃
+    """
+    name = "embedded"
+    
+    def __init__(self, script_path=None, env=None):
+        super().__init__(env)
+        if MiniRacer is None:
+            raise RuntimeError("embedded后端需要安装可选依赖mini-racer: pip install mini-racer")
+        if not script_path:
+            package_dir = find_obfuscator_package()
+            if not package_dir:
+                raise RuntimeError("未找到javascript-obfuscator，请安装或通过embeddedScript指定浏览器版脚本")
+            script_path = package_dir / "dist" / "index.browser.js"
+        with open(script_path, 'r', encoding='utf-8') as f:
+            self._script = f.read()
+        self._idle = queue.LifoQueue()
+        # 超时或内存耗尽的上下文不再使用，等V8终止执行后在close时释放
+        self._retired = []
+    
+    def obfuscate(self, js_code, options, timeout=None, heap_limit=None):
+        context = self._acquire()
+        try:
+            if heap_limit:
+                context.set_hard_memory_limit(heap_limit * 1024 ** 2)
+            code = context.call("__obfuscate", js_code, options, timeout=timeout * 1000 if timeout else None)
+        except JSTimeoutException:
+            self._retired.append(context)
+            raise ObfuscationTimeoutError(f"混淆超时（{timeout}秒）")
+        except JSOOMException:
+            self._retired.append(context)
+            raise RuntimeError(f"JavaScript混淆失败: 超出内存上限 {heap_limit}MB")
+        except Exception as e:
+            self._idle.put(context)
+            raise RuntimeError(f"JavaScript混淆失败: {str(e)}")
+        self._idle.put(context)
+        return code
+    
+    def version(self):
+        # 浏览器版脚本可能来自embeddedScript设置，以脚本内容区分版本
+        return "browser-" + hashlib.sha256(self._script.encode('utf-8')).hexdigest()[:16]
+    
+    def _acquire(self):
+        """取出一个空闲的V8上下文，没有时新建并加载javascript-obfuscator"""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        context = MiniRacer()
+        context.eval("var window = this, self = this, global = this;")
+        context.eval(self._script)
+        context.eval(EMBEDDED_ENTRY_SCRIPT)
+        return context
+    
+    def close(self):
+        while self._retired:
+            self._retired.pop().close()
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# 可选的混淆后端，通过backend设置或--backend选择
+OBFUSCATOR_BACKENDS = {
+    NpxBackend.name: NpxBackend,
+    NodeWorkerBackend.name: NodeWorkerBackend,
+    EmbeddedBackend.name: EmbeddedBackend,
+}
+
+
+# 校验输出的常驻Node进程：先解析语法，smoke模式下再在沙箱上下文中执行顶层代码
+VALIDATOR_SCRIPT = r"""
+const vm = require('vm');
+const readline = require('readline');
+
+// 任意访问、调用、构造都返回自身的桩对象，代替chrome、document等宿主对象
+function createStub() {
+  const stub = new Proxy(function () {}, {
+    get: (target, key) => key === Symbol.toPrimitive ? () => '' : (key === 'then' ? undefined : stub),
+    set: () => true,
+    has: () => true,
+    apply: () => stub,
+    construct: () => stub,
+  });
+  return stub;
+}
+
+function createSandbox() {
+  const stub = createStub();
+  const noop = () => 0;
+  const sandbox = {
+    console: { log: noop, info: noop, warn: noop, error: noop, debug: noop, trace: noop },
+    setTimeout: noop, setInterval: noop, clearTimeout: noop, clearInterval: noop,
+    requestAnimationFrame: noop, queueMicrotask: noop, addEventListener: noop, removeEventListener: noop,
+    importScripts: noop, fetch: () => new Promise(() => {}), require: () => stub,
+    chrome: stub, browser: stub, document: stub, navigator: stub, location: stub,
+    localStorage: stub, sessionStorage: stub, XMLHttpRequest: stub,
+  };
+  sandbox.window = sandbox.self = sandbox;
+  sandbox.module = { exports: {} };
+  sandbox.exports = sandbox.module.exports;
+  return vm.createContext(sandbox, { microtaskMode: 'afterEvaluate' });
+}
+
+function describe(e, filename) {
+  if (!e || typeof e !== 'object' || !('message' in e)) return String(e);
+  const lines = String(e.stack || '').split('\n');
+  const location = lines.find((line) => line.includes(filename + ':'));
+  const where = location ? ' (' + location.trim().replace(/^at /, '') + ')' : '';
+  return e.name + ': ' + e.message + where;
+}
+
+function run(code, filename, timeout) {
+  try {
+    new vm.Script(code, { filename }).runInContext(createSandbox(), { timeout });
+    return null;
+  } catch (e) {
+    return describe(e, filename);
+  }
+}
+
+function validate(request) {
+  const filename = request.name;
+  let script;
+  try {
+    script = new vm.Script(request.output, { filename });
+  } catch (e) {
+    // ES模块在脚本上下文中无法解析，改为按模块解析，模块不做冒烟运行
+    if (e instanceof SyntaxError && /\b(import|export)\b/.test(e.message) && vm.SourceTextModule) {
+      try {
+        new vm.SourceTextModule(request.output, { identifier: filename });
+        return request.smoke ? { ok: true, skipped: 'ES模块不做冒烟运行' } : { ok: true };
+      } catch (moduleError) {
+        return { ok: false, stage: 'parse', error: describe(moduleError, filename) };
+      }
+    }
+    return { ok: false, stage: 'parse', error: describe(e, filename) };
+  }
+  if (!request.smoke) return { ok: true };
+
+  const error = run(request.output, filename, request.timeout);
+  if (!error) return { ok: true };
+  // 原始代码在沙箱中同样无法运行时，说明是沙箱缺少宿主环境，不判为混淆导致的失败
+  if (run(request.source, filename, request.timeout)) return { ok: true, skipped: '原始代码在沙箱中同样无法运行' };
+  return { ok: false, stage: 'smoke', error };
+}
+
+const rl = readline.createInterface({ input: process.stdin, crlfDelay: Infinity });
+rl.on('line', (line) => {
+  const request = JSON.parse(line);
+  let response;
+  try {
+    response = Object.assign({ id: request.id }, validate(request));
+  } catch (e) {
+    response = { id: request.id, ok: false, stage: 'parse', error: String((e && e.stack) || e) };
+  }
+  process.stdout.write(JSON.stringify(response) + '\n');
+});
+rl.on('close', () => process.exit(0));
+"""
+
+
+class _Validator:
+    """
+    在线程池中校验混淆输出，与混淆过程并行
+    
+    parse模式只解析语法；smoke模式在解析后用带宿主对象桩的vm沙箱执行顶层代码，
+    原始代码在沙箱中同样失败时只做语法检查。每个线程使用一个常驻Node进程
+    """
+    
+    MODES = ("parse", "smoke")
+    
+    def __init__(self, mode, timeout=5, workers=None, env=None):
+        self.mode = mode
+        self.timeout = timeout
+        self.env = env
+        self.checked = 0
+        self.smoke_skipped = 0
+        self.failed = []
+        self._lock = threading.Lock()
+        self._idle = queue.LifoQueue()
+        self._executor = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self._futures = []
+    
+    def submit(self, record, label, source, output):
+        """提交一个输出，校验结果写入record["validation"]"""
+        self._futures.append(self._executor.submit(self._validate, record, label, source, output))
+    
+    def close(self):
+        """等待所有校验完成并关闭Node进程"""
+        try:
+            for future in self._futures:
+                future.result()
+        finally:
+            self._executor.shutdown()
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+    
+    def _validate(self, record, label, source, output):
+        if record.get("variant"):
+            label = f"[{record['variant']}] {label}"
+        request = {
+            "name": Path(str(label)).name,
+            "output": output,
+            "source": source,
+            "smoke": self.mode == "smoke",
+            "timeout": int(self.timeout * 1000),
+        }
+        worker = self._acquire()
+        try:
+            # 冒烟运行最多执行两次（输出和原始代码），再留出解析大文件的时间
+            response = worker.request(request, self.timeout * 2 + 30)
+        except TimeoutError as e:
+            worker.kill()
+            response = {"ok": False, "stage": "timeout", "error": str(e)}
+        except Exception as e:
+            worker.kill()
+            response = {"ok": False, "stage": "error", "error": str(e)}
+        else:
+            self._idle.put(worker)
+        
+        with self._lock:
+            self.checked += 1
+            if not response["ok"]:
+                record["validation"] = f"{response['stage']}_failed"
+                record["error"] = response["error"]
+                self.failed.append(f"{label} [{response['stage']}: {response['error']}]")
+                print(f"🧪 校验未通过: {label} [{response['stage']}: {response['error']}]")
+            elif response.get("skipped"):
+                record["validation"] = "smoke_skipped"
+                self.smoke_skipped += 1
+            else:
+                record["validation"] = "ok"
+    
+    def _acquire(self):
+        try:
+            worker = self._idle.get_nowait()
+        except queue.Empty:
+            return _NodeWorker(VALIDATOR_SCRIPT, env=self.env, node_args=["--experimental-vm-modules", "--no-warnings"])
+        if worker.process.poll() is not None:
+            worker.close()
+            return self._acquire()
+        return worker
 
 
 class JSObfuscator:
-    def __init__(self, options: Optional[Dict[str, Any]] = None, config_file: Optional[str] = None, config_section: str = "DEFAULT"):
+    def __init__(self, options: Optional[Dict[str, Any]] = None, config_file: Optional[str] = None, config_section: str = "DEFAULT",
+                 settings: Optional[Dict[str, Any]] = None):
         """
         JavaScript 混淆器
         
@@ -24,15 +1796,43 @@ class JSObfuscator:
             options: 混淆选项字典
             config_file: INI配置文件路径（可选）
             config_section: 配置文件中使用的section名称（默认：DEFAULT）
+            settings: 运行设置字典（超时等），覆盖配置文件[SETTINGS]中的值
         """
         # 加载配置
+        self.config_file = config_file
+        self.config_section = config_section
         self.config = self._load_config(config_file, config_section)
+        self.size_tiers = self._load_size_tiers(config_file)
+        self.path_rules, self._path_rule_matcher = self._load_path_rules(config_file)
+        self.settings = self._load_settings(config_file, settings)
+        if self.settings["lowPriority"]:
+            applied = lower_process_priority()
+            if applied:
+                print(f"🐢 已降低进程优先级: {'，'.join(applied)}")
         
         # 合并用户提供的选项
+        self._user_options = copy.deepcopy(options) if options else None
         if options:
             self._merge_options(self.config, options)
         
         self.options = self.config
+        self._fallback_options = None
+        self._backend = None
+        self._backend_lock = threading.Lock()
+        self._section_options = {}
+        self._path_rule_cache = {}
+        self._memory_budget = None  # (memoryBudget设置, 预算字节数)
+        self._cpu_limit = None
+        self._input_root = None
+        self._shared_globals = {}
+        self._extension_roles = {}
+        self._cache = self._create_cache()
+        self.run_report = self._new_run_report()
+        self._precompressor = None
+        self._validator = None
+        self._in_run = False        # 正在进行目录混淆，由其统一生成压缩副本和校验输出
+        self._variant = None
+        self._profiler = None
         
         # 检查Node.js是否已安装
         if not self._check_nodejs_installed():
@@ -40,7 +1840,7 @@ class JSObfuscator:
             
         # 检查是否安装了javascript-obfuscator
         try:
-            self._run_npm_command(["npx", "javascript-obfuscator", "--version"])
+            self._run_npm_command(["npx", "javascript-obfuscator", "--version"], env=dict(os.environ, **self._get_node_env()))
         except Exception:
             print("正在安装javascript-obfuscator...")
             try:
@@ -107,22 +1907,12 @@ class JSObfuscator:
             loaded_config = {}
             for key, default_value in config_dict.items():
                 if key in section_config:
-                    config_value = section_config[key]
-                    # 根据默认值类型转换配置值
-                    if isinstance(default_value, bool):
-                        loaded_config[key] = config_value.lower() in ('true', '1', 'yes', 'on')
-                    elif isinstance(default_value, (int, float)):
-                        loaded_config[key] = type(default_value)(config_value)
-                    elif isinstance(default_value, list):
-                        # 处理列表类型（如stringArrayEncoding）
-                        if config_value.strip():
-                            loaded_config[key] = [item.strip() for item in config_value.split(',')]
-                        else:
-                            loaded_config[key] = []
-                    else:
-                        loaded_config[key] = config_value
+                    loaded_config[key] = self._convert_config_value(default_value, section_config[key])
                 else:
                     loaded_config[key] = default_value
+            for key, type_value in EXTRA_OPTION_TYPES.items():
+                if key in section_config:
+                    loaded_config[key] = self._convert_config_value(type_value, section_config[key])
             
             print(f"✅ 成功从 {config_file}[{config_section}] 加载配置")
             return loaded_config
@@ -131,6 +1921,430 @@ class JSObfuscator:
             print(f"❌ 加载配置文件失败: {e}")
             print("使用默认配置")
             return config_dict
+    
+    def _convert_config_value(self, default_value, config_value):
+        """根据默认值类型转换INI中的字符串配置值"""
+        if isinstance(default_value, bool):
+            return config_value.lower() in ('true', '1', 'yes', 'on')
+        elif isinstance(default_value, (int, float)):
+            return type(default_value)(config_value)
+        elif isinstance(default_value, list):
+            # 处理列表类型（如stringArrayEncoding）
+            if config_value.strip():
+                return [item.strip() for item in config_value.split(',')]
+            return []
+        return config_value
+    
+    def _read_raw_config(self, config_file):
+        """
+        读取INI配置文件的原始内容
+        
+        与_load_config不同，这里保留键名大小写，且各section不继承DEFAULT中的值，
+        用于读取分级、规则等只包含部分键的section
+        """
+        config_parser = configparser.ConfigParser(default_section="__NO_DEFAULT__", interpolation=None)
+        config_parser.optionxform = str
+        config_parser.read(config_file, encoding='utf-8')
+        return config_parser
+    
+    def _read_option_overrides(self, section_config) -> Dict[str, Any]:
+        """从section中读取混淆选项覆盖值（只包含section中显式出现的键）"""
+        default_options = dict(self._get_default_options(), **EXTRA_OPTION_TYPES)
+        option_names = {key.lower(): key for key in default_options}
+        overrides = {}
+        for raw_key, config_value in section_config.items():
+            key = option_names.get(raw_key.lower())
+            if key:
+                overrides[key] = self._convert_config_value(default_options[key], config_value)
+        return overrides
+    
+    def _load_size_tiers(self, config_file: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        从INI配置文件加载按文件大小分级的混淆选项
+        
+        以SIZE_TIER开头的section表示一个分级，minSize为生效的最小文件大小，
+        其余键为覆盖的混淆选项，例如:
+        
+            [SIZE_TIER_1MB]
+            minSize = 1MB
+            controlFlowFlattening = false
+        
+        Returns:
+            按minSize从大到小排序的分级列表
+        """
+        if not config_file or not Path(config_file).exists():
+            return []
+        
+        tiers = []
+        try:
+            config_parser = self._read_raw_config(config_file)
+            for section in config_parser.sections():
+                if not section.upper().startswith(SIZE_TIER_PREFIX):
+                    continue
+                section_config = config_parser[section]
+                min_size = next((v for k, v in section_config.items() if k.lower() == "minsize"), None)
+                if min_size is None:
+                    print(f"⚠️  分级配置 [{section}] 缺少minSize，已忽略")
+                    continue
+                tiers.append({
+                    "name": section,
+                    "minSize": parse_size(min_size),
+                    "options": self._read_option_overrides(section_config),
+                })
+        except Exception as e:
+            print(f"❌ 加载分级配置失败: {e}")
+            return []
+        
+        tiers.sort(key=lambda tier: tier["minSize"], reverse=True)
+        return tiers
+    
+    def _load_path_rules(self, config_file: Optional[str] = None):
+        """
+        从INI配置文件的[PATH_RULES]加载按路径选择配置section的规则
+        
+        每行为 glob = section名称，按书写顺序匹配，第一个匹配的规则生效，例如:
+        
+            [PATH_RULES]
+            src/render/*.js = LIGHTWEIGHT
+            **/crypto*.js = LIGHTWEIGHT
+        
+        glob匹配相对输入目录（归档为条目名，单个文件为当前目录）的路径，从开头匹配到结尾；
+        * 和 ? 不匹配 /，** 匹配任意多级目录
+        
+        Returns:
+            (规则列表, 预编译的匹配正则)，没有规则时正则为None
+        """
+        if not config_file or not Path(config_file).exists():
+            return [], None
+        
+        rules = []
+        try:
+            config_parser = self._read_raw_config(config_file)
+            if PATH_RULES_SECTION not in config_parser:
+                return [], None
+            for pattern, section in config_parser[PATH_RULES_SECTION].items():
+                section = section.strip()
+                if section not in config_parser:
+                    print(f"⚠️  路径规则 {pattern} 指向的section [{section}] 不存在，已忽略")
+                    continue
+                rules.append({"pattern": pattern, "section": section})
+        except Exception as e:
+            print(f"❌ 加载路径规则失败: {e}")
+            return [], None
+        if not rules:
+            return [], None
+        
+        # 所有规则合并为一个正则，每条规则一个命名分组；分组按规则顺序尝试，保证第一个匹配的规则生效
+        matcher = re.compile("(?s:" + "|".join(
+            f"(?P<rule{index}>{_glob_to_regex(rule['pattern'])})" for index, rule in enumerate(rules)) + r")\Z")
+        return rules, matcher
+    
+    def _match_path_rule(self, file_path):
+        """返回匹配文件路径的第一条规则（没有则返回None），每个路径只匹配一次"""
+        if self._path_rule_matcher is None:
+            return None
+        key = str(file_path)
+        if key not in self._path_rule_cache:
+            match = self._path_rule_matcher.match(self._get_rule_path(key))
+            self._path_rule_cache[key] = self.path_rules[int(match.lastgroup[4:])] if match else None
+        return self._path_rule_cache[key]
+    
+    def _get_rule_path(self, file_path):
+        """路径规则匹配的相对路径：归档条目为条目名，其余相对输入目录（没有时为当前目录），都不在其中时为文件名"""
+        if "!/" in file_path:
+            return file_path.split("!/", 1)[1]
+        path = Path(os.path.abspath(file_path))
+        for root in (self._input_root, Path.cwd()):
+            if root is not None:
+                try:
+                    return path.relative_to(os.path.abspath(root)).as_posix()
+                except ValueError:
+                    pass
+        return path.name
+    
+    def _get_default_settings(self) -> Dict[str, Any]:
+        """
+        获取默认运行设置
+        
+        Returns:
+            默认运行设置字典
+        """
+        return {
+            "timeout": 300,                 # 单个文件混淆超时时间（秒），0表示不限制
+            "fallbackSection": "MINIMAL",   # 超时后重试使用的INI section
+            "workers": 0,                   # 并行混淆的任务数，0表示按可用CPU数（含容器CPU配额）和内存预算自动确定
+            "lowPriority": False,           # 降低本进程和Node子进程的CPU和IO优先级，避免占满共享构建机
+            "memoryBudget": "auto",         # 并行任务估算内存总和上限，auto为物理内存（容器内为cgroup内存上限）的75%，0表示不限制
+            "dedupe": True,                 # 内容和混淆选项都相同的文件只混淆一次
+            "hardlinkDuplicates": True,     # 重复文件的输出尽量使用硬链接
+            "autoPassthrough": True,        # 已压缩和第三方库文件直接复制，不混淆
+            "passthroughPatterns": [        # 直接复制的文件（相对路径的glob）
+                "*.min.js", "*-min.js",
+                "vendor/*", "*/vendor/*", "node_modules/*", "*/node_modules/*",
+                "third_party/*", "*/third_party/*",
+            ],
+            "passthroughAllowlist": "",     # 额外的直接复制列表文件，每行一个glob
+            "obfuscatePatterns": [],        # 始终混淆的文件（优先于自动判断）
+            "minifiedLineLength": 500,      # 平均行长超过该值视为已压缩
+            "minifiedWhitespaceRatio": 0.05,  # 空白字符占比低于该值视为已压缩
+            "precompress": [],              # 为输出生成的压缩副本格式：gzip、brotli
+            "precompressExtensions": [      # 生成压缩副本的文件扩展名
+                ".js", ".mjs", ".css", ".html", ".htm", ".json", ".svg", ".txt", ".xml", ".map", ".wasm",
+            ],
+            "gzipLevel": 9,                 # gzip压缩级别（1-9）
+            "brotliQuality": 11,            # brotli压缩质量（0-11）
+            "reproducible": False,          # 由相对路径、文件内容和seedSalt确定seed，相同输入得到相同输出
+            "seedSalt": "",                 # 项目级的seed盐值
+            "metricsFile": "",              # 每个文件一条JSONL记录的指标文件
+            "prometheusFile": "",           # 本次运行汇总指标的Prometheus textfile
+            "backend": "npx",               # 混淆后端：npx（每个文件一个进程）、worker（常驻Node进程）、embedded（进程内V8）
+            "embeddedScript": "",           # embedded后端使用的javascript-obfuscator浏览器版脚本，留空时自动查找
+            "compileCacheDir": "auto",      # Node编译缓存目录（NODE_COMPILE_CACHE，Node 22.1+），auto为用户缓存目录，留空表示不使用
+            "cacheDir": "",                 # 本地结果缓存目录，留空表示不使用
+            "cacheUrl": "",                 # 远程结果缓存地址（HTTP GET/PUT），留空表示不使用
+            "cacheToken": "",               # 访问远程缓存的Bearer token
+            "cacheTimeout": 5,              # 远程缓存请求超时时间（秒）
+            "cacheMaxEntrySize": "8MB",     # 单个缓存条目的大小上限，超过时不上传也不下载
+            "cacheConcurrency": 16,         # 并发的远程缓存请求数
+            "extensionMode": False,         # 按manifest.json确定浏览器扩展中各JS文件的角色和混淆配置
+            "unreferencedJs": "report",     # manifest未引用的JS：report（照常混淆并列出）或skip（不混淆也不输出）
+            "backgroundSection": "",        # 各角色使用的INI section，留空表示使用当前section
+            "contentScriptSection": "",
+            "webAccessibleSection": "",
+            "pageScriptSection": "",
+            "variants": [],                 # 多变体构建的INI section列表，每个section输出到输出目录下的同名子目录
+            "pyProfile": "",                # 用cProfile分析Python侧开销，写入的pstats文件，留空表示不分析
+            "traceMemory": "",              # 用tracemalloc跟踪Python侧内存分配，写入的报告文件，留空表示不跟踪
+            "traceMemoryInterval": 1000,    # 每处理多少个文件做一次内存快照
+            "traceMemoryTop": 20,           # 报告中列出的耗时函数和分配位置数
+            "splitBundles": False,          # 识别webpack/browserify打包文件的模块表，按模块并行混淆后重新组装
+            "splitMinSize": "512KB",        # 按模块拆分的最小文件大小
+            "stripSource": False,           # 混淆前去掉注释和空白（保留许可证注释），减少混淆器的解析量和输出体积
+            "globalSymbolIndex": False,     # 建立跨文件全局符号索引，开启renameGlobals并保留被其他文件使用的全局名称
+            "symbolIndexFile": "auto",      # 符号索引的保存位置，auto为用户缓存目录，留空表示不保存
+            "validate": "",                 # 输出校验：parse（解析语法）或smoke（解析后在沙箱中执行顶层代码），留空表示不校验
+            "validateTimeout": 5,           # 冒烟运行的超时时间（秒）
+            "maxOutputSize": "0",           # 单个输出文件的大小上限，0表示不限制
+            "maxTotalOutputSize": "0",      # 全部JS输出的大小上限，0表示不限制
+            "maxExpansionRatio": 0.0,       # 单个文件的膨胀率（输出/输入）上限，0表示不限制
+            "maxTotalExpansionRatio": 0.0,  # 全部JS的膨胀率上限，0表示不限制
+            "sizeBaseline": "",             # 作为基线的上一次运行的指标文件（metricsFile），留空表示不与基线比较
+            "maxSizeGrowth": 0.1,           # 与基线相比输出大小允许增长的比例（单个文件和合计）
+        }
+    
+    def _load_settings(self, config_file: Optional[str] = None, settings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        加载运行设置：默认值 < 配置文件[SETTINGS] < settings参数
+        
+        Args:
+            config_file: INI配置文件路径
+            settings: 用户提供的运行设置
+            
+        Returns:
+            运行设置字典
+        """
+        loaded_settings = self._get_default_settings()
+        
+        if config_file and Path(config_file).exists():
+            try:
+                config_parser = self._read_raw_config(config_file)
+                if SETTINGS_SECTION in config_parser:
+                    setting_names = {key.lower(): key for key in loaded_settings}
+                    for raw_key, config_value in config_parser[SETTINGS_SECTION].items():
+                        key = setting_names.get(raw_key.lower())
+                        if key:
+                            loaded_settings[key] = self._convert_config_value(loaded_settings[key], config_value)
+                        else:
+                            print(f"⚠️  未知的运行设置 {raw_key}，已忽略")
+            except Exception as e:
+                print(f"❌ 加载运行设置失败: {e}")
+        
+        if settings:
+            loaded_settings.update(settings)
+        return loaded_settings
+    
+    def _get_fallback_options(self) -> Dict[str, Any]:
+        """获取超时后使用的降级混淆选项（首次超时时加载）"""
+        if self._fallback_options is None:
+            self._fallback_options = self._load_fallback_options()
+        return self._fallback_options
+    
+    def _load_fallback_options(self) -> Dict[str, Any]:
+        """
+        加载超时后使用的降级混淆选项
+        
+        优先使用配置文件中fallbackSection指定的section，否则使用内置的轻量配置；
+        当前配置中的seed、domainLock等选项（PINNED_OPTIONS）保持不变
+        """
+        section = self.settings["fallbackSection"]
+        fallback_options = None
+        if self.config_file and Path(self.config_file).exists():
+            config_parser = configparser.ConfigParser()
+            config_parser.read(self.config_file, encoding='utf-8')
+            if section in config_parser:
+                fallback_options = self._load_config(self.config_file, section)
+        
+        if fallback_options is None:
+            fallback_options = self._get_default_options()
+            fallback_options.update({
+                "controlFlowFlattening": False,
+                "deadCodeInjection": False,
+                "selfDefending": False,
+                "splitStrings": False,
+                "stringArrayEncoding": [],
+                "transformObjectKeys": False,
+            })
+        fallback_options.update({key: self.options[key] for key in PINNED_OPTIONS if key in self.options})
+        return fallback_options
+    
+    def _get_role_options(self, role):
+        """
+        获取扩展中某一角色的JS文件使用的基础混淆选项（首次使用时加载）
+        
+        Returns:
+            (混淆选项, section名称)，未为该角色设置section时返回 (None, None)
+        """
+        section = self.settings[_ROLE_SECTION_SETTINGS[role]]
+        if not section:
+            return None, None
+        return self._get_section_options(section), section
+    
+    def _get_section_options(self, section):
+        """获取配置文件中某个section的混淆选项（首次使用时加载）"""
+        if section not in self._section_options:
+            self._section_options[section] = self._load_config(self.config_file, section)
+        return self._section_options[section]
+    
+    def _new_run_report(self) -> Dict[str, Any]:
+        """创建一次运行的汇总记录"""
+        return {
+            "timed_out": [],   # 超时的文件
+            "fallback": [],    # 超时后使用降级配置混淆成功的文件
+            "failed": [],      # 混淆失败的文件
+            "peak_rss": 0,     # 混淆进程树的峰值内存（字节）
+            "duplicates": 0,   # 内容和混淆选项都相同、复用混淆结果的文件数
+            "passthrough": [], # 判断为已压缩或第三方库、直接复制的文件
+            "unreferenced": [], # 扩展模式下manifest未引用的JS文件
+            "invalid": [],     # 输出未通过校验的文件
+            "over_budget": [], # 超出体积预算的文件和合计
+            "validated": 0,    # 校验过的输出数
+            "smoke_skipped": 0,  # 原始代码在沙箱中无法运行、只做了语法检查的输出数
+            "precompressed": 0,          # 新生成的压缩副本数
+            "precompress_unchanged": 0,  # 内容未变、跳过重新压缩的副本数
+            "precompress_failed": [],    # 生成压缩副本失败的文件（混淆输出本身正常）
+            "profiles": {},    # 文件路径 -> 使用的配置（section及附加的特殊处理）
+            "path_rules": {},  # 文件路径 -> 匹配的路径规则glob
+            "cached": {},      # 文件路径 -> 命中的结果缓存（local / remote）
+            "stripped": {},    # 文件路径 -> 去掉注释和空白前后的字符数
+            "files": [],       # 每个JS文件的指标记录
+            "started": time.time(),
+        }
+    
+    def _print_run_report(self):
+        """打印超时、降级和失败文件列表"""
+        sections = [
+            ("passthrough", "⏭️  直接复制未混淆的JS文件"),
+            ("unreferenced", "👻 manifest未引用的JS文件" + ("（未输出）" if self.settings["unreferencedJs"] == "skip" else "")),
+            ("timed_out", "⏱️  混淆超时的文件"),
+            ("fallback", "🔁 使用降级配置混淆的文件"),
+            ("failed", "❌ 混淆失败的文件"),
+            ("invalid", "🧪 输出未通过校验的文件"),
+            ("precompress_failed", "🗜️  生成压缩副本失败的文件"),
+        ]
+        for key, title in sections:
+            files = self.run_report[key]
+            if files:
+                print(f"{title} ({len(files)}):")
+                for file in files:
+                    print(f"  - {file}")
+        
+        if self.run_report["path_rules"]:
+            print(f"🎯 按路径规则选择配置的文件 ({len(self.run_report['path_rules'])}):")
+            for path, pattern in self.run_report["path_rules"].items():
+                print(f"  - {path}: {pattern} -> {self.run_report['profiles'].get(path, '')}")
+        if self.run_report["precompressed"] or self.run_report["precompress_unchanged"]:
+            print(f"🗜️  生成压缩副本 {self.run_report['precompressed']} 个，"
+                  f"内容未变跳过 {self.run_report['precompress_unchanged']} 个")
+        if self.run_report["validated"]:
+            print(f"🧪 校验输出 {self.run_report['validated']} 个，未通过 {len(self.run_report['invalid'])} 个"
+                  + (f"，{self.run_report['smoke_skipped']} 个原始代码无法在沙箱中运行、只检查了语法"
+                     if self.run_report["smoke_skipped"] else ""))
+        if self.run_report["stripped"]:
+            before, after = (sum(sizes) for sizes in zip(*self.run_report["stripped"].values()))
+            print(f"✂️  混淆前去掉注释和空白 {len(self.run_report['stripped'])} 个文件，"
+                  f"输入从 {before} 个字符减少到 {after} 个（-{1 - after / max(before, 1):.1%}）")
+        if self.run_report["duplicates"]:
+            print(f"♻️  {self.run_report['duplicates']} 个重复文件复用了相同内容的混淆结果")
+        if self.run_report["cached"]:
+            tiers = list(self.run_report["cached"].values())
+            print(f"💾 结果缓存命中 {len(tiers)} 个文件（本地 {tiers.count('local')}，远程 {tiers.count('remote')}）")
+        if self.run_report["peak_rss"]:
+            print(f"📈 混淆进程树峰值内存: {self.run_report['peak_rss'] / 1024 ** 2:.1f} MB")
+    
+    def _get_worker_count(self) -> int:
+        """
+        获取并行混淆的任务数
+        
+        未指定时按实际可用的CPU数（考虑容器的CPU配额）确定，且每个任务至少能分到NODE_BASE_MEMORY的内存预算
+        """
+        workers = int(self.settings["workers"])
+        if workers > 0:
+            return workers
+        if self._cpu_limit is None:
+            self._cpu_limit = get_cpu_limit()
+        workers = self._cpu_limit
+        budget = self._get_memory_budget()
+        if budget:
+            workers = min(workers, max(budget // NODE_BASE_MEMORY, 1))
+        return workers
+    
+    def _get_memory_budget(self) -> int:
+        """
+        获取并行任务的内存预算（字节），0表示不限制
+        
+        运行期间预算不变，cgroup和物理内存只在第一次使用（或memoryBudget设置改变）时读取
+        """
+        budget = str(self.settings["memoryBudget"]).strip()
+        if self._memory_budget is None or self._memory_budget[0] != budget:
+            if budget.lower() == "auto":
+                total_memory = get_total_memory()
+                value = int(total_memory * 0.75) if total_memory else 0
+            else:
+                value = parse_size(budget)
+            self._memory_budget = (budget, value)
+        return self._memory_budget[1]
+    
+    def _estimate_job_memory(self, size, options) -> int:
+        """
+        根据输入大小和混淆选项估算单个混淆任务的峰值内存（字节）
+        
+        AST及各项变换的内存占用大致与输入大小成正比，控制流平坦化和无用代码注入的放大最明显
+        """
+        factor = 16
+        if options.get("controlFlowFlattening"):
+            factor += 48 * options.get("controlFlowFlatteningThreshold", 0.75)
+        if options.get("deadCodeInjection"):
+            factor += 32 * options.get("deadCodeInjectionThreshold", 0.4)
+        if options.get("stringArray"):
+            factor += 8 * options.get("stringArrayThreshold", 0.75)
+        if options.get("splitStrings"):
+            factor += 8
+        return int(NODE_BASE_MEMORY + size * factor)
+    
+    def _get_node_heap_limit(self, size, options) -> int:
+        """获取传给Node的--max-old-space-size（MB）：估算值的两倍，不超过内存预算"""
+        heap_mb = max(2 * self._estimate_job_memory(size, options) // 1024 ** 2, 1024)
+        budget = self._get_memory_budget()
+        if budget:
+            heap_mb = max(min(heap_mb, budget // 1024 ** 2), 512)
+        return heap_mb
+    
+    def _get_size_tier(self, size):
+        """返回适用于指定文件大小的分级（没有则返回None）"""
+        for tier in self.size_tiers:
+            if size >= tier["minSize"]:
+                return tier
+        return None
       
     def _get_default_options(self) -> Dict[str, Any]:
         """
@@ -173,12 +2387,18 @@ class JSObfuscator:
         try:
             # 尝试运行node --version
             result = self._run_npm_command(["node", "--version"], capture_output=True)
-            print(f"检测到Node.js版本: {result.stdout.decode('utf-8').strip()}")
+            self.node_version = result.stdout.decode('utf-8').strip()
+            print(f"检测到Node.js版本: {self.node_version}")
+            
+            # NODE_COMPILE_CACHE需要Node 22.1+，更早的版本会忽略该变量
+            version = tuple(int(part) for part in re.findall(r'\d+', self.node_version)[:2])
+            if self.settings["compileCacheDir"] not in ("", "auto") and version < (22, 1):
+                print(f"⚠️  Node {self.node_version} 不支持编译缓存（需要22.1+），compileCacheDir不会生效")
             return True
         except Exception:
             return False
             
-    def _run_npm_command(self, cmd, capture_output=False):
+    def _run_npm_command(self, cmd, capture_output=False, env=None):
         """运行npm相关命令，处理Windows和其他系统的区别"""
         try:
             # 在Windows上，可能需要添加.cmd后缀
@@ -189,6 +2409,7 @@ class JSObfuscator:
                 cmd,
                 stdout=subprocess.PIPE if capture_output else None,
                 stderr=subprocess.PIPE if capture_output else None,
+                env=env,
                 check=True
             )
         except (subprocess.CalledProcessError, FileNotFoundError) as e:
@@ -224,13 +2445,50 @@ class JSObfuscator:
         
         return False
     
-    def get_obfuscation_options_for_file(self, file_path, js_code):
-        """根据文件类型获取适合的混淆选项"""
-        options = self.options.copy()
+    def _is_background_script(self, file_path, js_code):
+        """扩展模式下按manifest中的角色判断，否则按文件名和扩展API判断是否为background脚本"""
+        role = self._extension_roles.get(str(file_path))
+        if role:
+            return role == "background"
+        return self.is_browser_extension_background(file_path, js_code)
+    
+    def get_obfuscation_options_for_file(self, file_path, js_code, base_options=None, profile_name=None):
+        """
+        根据文件类型获取适合的混淆选项
+        
+        Args:
+            file_path: 文件路径
+            js_code: 文件内容
+            base_options: 基础混淆选项（默认为当前配置）
+            profile_name: 基础选项对应的配置名称，记录在指标中（默认为当前section）
+        """
+        # 路径规则优先于角色对应的section，例如对性能敏感的文件使用轻量配置
+        rule = self._match_path_rule(file_path) if base_options is None else None
+        
+        # 扩展模式下由manifest确定角色，不再根据文件名和源码判断
+        role = self._extension_roles.get(str(file_path))
+        if base_options is None and role:
+            base_options, profile_name = self._get_role_options(role)
+        
+        if rule:
+            base_options, profile_name = self._get_section_options(rule["section"]), rule["section"]
+            self.run_report["path_rules"][str(file_path)] = rule["pattern"]
+        
+        options = (self.options if base_options is None else base_options).copy()
+        if rule:
+            # 与降级配置相同，seed、domainLock等选项沿用当前配置（多变体构建时为各变体的值）
+            options.update({key: self.options[key] for key in PINNED_OPTIONS if key in self.options})
+        profile = [profile_name or self.config_section]
+        if role and role != "background":
+            profile.append(role)
         
         # 检查是否为浏览器扩展的background.js
-        if self.is_browser_extension_background(file_path, js_code):
-            print(f"检测到浏览器扩展的background.js文件: {file_path}")
+        if self._is_background_script(file_path, js_code):
+            profile.append("background")
+            if role:
+                print(f"manifest声明的background脚本: {file_path}")
+            else:
+                print(f"检测到浏览器扩展的background.js文件: {file_path}")
             print("使用特殊混淆选项，避免使用window对象")
             
             # 为background.js设置特殊选项
@@ -252,8 +2510,96 @@ class JSObfuscator:
                 print(f"检测到代码中包含对象属性访问，禁用transformObjectKeys: {file_path}")
                 options["transformObjectKeys"] = False
         
+        # 按文件大小应用分级选项，限制大文件的混淆耗时和体积膨胀
+        if self.size_tiers:
+            if os.path.isfile(file_path):
+                size = os.path.getsize(file_path)
+            else:
+                size = len(_source_bytes(js_code))
+            tier = self._get_size_tier(size)
+            if tier:
+                print(f"文件大小 {size} 字节，应用分级配置 [{tier['name']}]: {file_path}")
+                options.update(tier["options"])
+                profile.append(tier["name"])
+        
+        # 全局符号索引中的文件开启renameGlobals，被其他文件使用的全局名称加入reservedNames
+        shared_globals = self._shared_globals.get(str(file_path))
+        if shared_globals is not None:
+            options["renameGlobals"] = True
+            options["reservedNames"] = list(options.get("reservedNames") or []) + [
+                f"^{re.escape(name)}$" for name in shared_globals]
+        
+        self.run_report["profiles"][str(file_path)] = "+".join(profile)
         return options
     
+    def classify_js_file(self, file_path, rel_path=None, js_code=None):
+        """
+        混淆前快速判断JS文件是否需要混淆
+        
+        依次检查obfuscatePatterns、直接复制的glob、文件开头的第三方许可证声明，
+        以及行长和空白字符占比（已压缩的代码行很长、几乎没有空白）
+        
+        Args:
+            file_path: 文件路径
+            rel_path: 用于匹配glob的相对路径（默认使用file_path）
+            js_code: 已读入内存的文件内容（如归档中的条目），提供时不再读取文件
+            
+        Returns:
+            (类别, 原因)，类别为 "obfuscate"、"passthrough"（匹配glob）、"third-party" 或 "minified"
+        """
+        rel_path = Path(rel_path or file_path).as_posix()
+        
+        if self._match_patterns(rel_path, self.settings["obfuscatePatterns"]):
+            return "obfuscate", "匹配obfuscatePatterns"
+        
+        pattern = self._match_patterns(rel_path, self._get_passthrough_patterns())
+        if pattern:
+            return "passthrough", f"匹配 {pattern}"
+        
+        if js_code is not None:
+            sample = js_code[:CLASSIFY_SAMPLE_SIZE]
+        else:
+            with open(file_path, 'rb') as f:
+                sample = f.read(CLASSIFY_SAMPLE_SIZE).decode('utf-8', errors='ignore')
+        
+        head = sample[:2048]
+        if _LICENSE_MARKER_RE.search(head) and _LICENSE_TEXT_RE.search(head):
+            return "third-party", "包含第三方库许可证声明"
+        
+        if len(sample) >= 1024:
+            average_line_length = len(sample) / (sample.count('\n') + 1)
+            if average_line_length >= self.settings["minifiedLineLength"]:
+                return "minified", f"平均行长 {average_line_length:.0f}"
+            
+            whitespace = sum(sample.count(char) for char in ' \t\r\n')
+            whitespace_ratio = whitespace / len(sample)
+            if whitespace_ratio <= self.settings["minifiedWhitespaceRatio"]:
+                return "minified", f"空白字符占比 {whitespace_ratio:.1%}"
+        
+        return "obfuscate", ""
+    
+    def _get_passthrough_patterns(self):
+        """获取直接复制的glob列表（包括passthroughAllowlist文件中的条目）"""
+        patterns = list(self.settings["passthroughPatterns"])
+        allowlist = self.settings["passthroughAllowlist"]
+        if allowlist:
+            try:
+                with open(allowlist, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if line and not line.startswith('#'):
+                            patterns.append(line)
+            except OSError as e:
+                print(f"⚠️  读取直接复制列表 {allowlist} 失败: {e}")
+        return patterns
+    
+    def _match_patterns(self, rel_path, patterns):
+        """返回第一个匹配相对路径的glob，没有则返回None"""
+        for pattern in patterns:
+            if fnmatch.fnmatch(rel_path, pattern):
+                return pattern
+        return None
+    
     def _should_disable_transform_object_keys(self, js_code):
         """
         检查代码中是否包含需要保留对象键名的模式
@@ -325,68 +2671,274 @@ class JSObfuscator:
         
         return False
     
-    def obfuscate_js(self, js_code, file_path=None):
-        """混淆单个JS代码字符串"""
+    def obfuscate_js(self, js_code, file_path=None, options=None, rel_path=None):
+        """
+        混淆单个JS代码字符串，超时后使用降级配置重试一次
+        
+        Args:
+            js_code: JS代码
+            file_path: 文件路径（用于确定混淆选项）
+            options: 预先计算好的混淆选项（默认根据文件自动确定）
+            rel_path: 可复现模式下参与计算seed的相对路径（默认为文件名）
+        """
+        return "".join(self._obfuscate_js_parts(js_code, file_path, options, rel_path))
+    
+    def _obfuscate_js_parts(self, js_code, file_path=None, options=None, rel_path=None):
+        """obfuscate_js的实现，返回依次拼接即为结果的若干段代码（background脚本为环境适配头和混淆后的代码）"""
         # 获取适合该文件的混淆选项
-        options = self.options
-        if file_path:
-            options = self.get_obfuscation_options_for_file(file_path, js_code)
+        if options is None:
+            options = self.options
+            if file_path:
+                options = self.get_obfuscation_options_for_file(file_path, js_code)
         
-        # 创建临时文件
-        with tempfile.NamedTemporaryFile(suffix='.js', delete=False) as temp_in:
-            temp_in.write(js_code.encode('utf-8'))
-            temp_in_path = temp_in.name
-            
-        with tempfile.NamedTemporaryFile(suffix='.js', delete=False) as temp_out:
-            temp_out_path = temp_out.name
-            
-        # 创建配置文件
-        config_path = tempfile.mktemp(suffix='.json')
-        with open(config_path, 'w', encoding='utf-8') as f:
-            json.dump(options, f)
+        seed_path = rel_path or (os.path.basename(file_path) if file_path else "")
+        label = file_path or "<代码字符串>"
+        if self.settings["stripSource"]:
+            js_code = self._strip_source(js_code, label)
+        
+        obfuscated_code = None
+        if self.settings["splitBundles"] and len(js_code) >= parse_size(self.settings["splitMinSize"]):
+            obfuscated_code = self._obfuscate_bundle(js_code, file_path, options, seed_path, label)
+        if obfuscated_code is None:
+            obfuscated_code = self._obfuscate_with_fallback(js_code, options, file_path, seed_path, label)
+        
+        # 如果是background.js文件，进行额外处理
+        if file_path and self._is_background_script(file_path, js_code):
+            # 替换可能导致问题的全局引用
+            return self._background_js_parts(obfuscated_code)
             
+        return [obfuscated_code]
+    
+    def _strip_source(self, js_code, label=None):
+        """混淆前去掉注释和空白，无法切分的代码原样返回；label为None时（提前查询缓存）不打印也不记入汇总"""
         try:
-            # 构建javascript-obfuscator命令
-            cmd = ["npx", "javascript-obfuscator", 
-                  temp_in_path, 
-                  "--output", temp_out_path,
-                  "--config", config_path]
-            
-            # 执行混淆命令 - 使用shell=True在Windows上更可靠
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True, shell=True)
+            stripped = strip_source(js_code)
+        except JSSyntaxError as e:
+            if label is not None:
+                print(f"⚠️  无法去掉注释和空白，按原始代码混淆: {label}: {e}")
+            return js_code
+        if label is not None:
+            self.run_report["stripped"][str(label)] = (len(js_code), len(stripped))
+        return stripped
+    
+    def _obfuscate_with_fallback(self, js_code, options, file_path, seed_path, label, file_code=None):
+        """
+        混淆一段代码，超时后使用降级配置重试一次
+        
+        Args:
+            file_code: 代码所在文件的完整内容，用于确定降级选项（默认为js_code本身）
+        """
+        try:
+            return self._run_obfuscator_cached(js_code, self._apply_seed(options, seed_path, js_code), label)
+        except ObfuscationTimeoutError as e:
+            self.run_report["timed_out"].append(label)
+            print(f"⏱️  {e}，使用降级配置 [{self.settings['fallbackSection']}] 重试: {label}")
             
-            # 读取混淆后的代码
-            with open(temp_out_path, 'r', encoding='utf-8') as f:
-                obfuscated_code = f.read()
+            fallback_options = self._get_fallback_options()
+            if file_path:
+                fallback_options = self.get_obfuscation_options_for_file(
+                    file_path, file_code or js_code, fallback_options, self.settings["fallbackSection"])
+            fallback_options = self._apply_seed(fallback_options, seed_path, js_code)
+            obfuscated_code = self._run_obfuscator_cached(js_code, fallback_options, label)
+            self.run_report["fallback"].append(label)
+            return obfuscated_code
+    
+    def _obfuscate_bundle(self, js_code, file_path, options, seed_path, label):
+        """
+        按模块拆分混淆webpack/browserify打包文件
+        
+        每个模块函数单独混淆（并行执行、各自使用结果缓存），剩余的运行时代码中模块函数换成占位标识符后单独混淆，
+        最后把混淆后的模块放回占位处。模块中出现的标识符在运行时代码中保留原名，保证模块对外部变量的引用不变
+        
+        Returns:
+            混淆后的代码，无法识别模块表时返回None
+        """
+        modules = find_bundle_modules(js_code)
+        if not modules:
+            print(f"未识别出打包文件的模块表，按整个文件混淆: {label}")
+            return None
+        print(f"📦 识别出 {len(modules)} 个模块，按模块并行混淆: {label}")
+        
+        skeleton_parts = []
+        previous = 0
+        module_names = set()
+        for index, module in enumerate(modules):
+            skeleton_parts += [js_code[previous:module.start], f"__js_obfuscator_module_{index}__"]
+            previous = module.end
+            module_names |= identifier_names(js_code[module.start:module.end])
+        skeleton_parts.append(js_code[previous:])
+        skeleton = "".join(skeleton_parts)
+        shared_names = sorted(identifier_names(skeleton) & module_names)
+        skeleton_options = dict(options, reservedNames=list(options.get("reservedNames", []))
+                                + [f"^{re.escape(name)}$" for name in shared_names])
+        
+        # 目录和归档混淆时整个文件作为一个任务准入，模块和运行时代码改为各自按估算内存通过同一个准入控制，
+        # 等待期间归还整个文件预留的内存和任务数，总的Node进程数和内存不超过预算
+        gate = _MemoryGate.current()[0]
+        
+        def run_part(code, part_options, part_seed_path, part_label):
+            if gate is None:
+                return self._obfuscate_with_fallback(code, part_options, file_path, part_seed_path, part_label, js_code)
+            with gate.reserve(self._estimate_job_memory(len(code), part_options)):
+                return self._obfuscate_with_fallback(code, part_options, file_path, part_seed_path, part_label, js_code)
+        
+        def run_module(module):
+            # 模块函数作为赋值给未声明变量的表达式单独混淆，混淆结果包在函数中执行并返回该变量
+            module_code = f"{BUNDLE_EXPORT} = {js_code[module.start:module.end]};"
+            return run_part(module_code, options, f"{seed_path}#{module.key}", f"{label}#{module.key}")
+        
+        # 调用方本身就在线程池中，这里使用单独的线程池，避免等待同一个池中的任务
+        with ThreadPoolExecutor(max_workers=self._get_worker_count()) as executor, \
+                (gate.suspend() if gate else nullcontext()):
+            skeleton_future = executor.submit(run_part, skeleton, skeleton_options, seed_path, label)
+            obfuscated_modules = list(executor.map(run_module, modules))
+            obfuscated_skeleton = skeleton_future.result()
+        
+        placeholders = sorted(int(index) for index in BUNDLE_PLACEHOLDER_RE.findall(obfuscated_skeleton))
+        if placeholders != list(range(len(modules))):
+            print(f"⚠️  运行时代码混淆后模块占位符不完整，保留未混淆的运行时代码: {label}")
+            obfuscated_skeleton = skeleton
+        
+        cached = sum(1 for module in modules if f"{label}#{module.key}" in self.run_report["cached"])
+        print(f"📦 {len(modules)} 个模块混淆完成，其中 {cached} 个命中结果缓存: {label}")
+        self.run_report["profiles"][str(label)] = self.run_report["profiles"].get(str(label), self.config_section) + "+split"
+        return BUNDLE_PLACEHOLDER_RE.sub(
+            lambda match: f"(function(){{var {BUNDLE_EXPORT};{obfuscated_modules[int(match.group(1))]}\n"
+                          f"return {BUNDLE_EXPORT};}}).call(this)",
+            obfuscated_skeleton)
+    
+    def _apply_seed(self, options, seed_path, js_code):
+        """可复现模式下为混淆选项加入由路径和内容确定的seed，配置中的seed作为额外的盐值"""
+        if not self.settings["reproducible"]:
+            return options
+        return dict(options, seed=self.derive_seed(seed_path, js_code, options.get("seed")))
+    
+    def derive_seed(self, rel_path, js_code, config_seed=None):
+        """
+        由相对路径、文件内容和seedSalt计算稳定的seed
+        
+        Args:
+            rel_path: 文件相对路径（统一使用/分隔）
+            js_code: 文件内容
+            config_seed: section中配置的seed（如多变体构建中每个客户的seed），参与计算
             
-            # 如果是background.js文件，进行额外处理
-            if file_path and self.is_browser_extension_background(file_path, js_code):
-                # 替换可能导致问题的全局引用
-                obfuscated_code = self._fix_background_js_code(obfuscated_code)
-                
+        Returns:
+            1 ~ 2^31-1 之间的整数（javascript-obfuscator中seed为0表示随机）
+        """
+        digest = hashlib.sha256()
+        salt = str(self.settings["seedSalt"])
+        if config_seed:
+            salt += f"\0{config_seed}"
+        for part in (salt, Path(rel_path).as_posix(), js_code):
+            digest.update(_source_bytes(part))
+            digest.update(b'\0')
+        return int.from_bytes(digest.digest()[:8], 'big') % (2 ** 31 - 1) + 1
+    
+    def _run_obfuscator_cached(self, js_code, options, label):
+        """先查询结果缓存，未命中时混淆并写入缓存"""
+        if self._cache is None:
+            return self._run_obfuscator(js_code, options)
+        
+        key = self._get_cache_key(js_code, options)
+        obfuscated_code, tier = self._cache.get(key)
+        if obfuscated_code is not None:
+            self.run_report["cached"][str(label)] = tier
             return obfuscated_code
         
-        except subprocess.CalledProcessError as e:
-            # 清理临时文件
-            for path in [temp_in_path, temp_out_path, config_path]:
-                try:
-                    os.unlink(path)
-                except:
-                    pass
-            raise RuntimeError(f"JavaScript混淆失败: {e.stderr}")
-        except Exception as e:
-            # 清理临时文件
-            for path in [temp_in_path, temp_out_path, config_path]:
-                try:
-                    os.unlink(path)
-                except:
-                    pass
-            raise RuntimeError(f"JavaScript混淆失败: {str(e)}")
+        obfuscated_code = self._run_obfuscator(js_code, options)
+        self._cache.put(key, obfuscated_code)
+        return obfuscated_code
+    
+    def _get_cache_key(self, js_code, options):
+        """结果缓存的key：由javascript-obfuscator版本、源码哈希和生效的混淆选项（含seed）确定"""
+        digest = hashlib.sha256()
+        for part in (self._get_backend().version(), hashlib.sha256(_source_bytes(js_code)).hexdigest(),
+                     json.dumps(options, sort_keys=True)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+    
+    def _create_cache(self):
+        """根据cacheDir和cacheUrl设置创建结果缓存，都未设置时返回None"""
+        if not self.settings["cacheDir"] and not self.settings["cacheUrl"]:
+            return None
+        return _ResultCache(
+            self.settings["cacheDir"] or None,
+            self.settings["cacheUrl"] or None,
+            token=self.settings["cacheToken"] or None,
+            timeout=float(self.settings["cacheTimeout"]),
+            max_entry_size=parse_size(self.settings["cacheMaxEntrySize"]),
+            concurrency=int(self.settings["cacheConcurrency"]),
+        )
+    
+    def _prefetch_cache(self, js_code, options, rel_path):
+        """
+        远程缓存开启时，提前在后台查询该文件的混淆结果
+        
+        缓存key与混淆时一样由去掉注释和空白后的代码计算；按模块拆分的打包文件按模块查询缓存，这里跳过
+        """
+        if self._cache is None or not self._cache.remote_url:
+            return
+        if self.settings["stripSource"]:
+            js_code = self._strip_source(js_code)
+        if self.settings["splitBundles"] and len(js_code) >= parse_size(self.settings["splitMinSize"]):
+            return
+        self._cache.prefetch(self._get_cache_key(js_code, self._apply_seed(options, rel_path, js_code)))
+    
+    def _run_obfuscator(self, js_code, options):
+        """使用指定选项调用javascript-obfuscator混淆代码"""
+        heap_limit = self._get_node_heap_limit(len(js_code), options)
+        return self._get_backend().obfuscate(js_code, options, self.settings["timeout"], heap_limit)
+    
+    def _get_backend(self) -> ObfuscatorBackend:
+        """获取backend设置指定的混淆后端（首次使用时创建）"""
+        with self._backend_lock:
+            if self._backend is None:
+                name = self.settings["backend"]
+                if name not in OBFUSCATOR_BACKENDS:
+                    raise ValueError(f"未知的混淆后端: {name}，可选: {', '.join(OBFUSCATOR_BACKENDS)}")
+                env = self._get_node_env()
+                if name == EmbeddedBackend.name:
+                    backend = EmbeddedBackend(self.settings["embeddedScript"] or None, env=env)
+                else:
+                    backend = OBFUSCATOR_BACKENDS[name](env=env)
+                # 对象被回收或解释器退出时关闭常驻进程和V8上下文
+                self._backend_finalizer = weakref.finalize(self, backend.close)
+                self._backend = backend
+            return self._backend
+    
+    def _get_node_env(self) -> Dict[str, str]:
+        """启动Node进程时额外设置的环境变量：按compileCacheDir设置NODE_COMPILE_CACHE，留空时禁用编译缓存"""
+        cache_dir = self.settings["compileCacheDir"]
+        if not cache_dir:
+            return {"NODE_DISABLE_COMPILE_CACHE": "1"}
+        if cache_dir == "auto":
+            cache_dir = os.environ.get("NODE_COMPILE_CACHE") or get_default_compile_cache_dir()
+        try:
+            Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            print(f"⚠️  无法创建编译缓存目录 {cache_dir}: {e}")
+            return {}
+        return {"NODE_COMPILE_CACHE": str(cache_dir)}
+    
+    def close(self):
+        """等待结果缓存上传完成并关闭混淆后端（常驻Node进程、V8上下文），之后再混淆时会重新创建"""
+        if self._cache is not None:
+            self._cache.flush()
+        with self._backend_lock:
+            if self._backend is not None:
+                self._backend_finalizer()
+                self._backend = None
     
     def _fix_background_js_code(self, code):
         """修复background.js混淆后的代码，替换window引用"""
-        # 替换直接的window引用
-        code = re.sub(r'(?<!\w)window(?!\w)', 'self', code)
+        return "".join(self._background_js_parts(code))
+    
+    def _background_js_parts(self, code):
+        """_fix_background_js_code的实现，返回 [环境适配头, 替换window引用后的代码]，写出时不必先拼接"""
+        # 替换直接的window引用（没有window时保留原对象及其原始字节）
+        if re.search(r'(?<!\w)window(?!\w)', code):
+            code = re.sub(r'(?<!\w)window(?!\w)', 'self', code)
         
         # 添加安全检查，确保代码在扩展环境中正常运行
         safe_header = """
@@ -395,28 +2947,326 @@ var globalThis = globalThis || self || window || {};
 if (typeof window === 'undefined') { var window = self || globalThis; }
 
 """
-        return safe_header + code
+        return [safe_header, code]
     
-    def obfuscate_file(self, input_file, output_file=None):
-        """混淆单个JS文件"""
+    def obfuscate_file(self, input_file, output_file=None, options=None, precompress=None, rel_path=None):
+        """
+        混淆单个JS文件
+        
+        Args:
+            input_file: 输入文件
+            output_file: 输出文件（默认覆盖输入）
+            options: 预先计算好的混淆选项（默认根据文件自动确定）
+            precompress: 生成的压缩副本格式列表，如 ["gzip", "brotli"]（默认使用precompress设置）
+            rel_path: 可复现模式下参与计算seed的相对路径（默认为文件名）
+        """
         if not output_file:
             output_file = input_file
+        
+        started = time.perf_counter()
+        record = self._new_file_record(rel_path or str(input_file))
+        
+        # 单独调用时在这里生成压缩副本和校验输出，目录混淆时由obfuscate_directory统一提交
+        # （目录混淆中_precompressor为None表示本次运行不生成压缩副本）
+        own_precompressor = None
+        own_validator = None
+        if not self._in_run:
+            own_precompressor = self._create_precompressor(precompress)
+            own_validator = self._create_validator()
+        validator = self._validator or own_validator
             
         try:
-            with open(input_file, 'r', encoding='utf-8') as f:
-                js_code = f.read()
-                
-            obfuscated_code = self.obfuscate_js(js_code, input_file)
+            record["input_bytes"] = os.path.getsize(input_file)
+            # 大文件用mmap读入，npx后端直接读取源文件，输出的各段用writev写出，避免整份代码的多次复制
+            js_code = _read_source(input_file)
+            if isinstance(js_code, _SourceText):
+                js_code.path = str(input_file)
+            
+            try:
+                parts = self._obfuscate_js_parts(js_code, input_file, options, rel_path)
+            finally:
+                if isinstance(js_code, _SourceText):
+                    js_code.release()
+            if not validator:
+                # 写出时不再需要源码，先释放，输出的编码副本不与整份源码同时存在
+                js_code = None
             
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(obfuscated_code)
+            _write_source(output_file, parts)
+            record["output_bytes"] = os.path.getsize(output_file)
+            record["cache"] = self.run_report["cached"].get(str(input_file), "none")
+            if str(input_file) in self.run_report["fallback"]:
+                record["status"] = "fallback"
+            
+            if own_precompressor:
+                own_precompressor.submit(output_file)
+            if validator:
+                validator.submit(record, rel_path or input_file, js_code, "".join(parts))
                 
             return True
         except Exception as e:
             print(f"混淆文件 {input_file} 时出错: {str(e)}")
+            self.run_report["failed"].append(str(input_file))
+            record["status"] = "failed"
+            record["error"] = str(e)
             return False
+        finally:
+            record["profile"] = self.run_report["profiles"].get(str(input_file), self.config_section)
+            record["elapsed_seconds"] = round(time.perf_counter() - started, 4)
+            self._add_file_record(record)
+            if own_precompressor:
+                self._finish_precompressor(own_precompressor)
+            if own_validator:
+                self._finish_validator(own_validator)
+    
+    def _new_file_record(self, path, **fields):
+        """创建一个文件的指标记录"""
+        record = {
+            "path": Path(path).as_posix(),
+            "profile": None,
+            "status": "ok",         # ok / fallback / failed / passthrough / skipped
+            "input_bytes": 0,
+            "output_bytes": 0,
+            "expansion_ratio": None,
+            "elapsed_seconds": 0.0,
+            "cache": "none",        # none：本次混淆；dedupe：复用重复文件的结果；local/remote：命中结果缓存
+            "validation": None,     # 未校验为None；ok / smoke_skipped / parse_failed / smoke_failed / timeout_failed / error_failed
+            "variant": self._variant,  # 多变体构建时所属的变体（INI section）
+            "error": None,
+        }
+        record.update(fields)
+        return record
+    
+    def _add_file_record(self, record):
+        """计算膨胀率并记入本次运行"""
+        if record["input_bytes"] and record["status"] not in ("failed", "skipped"):
+            record["expansion_ratio"] = round(record["output_bytes"] / record["input_bytes"], 4)
+        self.run_report["files"].append(record)
+        if self._profiler is not None:
+            self._profiler.file_done()
+    
+    @contextmanager
+    def python_profiling(self, profile_file=None, trace_file=None, interval=None):
+        """
+        在cProfile和tracemalloc下运行其中的混淆，分析Python侧编排的耗时和内存分配
+        
+        Args:
+            profile_file: 写入的pstats文件（默认使用pyProfile设置）
+            trace_file: 写入的内存分配报告（默认使用traceMemory设置）
+            interval: 每处理多少个文件做一次内存快照（默认使用traceMemoryInterval设置）
+        """
+        profile_file = profile_file or self.settings["pyProfile"]
+        trace_file = trace_file or self.settings["traceMemory"]
+        if not profile_file and not trace_file:
+            yield None
+            return
+        
+        profiler = _PythonProfiler(profile_file, trace_file, interval or self.settings["traceMemoryInterval"],
+                                   int(self.settings["traceMemoryTop"]))
+        profiler.start()
+        self._profiler = profiler
+        try:
+            yield profiler
+        finally:
+            self._profiler = None
+            profiler.stop()
+    
+    def check_size_budgets(self, baseline_file=None):
+        """
+        检查本次运行的输出是否超出体积预算，结果记入run_report["over_budget"]并打印
+        
+        预算包括单个文件和合计的输出大小、膨胀率上限，以及与基线（上一次运行的指标文件）相比的增长比例。
+        与基线比较时按变体和相对路径对应文件，合计只统计两次都有的文件；
+        单个文件的增长不超过SIZE_GROWTH_SLACK字节时不计，避免随机seed带来的小幅波动
+        
+        Args:
+            baseline_file: 基线指标文件（默认使用sizeBaseline设置）
+            
+        Returns:
+            超出预算的说明列表
+        """
+        baseline_file = baseline_file or self.settings["sizeBaseline"]
+        max_size = parse_size(self.settings["maxOutputSize"])
+        max_total_size = parse_size(self.settings["maxTotalOutputSize"])
+        max_ratio = float(self.settings["maxExpansionRatio"])
+        max_total_ratio = float(self.settings["maxTotalExpansionRatio"])
+        if not (baseline_file or max_size or max_total_size or max_ratio or max_total_ratio):
+            return []
+        
+        records = [record for record in self.run_report["files"] if record["status"] not in ("failed", "skipped")]
+        violations = []
+        for record in records:
+            name = self._format_record_name(record)
+            if max_size and record["output_bytes"] > max_size:
+                violations.append(f"{name}: 输出 {format_size(record['output_bytes'])} 超过单文件上限 {format_size(max_size)}")
+            if max_ratio and (record["expansion_ratio"] or 0) > max_ratio:
+                violations.append(f"{name}: 膨胀率 {record['expansion_ratio']:.2f} 超过上限 {max_ratio:g}")
+        
+        input_bytes = sum(record["input_bytes"] for record in records)
+        output_bytes = sum(record["output_bytes"] for record in records)
+        if max_total_size and output_bytes > max_total_size:
+            violations.append(f"合计: 输出 {format_size(output_bytes)} 超过上限 {format_size(max_total_size)}")
+        if max_total_ratio and input_bytes and output_bytes / input_bytes > max_total_ratio:
+            violations.append(f"合计: 膨胀率 {output_bytes / input_bytes:.2f} 超过上限 {max_total_ratio:g}")
+        
+        if baseline_file:
+            baseline = self._load_size_baseline(baseline_file)
+            if baseline is not None:
+                violations.extend(self._compare_size_baseline(records, baseline))
+        
+        self.run_report["over_budget"] = violations
+        if violations:
+            print(f"📏 超出体积预算 ({len(violations)}):")
+            for violation in violations:
+                print(f"  - {violation}")
+        else:
+            print(f"📏 输出体积在预算之内（合计 {format_size(output_bytes)}）")
+        return violations
     
-    def obfuscate_directory(self, input_dir, output_dir=None, recursive=True, copy_non_js=True):
+    def _format_record_name(self, record):
+        """指标记录在报告中的名称，多变体构建时加上变体名"""
+        return f"[{record['variant']}] {record['path']}" if record["variant"] else record["path"]
+    
+    def _load_size_baseline(self, baseline_file):
+        """
+        读取基线指标文件
+        
+        Returns:
+            (变体, 相对路径) -> 输出字节数，文件不存在或无法读取时返回None
+        """
+        baseline = {}
+        try:
+            with open(baseline_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if record.get("status") not in ("failed", "skipped"):
+                        baseline[(record.get("variant"), record["path"])] = record["output_bytes"]
+        except FileNotFoundError:
+            print(f"⚠️  体积基线 {baseline_file} 不存在，跳过与基线的比较")
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️  读取体积基线 {baseline_file} 失败: {e}")
+            return None
+        return baseline
+    
+    def _compare_size_baseline(self, records, baseline):
+        """返回与基线相比增长超过maxSizeGrowth的文件和合计"""
+        max_growth = float(self.settings["maxSizeGrowth"])
+        violations = []
+        current_total = baseline_total = 0
+        for record in records:
+            previous = baseline.get((record["variant"], record["path"]))
+            if previous is None:
+                continue
+            current = record["output_bytes"]
+            current_total += current
+            baseline_total += previous
+            if current > previous * (1 + max_growth) and current - previous > SIZE_GROWTH_SLACK:
+                violations.append(f"{self._format_record_name(record)}: 输出比基线增长 {(current - previous) / max(previous, 1):.1%}"
+                                  f"（{format_size(previous)} → {format_size(current)}），上限 {max_growth:.0%}")
+        if baseline_total and current_total > baseline_total * (1 + max_growth):
+            violations.append(f"合计: 输出比基线增长 {(current_total - baseline_total) / baseline_total:.1%}"
+                              f"（{format_size(baseline_total)} → {format_size(current_total)}），上限 {max_growth:.0%}")
+        return violations
+    
+    def write_metrics(self, metrics_file=None, prometheus_file=None):
+        """
+        导出本次运行的指标
+        
+        Args:
+            metrics_file: JSONL文件，每个文件一条记录（默认使用metricsFile设置）
+            prometheus_file: Prometheus textfile，写入运行汇总（默认使用prometheusFile设置）
+        """
+        metrics_file = metrics_file or self.settings["metricsFile"]
+        prometheus_file = prometheus_file or self.settings["prometheusFile"]
+        records = self.run_report["files"]
+        
+        if metrics_file:
+            with open(metrics_file, 'w', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            print(f"📝 已写入 {len(records)} 条文件指标: {metrics_file}")
+        
+        if prometheus_file:
+            self._write_prometheus_textfile(prometheus_file, records)
+            print(f"📝 已写入Prometheus指标: {prometheus_file}")
+    
+    def _write_prometheus_textfile(self, prometheus_file, records):
+        """写入node_exporter textfile collector格式的运行汇总"""
+        input_bytes = sum(record["input_bytes"] for record in records)
+        output_bytes = sum(record["output_bytes"] for record in records if record["status"] != "failed")
+        duration = max(time.time() - self.run_report["started"], 1e-6)
+        statuses = {}
+        for record in records:
+            statuses[record["status"]] = statuses.get(record["status"], 0) + 1
+        caches = {}
+        for record in records:
+            caches[record["cache"]] = caches.get(record["cache"], 0) + 1
+        
+        metrics = [
+            ("files", "Files processed in the last run by status", [(f'status="{k}"', v) for k, v in sorted(statuses.items())]),
+            ("cache_files", "Files processed in the last run by cache status", [(f'cache="{k}"', v) for k, v in sorted(caches.items())]),
+            ("input_bytes", "Total input bytes of the last run", [("", input_bytes)]),
+            ("output_bytes", "Total output bytes of the last run", [("", output_bytes)]),
+            ("expansion_ratio", "Output bytes divided by input bytes", [("", round(output_bytes / input_bytes, 4) if input_bytes else 0)]),
+            ("duration_seconds", "Wall-clock duration of the last run", [("", round(duration, 3))]),
+            ("throughput_bytes_per_second", "Input bytes processed per second", [("", round(input_bytes / duration, 1))]),
+            ("timed_out_files", "Files that hit the timeout", [("", len(self.run_report["timed_out"]))]),
+            ("duplicate_files", "Files that reused a duplicate's result", [("", self.run_report["duplicates"])]),
+            ("peak_rss_bytes", "Peak RSS of the obfuscation process tree", [("", self.run_report["peak_rss"])]),
+            ("last_run_timestamp_seconds", "Unix time the last run finished", [("", int(time.time()))]),
+        ]
+        
+        lines = []
+        for name, help_text, samples in metrics:
+            lines.append(f"# HELP js_obfuscator_{name} {help_text}")
+            lines.append(f"# TYPE js_obfuscator_{name} gauge")
+            for labels, value in samples:
+                lines.append(f"js_obfuscator_{name}{{{labels}}} {value}" if labels else f"js_obfuscator_{name} {value}")
+        
+        # 先写临时文件再替换，避免node_exporter读到写了一半的文件
+        temp_file = f"{prometheus_file}.{os.getpid()}.tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_file, prometheus_file)
+    
+    def _create_precompressor(self, precompress=None):
+        """根据参数或precompress设置创建压缩线程池，不需要压缩时返回None"""
+        formats = self.settings["precompress"] if precompress is None else precompress
+        if not formats:
+            return None
+        return _Precompressor(
+            formats,
+            self.settings["precompressExtensions"],
+            gzip_level=int(self.settings["gzipLevel"]),
+            brotli_quality=int(self.settings["brotliQuality"]),
+        )
+    
+    def _finish_precompressor(self, precompressor):
+        """等待压缩完成并记入汇总"""
+        precompressor.close()
+        self.run_report["precompressed"] += precompressor.compressed
+        self.run_report["precompress_unchanged"] += precompressor.unchanged
+        self.run_report["precompress_failed"].extend(precompressor.failed)
+    
+    def _create_validator(self):
+        """根据validate设置创建输出校验线程池，不需要校验时返回None"""
+        mode = self.settings["validate"]
+        if not mode:
+            return None
+        if mode not in _Validator.MODES:
+            raise ValueError(f"未知的校验模式: {mode}（可选: {', '.join(_Validator.MODES)}）")
+        return _Validator(mode, float(self.settings["validateTimeout"]), self._get_worker_count(), self._get_node_env())
+    
+    def _finish_validator(self, validator):
+        """等待校验完成并记入汇总"""
+        validator.close()
+        self.run_report["validated"] += validator.checked
+        self.run_report["smoke_skipped"] += validator.smoke_skipped
+        self.run_report["invalid"].extend(validator.failed)
+    
+    def obfuscate_directory(self, input_dir, output_dir=None, recursive=True, copy_non_js=True, precompress=None):
         """混淆目录中的所有JS文件，并可选择复制非JS文件
         
         Args:
@@ -424,7 +3274,34 @@ if (typeof window === 'undefined') { var window = self || globalThis; }
             output_dir: 输出目录（默认与输入目录相同）
             recursive: 是否递归处理子目录
             copy_non_js: 是否复制非JS文件到输出目录
+            precompress: 生成的压缩副本格式列表，如 ["gzip", "brotli"]（默认使用precompress设置）
         """
+        self.run_report = self._new_run_report()
+        self._extension_roles = {}
+        self._precompressor = self._create_precompressor(precompress)
+        self._validator = self._create_validator()
+        self._in_run = True
+        try:
+            result = self._obfuscate_directory(input_dir, output_dir, recursive, copy_non_js)
+        finally:
+            self._in_run = False
+            if self._precompressor:
+                precompressor, self._precompressor = self._precompressor, None
+                self._finish_precompressor(precompressor)
+            if self._validator:
+                validator, self._validator = self._validator, None
+                self._finish_validator(validator)
+        
+        if self._cache is not None:
+            self._cache.flush()
+        self._print_run_report()
+        self.check_size_budgets()
+        if self.settings["metricsFile"] or self.settings["prometheusFile"]:
+            self.write_metrics()
+        return result
+    
+    def _obfuscate_directory(self, input_dir, output_dir, recursive, copy_non_js):
+        """obfuscate_directory的实现，输出文件写入后会提交给压缩线程池"""
         input_dir = Path(input_dir)
         
         if not output_dir:
@@ -434,11 +3311,142 @@ if (typeof window === 'undefined') { var window = self || globalThis; }
             if not output_dir.exists():
                 output_dir.mkdir(parents=True)
         
-        # 获取所有文件
-        all_files = []
+        js_files, non_js_files = self._scan_directory(input_dir, recursive, copy_non_js)
+        total_js_files = len(js_files)
+        total_non_js_files = len(non_js_files)
+        
+        print(f"找到 {total_js_files} 个JS文件需要混淆")
+        if copy_non_js or self.run_report["passthrough"]:
+            print(f"找到 {total_non_js_files} 个文件需要复制")
+        
+        # 处理JS文件
+        success_files = self._obfuscate_js_files(js_files, input_dir, output_dir)
+        
+        # 复制非JS文件及直接复制的JS文件
+        copied_files = self._copy_files(non_js_files, input_dir, [output_dir])
+                
+        print(f"混淆完成: {success_files}/{total_js_files} 个JS文件成功混淆")
+        return success_files, total_js_files, copied_files, total_non_js_files
+    
+    def obfuscate_variants(self, input_dir, output_dir, sections=None, recursive=True, copy_non_js=True, precompress=None):
+        """
+        多变体构建：一次遍历输入目录，为每个INI section各生成一份输出（output_dir/<section>）
+        
+        目录遍历、扩展manifest解析、直接复制判断和重复文件分组只进行一次；所有文件×变体的混淆任务
+        在同一个线程池中调度；复制的非JS文件只复制一次，其余变体使用硬链接。
+        各变体的section通常只在seed、domainLock等选项上不同
+        
+        Args:
+            input_dir: 输入目录
+            output_dir: 输出根目录，不能与输入目录相同
+            sections: INI section列表（默认使用variants设置）
+            recursive: 是否递归处理子目录
+            copy_non_js: 是否复制非JS文件到输出目录
+            precompress: 生成的压缩副本格式列表（默认使用precompress设置）
+            
+        Returns:
+            {section: (成功混淆的JS文件数, JS文件总数)}
+        """
+        sections = list(sections or self.settings["variants"])
+        if not sections:
+            raise ValueError("没有指定变体（INI section列表）")
+        if len(set(sections)) != len(sections):
+            raise ValueError(f"变体section重复: {sections}")
+        input_dir = Path(input_dir)
+        output_dir = Path(output_dir)
+        if output_dir.resolve() == input_dir.resolve():
+            raise ValueError("多变体构建需要单独的输出目录")
+        
+        self.run_report = self._new_run_report()
+        self._extension_roles = {}
+        self._precompressor = self._create_precompressor(precompress)
+        self._validator = self._create_validator()
+        self._in_run = True
+        try:
+            js_files, non_js_files = self._scan_directory(input_dir, recursive, copy_non_js)
+            print(f"找到 {len(js_files)} 个JS文件需要混淆，{len(non_js_files)} 个文件需要复制，共 {len(sections)} 个变体")
+            
+            variants = [self._create_variant(section) for section in sections]
+            groups = self._group_duplicates(js_files) if self.settings["dedupe"] else None
+            jobs = []
+            for variant in variants:
+                variant_jobs = variant._plan_js_jobs(js_files, input_dir, output_dir / variant.config_section, groups)
+                variant._prepare_js_jobs(variant_jobs, input_dir)
+                for job in variant_jobs:
+                    job["obfuscator"] = variant
+                    job["variant"] = variant.config_section
+                jobs.extend(variant_jobs)
+            
+            results = self._run_js_jobs(jobs, input_dir) if jobs else []
+            self._copy_files(non_js_files, input_dir, [output_dir / section for section in sections])
+        finally:
+            self._in_run = False
+            if self._precompressor:
+                precompressor, self._precompressor = self._precompressor, None
+                self._finish_precompressor(precompressor)
+            if self._validator:
+                validator, self._validator = self._validator, None
+                self._finish_validator(validator)
+        
+        summary = {}
+        for variant in variants:
+            success_files = sum(result for job, result in zip(jobs, results) if job["obfuscator"] is variant)
+            summary[variant.config_section] = (success_files, len(js_files))
+            self._merge_variant_report(variant)
+            print(f"📦 [{variant.config_section}] {success_files}/{len(js_files)} 个JS文件成功混淆: "
+                  f"{output_dir / variant.config_section}")
+        
+        if self._cache is not None:
+            self._cache.flush()
+        self._print_run_report()
+        self.check_size_budgets()
+        if self.settings["metricsFile"] or self.settings["prometheusFile"]:
+            self.write_metrics()
+        return summary
+    
+    def _create_variant(self, section):
+        """
+        创建使用另一个section混淆选项的混淆器
+        
+        与当前混淆器共享运行设置、混淆后端、结果缓存和压缩/校验线程池，使用独立的运行汇总
+        """
+        self._get_backend()
+        variant = copy.copy(self)
+        variant.config_section = section
+        variant.options = self._load_config(self.config_file, section)
+        if self._user_options:
+            self._merge_options(variant.options, copy.deepcopy(self._user_options))
+        variant.config = variant.options
+        variant._fallback_options = None
+        variant.run_report = self._new_run_report()
+        variant._variant = section
+        return variant
+    
+    def _merge_variant_report(self, variant):
+        """把变体的运行汇总并入当前汇总，文件列表加上变体名"""
+        section = variant.config_section
+        report = variant.run_report
+        for key in ("timed_out", "fallback", "failed"):
+            self.run_report[key].extend(f"[{section}] {item}" for item in report[key])
+        for key in ("profiles", "cached", "path_rules", "stripped"):
+            self.run_report[key].update({f"[{section}] {path}": value for path, value in report[key].items()})
+        self.run_report["duplicates"] += report["duplicates"]
+        self.run_report["files"].extend(report["files"])
+    
+    def _scan_directory(self, input_dir, recursive, copy_non_js):
+        """
+        遍历输入目录，区分需要混淆的JS文件和需要复制的文件（扩展模式和自动直接复制在这里处理）
+        
+        Returns:
+            (需要混淆的JS文件列表, 需要复制的文件列表)
+        """
         js_files = []
         non_js_files = []
         
+        # 路径规则按相对输入目录的路径匹配
+        self._input_root = input_dir
+        self._path_rule_cache.clear()
+        
         if recursive:
             for root, _, files in os.walk(input_dir):
                 for file in files:
@@ -455,59 +3463,637 @@ if (typeof window === 'undefined') { var window = self || globalThis; }
                     elif copy_non_js:
                         non_js_files.append(file_path)
             
-        total_js_files = len(js_files)
-        total_non_js_files = len(non_js_files)
-        processed_files = 0
-        success_files = 0
+        if self.settings["extensionMode"]:
+            js_files = self._apply_extension_manifest(js_files, input_dir)
+            
+        # 已压缩和第三方库的JS文件不混淆，与非JS文件一起直接复制
+        if self.settings["autoPassthrough"]:
+            js_files, passthrough_files = self._split_passthrough_files(js_files, input_dir)
+            non_js_files.extend(passthrough_files)
+        
+        self._shared_globals = {}
+        if self.settings["globalSymbolIndex"]:
+            self._shared_globals = self._build_symbol_index(input_dir, recursive, js_files)
+        return js_files, non_js_files
+    
+    def _build_symbol_index(self, input_dir, recursive, js_files):
+        """
+        更新输入目录的全局符号索引（包括直接复制的JS和HTML文件）
+        
+        Returns:
+            需要混淆的文件路径 -> 需要保留原名的全局名称列表
+        """
+        pattern = '**/*' if recursive else '*'
+        paths = sorted(path for path in input_dir.glob(pattern)
+                       if path.suffix.lower() in SYMBOL_INDEX_SUFFIXES and path.is_file())
+        
+        index_file = self.settings["symbolIndexFile"]
+        if index_file == "auto":
+            digest = hashlib.sha256(str(input_dir.resolve()).encode('utf-8')).hexdigest()[:16]
+            index_file = get_default_compile_cache_dir().parent / "symbol-index" / f"{digest}.json"
+        index = _SymbolIndex(index_file or None)
+        changed = index.update(input_dir, paths, self._get_worker_count())
+        
+        shared = index.shared_globals()
+        shared_globals = {str(js_file): shared.get(js_file.relative_to(input_dir).as_posix(), []) for js_file in js_files}
+        total = len({name for names in shared_globals.values() for name in names})
+        print(f"🔗 全局符号索引: {len(paths)} 个文件（重新分析 {changed} 个），{total} 个跨文件使用的全局名称保留原名")
+        return shared_globals
+    
+    def _copy_files(self, files, input_dir, output_dirs):
+        """
+        把文件复制到第一个输出目录，其余输出目录中的副本尽量使用硬链接
+        
+        Returns:
+            成功复制的文件数
+        """
+        if not files:
+            return 0
+        
+        print(f"开始复制文件...")
         copied_files = 0
+        for source in files:
+            rel_path = source.relative_to(input_dir)
+            out_files = [output_dir / rel_path for output_dir in output_dirs]
+            try:
+                for out_file in out_files:
+                    # 确保输出目录存在
+                    out_file.parent.mkdir(parents=True, exist_ok=True)
+                
+                # 原地处理时源文件就是输出文件，无需复制
+                if not (out_files[0].exists() and os.path.samefile(source, out_files[0])):
+                    shutil.copy2(source, out_files[0])
+                for out_file in out_files[1:]:
+                    self._link_or_copy(out_files[0], out_file)
+                copied_files += 1
+                if self._precompressor:
+                    self._precompressor.submit(out_files[0], out_files[1:])
+            except Exception as e:
+                print(f"复制文件 {source} 时出错: {str(e)}")
         
-        print(f"找到 {total_js_files} 个JS文件需要混淆")
-        if copy_non_js:
-            print(f"找到 {total_non_js_files} 个非JS文件需要复制")
+        print(f"复制完成: {copied_files}/{len(files)} 个文件成功复制")
+        return copied_files
+    
+    def _apply_extension_manifest(self, js_files, input_dir):
+        """
+        扩展模式：按输入目录中的manifest.json记录各JS文件的角色，并按unreferencedJs处理未引用的文件
         
-        # 处理JS文件
+        Returns:
+            需要继续处理的JS文件
+        """
+        manifest_file = input_dir / "manifest.json"
+        if not manifest_file.is_file():
+            print(f"⚠️  扩展模式下未找到 {manifest_file}，按普通目录处理")
+            return js_files
+        
+        paths = set()
+        for root, _, files in os.walk(input_dir):
+            for file in files:
+                paths.add((Path(root) / file).relative_to(input_dir).as_posix())
+        
+        def read_text(path):
+            try:
+                return (input_dir / path).read_text(encoding='utf-8', errors='ignore')
+            except OSError:
+                return None
+        
+        roles = self._load_extension_roles(manifest_file.read_text(encoding='utf-8-sig'), paths, read_text,
+                                           lambda path: input_dir / path)
+        return [js_file for js_file in js_files
+                if not self._should_skip_unreferenced(js_file.relative_to(input_dir).as_posix(), roles,
+                                                      js_file.stat().st_size)]
+    
+    def _load_extension_roles(self, manifest_text, paths, read_text, identify):
+        """
+        解析manifest.json并记录各JS文件的角色，供选择混淆配置使用
+        
+        Args:
+            manifest_text: manifest.json的内容
+            paths: 扩展包内所有文件的相对路径集合
+            read_text: read_text(相对路径)返回文件内容
+            identify: identify(相对路径)返回混淆时使用的文件路径
+            
+        Returns:
+            {JS文件相对路径: 角色}
+        """
+        try:
+            manifest = json.loads(manifest_text)
+        except json.JSONDecodeError:
+            # Chrome允许manifest.json中有整行的 // 注释
+            manifest = json.loads(_JSON_COMMENT_RE.sub('', manifest_text))
+        
+        roles = collect_extension_roles(manifest, paths, read_text)
+        self._extension_roles = {str(identify(path)): role for path, role in roles.items()}
+        
+        counts = {}
+        for role in roles.values():
+            counts[role] = counts.get(role, 0) + 1
+        summary = "，".join(f"{role} {counts[role]}" for role in EXTENSION_ROLES if role in counts)
+        print(f"🧩 manifest v{manifest.get('manifest_version', '?')} 引用了 {len(roles)} 个JS文件（{summary or '无'}）")
+        return roles
+    
+    def _should_skip_unreferenced(self, rel_path, roles, size):
+        """
+        检查JS文件是否被manifest引用，未引用的文件记入汇总
+        
+        匹配obfuscatePatterns的文件（如通过chrome.scripting动态注入的脚本）视为已引用
+        
+        Returns:
+            unreferencedJs为skip且文件未被引用时返回True，此时文件不混淆也不输出
+        """
+        if rel_path in roles or self._match_patterns(rel_path, self.settings["obfuscatePatterns"]):
+            return False
+        
+        self.run_report["unreferenced"].append(rel_path)
+        if self.settings["unreferencedJs"] != "skip":
+            print(f"👻 manifest未引用，仍然混淆: {rel_path}")
+            return False
+        
+        print(f"👻 manifest未引用，跳过: {rel_path}")
+        self._add_file_record(self._new_file_record(
+            rel_path, profile="unreferenced", status="skipped", input_bytes=size))
+        return True
+    
+    def _split_passthrough_files(self, js_files, input_dir):
+        """
+        把JS文件分为需要混淆和直接复制两组
+        
+        Returns:
+            (需要混淆的文件, 直接复制的文件)
+        """
+        obfuscate_files = []
+        passthrough_files = []
         for js_file in js_files:
             rel_path = js_file.relative_to(input_dir)
-            out_file = output_dir / rel_path
+            try:
+                category, reason = self.classify_js_file(js_file, rel_path)
+            except OSError as e:
+                category, reason = "obfuscate", str(e)
+            
+            if category == "obfuscate":
+                obfuscate_files.append(js_file)
+            else:
+                print(f"⏭️  {category}（{reason}），直接复制: {rel_path}")
+                self.run_report["passthrough"].append(f"{rel_path} [{category}: {reason}]")
+                size = js_file.stat().st_size
+                self._add_file_record(self._new_file_record(
+                    rel_path, profile=category, status="passthrough", input_bytes=size, output_bytes=size))
+                passthrough_files.append(js_file)
+        return obfuscate_files, passthrough_files
+    
+    def _obfuscate_js_files(self, js_files, input_dir, output_dir):
+        """
+        并行混淆JS文件，按估算内存控制同时运行的任务
+        
+        Returns:
+            成功混淆的文件数
+        """
+        if not js_files:
+            return 0
+        
+        jobs = self._plan_js_jobs(js_files, input_dir, output_dir)
+        self._prepare_js_jobs(jobs, input_dir)
+        return sum(self._run_js_jobs(jobs, input_dir))
+    
+    def _prepare_js_jobs(self, jobs, input_dir):
+        """估算每个任务的内存，远程缓存开启时提前查询混淆结果"""
+        if self._cache is not None and self._cache.remote_url:
+            # 先确定每个任务的混淆选项，并发查询远程缓存，混淆时直接使用查询结果
+            for job in jobs:
+                with open(job["source"], 'r', encoding='utf-8') as f:
+                    js_code = f.read()
+                if not job["options"]:
+                    job["options"] = self.get_obfuscation_options_for_file(str(job["source"]), js_code)
+                self._prefetch_cache(js_code, job["options"], job["source"].relative_to(input_dir).as_posix())
+        for job in jobs:
+            rule = self._match_path_rule(job["source"])
+            options = job["options"] or dict(self._get_section_options(rule["section"]) if rule else self.options)
+            if not job["options"]:
+                tier = self._get_size_tier(job["size"])
+                if tier:
+                    options.update(tier["options"])
+            job["memory"] = self._estimate_job_memory(job["size"], options)
+    
+    def _run_js_jobs(self, jobs, input_dir):
+        """
+        在一个线程池中并行运行混淆任务，按估算内存控制同时运行的任务
+        
+        任务中的obfuscator为执行该任务的混淆器（多变体构建时为各变体），默认为self
+        
+        Returns:
+            与jobs顺序对应的每个任务成功输出的文件数
+        """
+        workers = self._get_worker_count()
+        memory_gate = _MemoryGate(self._get_memory_budget(), workers)
+        counter = itertools.count(1)
+        total = len(jobs)
+        
+        def run_job(job):
+            obfuscator = job.get("obfuscator", self)
+            rel_path = job["source"].relative_to(input_dir)
             
             # 确保输出目录存在
-            out_file.parent.mkdir(parents=True, exist_ok=True)
+            for out_file in job["outputs"]:
+                out_file.parent.mkdir(parents=True, exist_ok=True)
+            
+            with memory_gate.reserve(job["memory"]):
+                variant = f" [{job['variant']}]" if "variant" in job else ""
+                print(f"[{next(counter)}/{total}] 正在混淆: {rel_path}{variant}")
+                if not obfuscator.obfuscate_file(str(job["source"]), str(job["outputs"][0]), job["options"],
+                                                 rel_path=rel_path.as_posix()):
+                    for duplicate in job["duplicates"]:
+                        obfuscator.run_report["failed"].append(str(duplicate))
+                        obfuscator._add_file_record(obfuscator._new_file_record(
+                            duplicate.relative_to(input_dir), status="failed", input_bytes=job["size"],
+                            cache="dedupe", error=f"重复文件 {rel_path} 混淆失败"))
+                    return 0
+            
+            output_bytes = job["outputs"][0].stat().st_size
+            for duplicate, out_file in zip(job["duplicates"], job["outputs"][1:]):
+                obfuscator._link_or_copy(job["outputs"][0], out_file)
+                obfuscator._add_file_record(obfuscator._new_file_record(
+                    duplicate.relative_to(input_dir),
+                    profile=obfuscator.run_report["profiles"].get(str(duplicate)),
+                    input_bytes=job["size"], output_bytes=output_bytes, cache="dedupe"))
+            if self._precompressor:
+                self._precompressor.submit(job["outputs"][0], job["outputs"][1:])
+            return len(job["outputs"])
+        
+        # 先启动大文件，避免最后只剩一个大文件单独运行
+        order = sorted(range(total), key=lambda index: jobs[index]["size"], reverse=True)
+        results = [0] * total
+        monitor = _ProcessTreeMonitor()
+        monitor.start()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for index, result in zip(order, executor.map(run_job, [jobs[index] for index in order])):
+                    results[index] = result
+        finally:
+            monitor.stop()
+            self.run_report["peak_rss"] = monitor.peak_rss
+        
+        return results
+    
+    def _plan_js_jobs(self, js_files, input_dir, output_dir, groups=None):
+        """
+        把JS文件规划为混淆任务，内容和混淆选项都相同的文件合并为一个任务
+        
+        Args:
+            groups: 预先按内容分好的文件组（_group_duplicates的结果），多变体构建时只计算一次
+        
+        Returns:
+            任务列表，每个任务包含source、outputs、duplicates（其余源文件）、options（未预先计算时为None）和size
+        """
+        def new_job(sources, options=None):
+            return {
+                "source": sources[0],
+                "outputs": [output_dir / source.relative_to(input_dir) for source in sources],
+                "duplicates": sources[1:],
+                "options": options,
+                "size": sources[0].stat().st_size,
+            }
+        
+        if not self.settings["dedupe"]:
+            return [new_job([js_file]) for js_file in js_files]
+        
+        jobs = []
+        for files in (groups if groups is not None else self._group_duplicates(js_files)):
+            if len(files) == 1:
+                jobs.append(new_job(files))
+                continue
+            
+            # 内容相同的文件仍可能因路径得到不同的混淆选项（如background.js）
+            # 排序后取第一个作为代表，保证可复现模式下的结果与并行度无关
+            files.sort()
+            with open(files[0], 'r', encoding='utf-8') as f:
+                js_code = f.read()
+            by_options = {}
+            for js_file in files:
+                options = self.get_obfuscation_options_for_file(str(js_file), js_code)
+                key = json.dumps(options, sort_keys=True)
+                by_options.setdefault(key, (options, []))[1].append(js_file)
+            
+            for options, members in by_options.values():
+                jobs.append(new_job(members, options))
+                self.run_report["duplicates"] += len(members) - 1
+        
+        return jobs
+    
+    def _group_duplicates(self, js_files):
+        """按内容哈希把JS文件分组，每组为内容相同的文件列表"""
+        groups = {}
+        for js_file in js_files:
+            groups.setdefault(self._hash_file(js_file), []).append(js_file)
+        return list(groups.values())
+    
+    def _hash_file(self, file_path):
+        """计算文件内容的SHA-256"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def _link_or_copy(self, source, destination):
+        """把混淆结果复用到重复文件的输出路径，允许时使用硬链接"""
+        if os.path.lexists(destination):
+            os.unlink(destination)
+        if self.settings["hardlinkDuplicates"]:
+            try:
+                os.link(source, destination)
+                return
+            except OSError:
+                pass
+        shutil.copyfile(source, destination)
+    
+    def obfuscate_archive(self, input_archive, output_archive=None):
+        """
+        直接混淆zip/crx/tar归档中的JS文件，不解压到磁盘
+        
+        JS条目逐个读入内存并行混淆，其余条目按原顺序写入输出归档：zip条目原样复制压缩数据，不重新压缩。
+        crx只能作为输入（输出需要用私钥重新签名），输出请使用.zip
+        
+        Args:
+            input_archive: 输入归档（.zip/.xpi/.crx/.tar/.tar.gz/.tgz/.tar.bz2/.tar.xz）
+            output_archive: 输出归档（默认覆盖输入）
+            
+        Returns:
+            (成功混淆的JS文件数, JS文件总数, 复制的条目数, 需要复制的条目总数)
+        """
+        output_archive = output_archive or input_archive
+        input_format = get_archive_format(input_archive)
+        output_format = get_archive_format(output_archive)
+        if not input_format:
+            raise ValueError(f"不支持的归档格式: {input_archive}")
+        if not output_format:
+            raise ValueError(f"不支持的归档格式: {output_archive}")
+        if output_format[0] == "crx":
+            raise ValueError("不能直接输出crx（需要用私钥重新签名），请输出.zip后再打包")
+        if (input_format[0] == "tar") != (output_format[0] == "tar"):
+            raise ValueError("输入和输出需同为zip/crx或同为tar归档")
+        
+        self.run_report = self._new_run_report()
+        self._extension_roles = {}
+        
+        # 写入同目录的临时文件，完成后替换，输入和输出可以是同一个文件
+        temp_file = f"{output_archive}.{os.getpid()}.tmp"
+        self._validator = self._create_validator()
+        try:
+            if input_format[0] == "tar":
+                result = self._obfuscate_tar_archive(input_archive, temp_file, output_format[1])
+            else:
+                result = self._obfuscate_zip_archive(input_archive, temp_file)
+            os.replace(temp_file, output_archive)
+        finally:
+            if os.path.exists(temp_file):
+                os.unlink(temp_file)
+            if self._validator:
+                validator, self._validator = self._validator, None
+                self._finish_validator(validator)
+        
+        if self._cache is not None:
+            self._cache.flush()
+        self._print_run_report()
+        self.check_size_budgets()
+        if self.settings["metricsFile"] or self.settings["prometheusFile"]:
+            self.write_metrics()
+        return result
+    
+    def _obfuscate_zip_archive(self, input_archive, output_archive):
+        """混淆zip/crx归档，crx开头的签名头由zipfile作为前置数据跳过"""
+        with zipfile.ZipFile(input_archive) as source, \
+                zipfile.ZipFile(output_archive, 'w', zipfile.ZIP_DEFLATED) as target:
+            entries = [(info, info.filename, None if info.is_dir() else info.file_size)
+                       for info in source.infolist()]
+            
+            def write_entry(info, data):
+                if data is None:
+                    _copy_zip_entry_raw(source, target, info)
+                else:
+                    entry = zipfile.ZipInfo(info.filename, info.date_time)
+                    entry.external_attr = info.external_attr
+                    entry.compress_type = zipfile.ZIP_DEFLATED
+                    target.writestr(entry, data)
+            
+            return self._obfuscate_archive_entries(input_archive, entries, source.read, write_entry)
+    
+    def _obfuscate_tar_archive(self, input_archive, output_archive, compression):
+        """混淆tar归档，输出的压缩方式由输出扩展名决定"""
+        with tarfile.open(input_archive, 'r:*') as source, \
+                tarfile.open(output_archive, f"w:{compression}" if compression else 'w') as target:
+            entries = [(member, member.name, member.size if member.isfile() else None)
+                       for member in source.getmembers()]
+            
+            def read_entry(member):
+                return source.extractfile(member).read()
             
-            processed_files += 1
-            print(f"[{processed_files}/{total_js_files}] 正在混淆: {rel_path}")
+            def write_entry(member, data):
+                if data is None:
+                    target.addfile(member, source.extractfile(member) if member.isfile() else None)
+                else:
+                    entry = copy.copy(member)
+                    entry.size = len(data)
+                    target.addfile(entry, io.BytesIO(data))
+            
+            return self._obfuscate_archive_entries(input_archive, entries, read_entry, write_entry)
+    
+    def _obfuscate_archive_entries(self, input_archive, entries, read_entry, write_entry):
+        """
+        并行混淆归档中的JS条目，并按原顺序写入所有条目
+        
+        JS条目在提交时才读入内存，同时在途的JS条目不超过并行任务数的两倍，
+        写入后即释放原内容和混淆结果，内存占用不随归档大小增长
+        
+        Args:
+            input_archive: 输入归档，用于拼接条目的显示路径
+            entries: (条目信息, 条目名, 普通文件的大小或None) 列表
+            read_entry: read_entry(条目信息)返回条目内容
+            write_entry: write_entry(条目信息, 新内容或None)，None表示原样复制
             
-            if self.obfuscate_file(str(js_file), str(out_file)):
-                success_files += 1
+        Returns:
+            (成功混淆的JS文件数, JS文件总数, 复制的条目数, 需要复制的条目总数)
+        """
+        workers = self._get_worker_count()
+        memory_gate = _MemoryGate(self._get_memory_budget(), workers)
+        counter = itertools.count(1)
+        
+        if self.settings["extensionMode"]:
+            entries = self._apply_archive_manifest(input_archive, entries, read_entry)
+        total_js = sum(1 for _, name, size in entries if size is not None and name.endswith('.js'))
+        js_entries = total_js
+        print(f"找到 {total_js} 个JS文件，{len(entries) - total_js} 个条目直接复制")
         
-        # 复制非JS文件
-        if copy_non_js and non_js_files:
-            print(f"开始复制非JS文件...")
-            for non_js_file in non_js_files:
-                rel_path = non_js_file.relative_to(input_dir)
-                out_file = output_dir / rel_path
+        def run_entry(name, label, js_code, options, memory):
+            with memory_gate.reserve(memory):
+                print(f"[{next(counter)}/{js_entries}] 正在混淆: {name}")
+                return self._obfuscate_archive_entry(name, label, js_code, options)
+        
+        success_files = 0
+        copied_files = 0
+        monitor = _ProcessTreeMonitor()
+        monitor.start()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # 按原顺序排队写入，在途的JS条目达到上限时先等待并写出最早的条目，再读入下一个
+                pending = collections.deque()
+                in_flight = 0
                 
-                # 确保输出目录存在
-                out_file.parent.mkdir(parents=True, exist_ok=True)
+                def write_oldest():
+                    nonlocal success_files, copied_files, in_flight
+                    info, data, future = pending.popleft()
+                    if future is None:
+                        write_entry(info, None)
+                        copied_files += 1
+                        return
+                    in_flight -= 1
+                    obfuscated = future.result()
+                    if obfuscated is None:
+                        # 混淆失败时保留原内容，保证归档完整，失败记录在汇总中
+                        write_entry(info, data)
+                    else:
+                        write_entry(info, obfuscated)
+                        success_files += 1
                 
-                try:
-                    shutil.copy2(non_js_file, out_file)
-                    copied_files += 1
-                except Exception as e:
-                    print(f"复制文件 {non_js_file} 时出错: {str(e)}")
-            
-            print(f"复制完成: {copied_files}/{total_non_js_files} 个非JS文件成功复制")
+                for info, name, size in entries:
+                    future = None
+                    data = None
+                    if size is not None and name.endswith('.js'):
+                        data = read_entry(info)
+                        future = self._submit_archive_entry(executor, run_entry, input_archive, name, data)
+                        if future is None:
+                            total_js -= 1
+                            data = None
+                        else:
+                            in_flight += 1
+                    pending.append((info, data, future))
+                    while pending and (pending[0][2] is None or in_flight >= workers * 2):
+                        write_oldest()
                 
-        print(f"混淆完成: {success_files}/{total_js_files} 个JS文件成功混淆")
-        return success_files, total_js_files, copied_files, total_non_js_files
+                while pending:
+                    write_oldest()
+        finally:
+            monitor.stop()
+            self.run_report["peak_rss"] = monitor.peak_rss
+        
+        print(f"混淆完成: {success_files}/{total_js} 个JS文件成功混淆，{copied_files} 个条目原样复制")
+        return success_files, total_js, copied_files, len(entries) - total_js
+    
+    def _apply_archive_manifest(self, input_archive, entries, read_entry):
+        """
+        扩展模式：按归档中的manifest.json记录各JS条目的角色，并按unreferencedJs处理未引用的条目
+        
+        Returns:
+            需要写入输出归档的条目
+        """
+        files = {posixpath.normpath(name): (info, name, size) for info, name, size in entries if size is not None}
+        if "manifest.json" not in files:
+            print(f"⚠️  扩展模式下归档中没有manifest.json，按普通归档处理: {input_archive}")
+            return entries
+        
+        def read_text(path):
+            if path not in files:
+                return None
+            return read_entry(files[path][0]).decode('utf-8', errors='ignore')
+        
+        names = {posixpath.normpath(name): name for _, name, _ in entries}
+        manifest_text = read_entry(files["manifest.json"][0]).decode('utf-8-sig')
+        roles = self._load_extension_roles(manifest_text, set(names), read_text,
+                                           lambda path: f"{input_archive}!/{names[path]}")
+        return [(info, name, size) for info, name, size in entries
+                if not (name.endswith('.js') and size is not None
+                        and self._should_skip_unreferenced(posixpath.normpath(name), roles, size))]
+    
+    def _submit_archive_entry(self, executor, run_entry, input_archive, name, data):
+        """判断JS条目是否需要混淆，需要时提交混淆任务并返回future，否则记录为直接复制并返回None"""
+        label = f"{input_archive}!/{name}"
+        try:
+            js_code = _decode_source(data)
+        except UnicodeDecodeError as e:
+            print(f"⏭️  不是UTF-8编码（{e}），直接复制: {name}")
+            self.run_report["passthrough"].append(f"{name} [encoding: {e}]")
+            self._add_file_record(self._new_file_record(
+                name, profile="encoding", status="passthrough", input_bytes=len(data), output_bytes=len(data)))
+            return None
+        
+        if self.settings["autoPassthrough"]:
+            category, reason = self.classify_js_file(label, name, js_code)
+            if category != "obfuscate":
+                print(f"⏭️  {category}（{reason}），直接复制: {name}")
+                self.run_report["passthrough"].append(f"{name} [{category}: {reason}]")
+                self._add_file_record(self._new_file_record(
+                    name, profile=category, status="passthrough", input_bytes=len(data), output_bytes=len(data)))
+                return None
+        
+        options = self.get_obfuscation_options_for_file(label, js_code)
+        self._prefetch_cache(js_code, options, name)
+        return executor.submit(run_entry, name, label, js_code, options,
+                               self._estimate_job_memory(len(data), options))
+    
+    def _obfuscate_archive_entry(self, name, label, js_code, options):
+        """混淆一个归档条目，返回混淆后的字节，失败时返回None"""
+        started = time.perf_counter()
+        record = self._new_file_record(name, input_bytes=len(_source_bytes(js_code)))
+        try:
+            obfuscated_code = self.obfuscate_js(js_code, label, options, name)
+            obfuscated = bytes(_source_bytes(obfuscated_code))
+            record["output_bytes"] = len(obfuscated)
+            if self._validator:
+                self._validator.submit(record, name, js_code, obfuscated_code)
+            record["cache"] = self.run_report["cached"].get(label, "none")
+            if label in self.run_report["fallback"]:
+                record["status"] = "fallback"
+            return obfuscated
+        except Exception as e:
+            print(f"混淆条目 {name} 时出错: {str(e)}")
+            self.run_report["failed"].append(label)
+            record["status"] = "failed"
+            record["error"] = str(e)
+            return None
+        finally:
+            record["profile"] = self.run_report["profiles"].get(label, self.config_section)
+            record["elapsed_seconds"] = round(time.perf_counter() - started, 4)
+            self._add_file_record(record)
 
 
 def main():
     parser = argparse.ArgumentParser(description='JavaScript代码混淆工具')
-    parser.add_argument('input', help='输入JS文件或目录')
-    parser.add_argument('-o', '--output', help='输出JS文件或目录 (默认覆盖输入)')
+    parser.add_argument('input', help='输入JS文件、目录或归档（zip/crx/xpi/tar）')
+    parser.add_argument('-o', '--output', help='输出JS文件、目录或归档 (默认覆盖输入)')
     parser.add_argument('-r', '--recursive', action='store_true', help='递归处理子目录')
     parser.add_argument('-c', '--config', help='混淆配置文件 (JSON格式)')
+    parser.add_argument('--ini', help='混淆配置文件 (INI格式，支持按文件大小分级)')
+    parser.add_argument('--section', default='DEFAULT', help='INI配置文件中使用的section (默认: DEFAULT)')
     parser.add_argument('--no-copy', action='store_true', help='不复制非JS文件')
+    parser.add_argument('--timeout', type=int, help='单个文件混淆超时时间（秒），0表示不限制 (默认: 300)')
+    parser.add_argument('--fallback-section', help='超时后重试使用的INI section (默认: MINIMAL)')
+    parser.add_argument('-j', '--workers', type=int, help='并行混淆的任务数，0表示按可用CPU数和内存自动确定 (默认: 0)')
+    parser.add_argument('--nice', action='store_true', help='降低本进程和Node子进程的CPU和IO优先级')
+    parser.add_argument('--no-dedupe', action='store_true', help='不合并内容相同的JS文件，逐个混淆')
+    parser.add_argument('--no-passthrough', action='store_true', help='不自动跳过已压缩和第三方库的JS文件')
+    parser.add_argument('--precompress', help='为输出生成压缩副本，逗号分隔: gzip,brotli')
+    parser.add_argument('--reproducible', action='store_true', help='由相对路径、文件内容和盐值确定seed，相同输入得到相同输出')
+    parser.add_argument('--seed-salt', help='可复现模式下的项目盐值')
+    parser.add_argument('--metrics-jsonl', help='写入每个文件指标的JSONL文件')
+    parser.add_argument('--prometheus-textfile', help='写入运行汇总指标的Prometheus textfile')
+    parser.add_argument('--backend', choices=sorted(OBFUSCATOR_BACKENDS), help='混淆后端：npx、worker（常驻Node进程）、embedded（进程内V8） (默认: npx)')
+    parser.add_argument('--compile-cache-dir', help='Node编译缓存目录（Node 22.1+），auto为用户缓存目录，空字符串表示不使用 (默认: auto)')
+    parser.add_argument('--cache-dir', help='本地结果缓存目录')
+    parser.add_argument('--cache-url', help='远程结果缓存地址（HTTP GET/PUT），如 http://cache.example:8765')
+    parser.add_argument('--extension', action='store_true', help='浏览器扩展模式：按manifest.json确定各JS文件的角色和混淆配置')
+    parser.add_argument('--skip-unreferenced', action='store_true', help='扩展模式下不混淆也不输出manifest未引用的JS文件')
+    parser.add_argument('--variants', help='多变体构建：逗号分隔的INI section列表，每个section输出到输出目录下的同名子目录')
+    parser.add_argument('--py-profile', help='用cProfile分析Python侧开销，写入pstats文件')
+    parser.add_argument('--trace-memory', help='用tracemalloc跟踪Python侧内存分配，写入报告文件')
+    parser.add_argument('--trace-memory-interval', type=int, help='每处理多少个文件做一次内存快照 (默认: 1000)')
+    parser.add_argument('--strip', action='store_true', help='混淆前去掉注释和空白（保留许可证注释）')
+    parser.add_argument('--global-index', action='store_true', help='建立跨文件全局符号索引，安全地开启renameGlobals')
+    parser.add_argument('--split-bundles', action='store_true', help='按模块拆分混淆webpack/browserify打包文件，模块并行混淆并各自缓存')
+    parser.add_argument('--validate', choices=_Validator.MODES, help='校验输出：parse解析语法，smoke再在沙箱中执行顶层代码')
+    parser.add_argument('--max-output-size', help='单个输出文件的大小上限，如 2MB，超出时返回非0')
+    parser.add_argument('--max-expansion', type=float, help='单个文件的膨胀率（输出/输入）上限，超出时返回非0')
+    parser.add_argument('--size-baseline', help='作为体积基线的上一次运行的指标文件（--metrics-jsonl的输出）')
+    parser.add_argument('--max-size-growth', type=float, help='与基线相比输出大小允许增长的比例 (默认: 0.1)')
+    parser.add_argument('--memory-budget', help='并行任务的估算内存上限，如 6GB；auto为物理内存（容器内为cgroup内存上限）的75%%，0表示不限制 (默认: auto)')
     
     args = parser.parse_args()
     
@@ -521,27 +4107,111 @@ def main():
             print(f"加载配置文件失败: {str(e)}")
             return 1
     
+    # 运行设置
+    settings = {}
+    if args.timeout is not None:
+        settings["timeout"] = args.timeout
+    if args.fallback_section:
+        settings["fallbackSection"] = args.fallback_section
+    if args.workers is not None:
+        settings["workers"] = args.workers
+    if args.nice:
+        settings["lowPriority"] = True
+    if args.memory_budget:
+        settings["memoryBudget"] = args.memory_budget
+    if args.no_dedupe:
+        settings["dedupe"] = False
+    if args.no_passthrough:
+        settings["autoPassthrough"] = False
+    if args.reproducible:
+        settings["reproducible"] = True
+    if args.seed_salt is not None:
+        settings["seedSalt"] = args.seed_salt
+    if args.metrics_jsonl:
+        settings["metricsFile"] = args.metrics_jsonl
+    if args.prometheus_textfile:
+        settings["prometheusFile"] = args.prometheus_textfile
+    if args.backend:
+        settings["backend"] = args.backend
+    if args.compile_cache_dir is not None:
+        settings["compileCacheDir"] = args.compile_cache_dir
+    if args.cache_dir:
+        settings["cacheDir"] = args.cache_dir
+    if args.cache_url:
+        settings["cacheUrl"] = args.cache_url
+    if args.extension:
+        settings["extensionMode"] = True
+    if args.skip_unreferenced:
+        settings["unreferencedJs"] = "skip"
+    if args.variants:
+        settings["variants"] = [section.strip() for section in args.variants.split(',') if section.strip()]
+    if args.py_profile:
+        settings["pyProfile"] = args.py_profile
+    if args.trace_memory:
+        settings["traceMemory"] = args.trace_memory
+    if args.trace_memory_interval:
+        settings["traceMemoryInterval"] = args.trace_memory_interval
+    if args.strip:
+        settings["stripSource"] = True
+    if args.global_index:
+        settings["globalSymbolIndex"] = True
+    if args.split_bundles:
+        settings["splitBundles"] = True
+    if args.validate:
+        settings["validate"] = args.validate
+    if args.max_output_size:
+        settings["maxOutputSize"] = args.max_output_size
+    if args.max_expansion is not None:
+        settings["maxExpansionRatio"] = args.max_expansion
+    if args.size_baseline:
+        settings["sizeBaseline"] = args.size_baseline
+    if args.max_size_growth is not None:
+        settings["maxSizeGrowth"] = args.max_size_growth
+    if args.precompress:
+        settings["precompress"] = [fmt.strip() for fmt in args.precompress.split(',') if fmt.strip()]
+    
     try:
-        obfuscator = JSObfuscator(options)
+        obfuscator = JSObfuscator(options, config_file=args.ini, config_section=args.section, settings=settings)
         
         input_path = Path(args.input)
         if not input_path.exists():
             print(f"错误: 输入路径 '{args.input}' 不存在")
             return 1
         
-        if input_path.is_file():
-            if not input_path.name.endswith('.js'):
-                print(f"警告: 输入文件 '{args.input}' 不是JS文件")
-                return 1
+        # --py-profile / --trace-memory 时在cProfile和tracemalloc下运行
+        with obfuscator.python_profiling():
+            if input_path.is_file() and get_archive_format(input_path):
+                obfuscator.obfuscate_archive(args.input, args.output)
+                report = obfuscator.run_report
+                return 0 if not report["failed"] and not report["invalid"] and not report["over_budget"] else 1
+            elif input_path.is_file():
+                if not input_path.name.endswith('.js'):
+                    print(f"警告: 输入文件 '{args.input}' 不是JS文件")
+                    return 1
                 
-            output_file = args.output if args.output else args.input
-            success = obfuscator.obfuscate_file(args.input, output_file)
-            return 0 if success else 1
-        else:
-            output_dir = args.output if args.output else args.input
-            copy_non_js = not args.no_copy
-            obfuscator.obfuscate_directory(args.input, output_dir, args.recursive, copy_non_js)
-            return 0
+                output_file = args.output if args.output else args.input
+                success = obfuscator.obfuscate_file(args.input, output_file)
+                obfuscator._print_run_report()
+                obfuscator.check_size_budgets()
+                if settings.get("metricsFile") or settings.get("prometheusFile"):
+                    obfuscator.write_metrics()
+                report = obfuscator.run_report
+                return 0 if success and not report["invalid"] and not report["over_budget"] else 1
+            elif obfuscator.settings["variants"]:
+                if not args.output:
+                    print("错误: 多变体构建需要用 -o 指定输出根目录")
+                    return 1
+                summary = obfuscator.obfuscate_variants(args.input, args.output, recursive=args.recursive,
+                                                        copy_non_js=not args.no_copy)
+                failed = any(success < total for success, total in summary.values())
+                report = obfuscator.run_report
+                return 0 if not failed and not report["invalid"] and not report["over_budget"] else 1
+            else:
+                output_dir = args.output if args.output else args.input
+                copy_non_js = not args.no_copy
+                obfuscator.obfuscate_directory(args.input, output_dir, args.recursive, copy_non_js)
+                report = obfuscator.run_report
+                return 0 if not report["failed"] and not report["invalid"] and not report["over_budget"] else 1
     except Exception as e:
         print(f"错误: {str(e)}")
         return 1
@@ -0,0 +1,450 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+JavaScript源码的轻量分析
+
+不构建语法树，只做词法分析：区分注释、字符串、模板字符串、正则字面量和普通代码，
+在此基础上识别webpack/browserify打包文件中的模块表，供js_obfuscator.py按模块拆分混淆，
+找出脚本顶层声明的全局名称，供跨文件的全局符号索引使用，以及在混淆前去掉注释和空白
+"""
+
+import re
+from typing import Iterator, List, NamedTuple, Optional
+
+
+class JSSyntaxError(ValueError):
+    """源码中有未闭合的字符串、注释、模板字符串或括号"""
+
+
+class Token(NamedTuple):
+    kind: str    # whitespace / comment / string / template / regex / name / number / punct
+    start: int
+    end: int
+
+
+class BundleModule(NamedTuple):
+    key: str     # 模块表中的key（对象键的原文或数组下标）
+    start: int   # 模块函数表达式在源码中的范围
+    end: int
+
+
+_TOKEN_RE = re.compile("|".join([
+    r"(?P<whitespace>[\s\ufeff]+)",
+    r"(?P<comment>//[^\n\r\u2028\u2029]*|/\*[\s\S]*?\*/)",
+    r"""(?P<string>"(?:[^"\\\n\r]|\\[\s\S])*"|'(?:[^'\\\n\r]|\\[\s\S])*')""",
+    r"(?P<name>(?:[A-Za-z_$]|[^\x00-\x7f]|\\u\{?[0-9a-fA-F]+\}?)(?:[\w$]|[^\x00-\x7f]|\\u\{?[0-9a-fA-F]+\}?)*)",
+    r"(?P<number>0[xXoObB][0-9a-fA-F_]+n?|(?:\d[\d_]*(?:\.[\d_]*)?|\.\d[\d_]*)(?:[eE][+-]?\d[\d_]*)?n?)",
+    r"(?P<punct>>>>=?|\.\.\.|[=!]==|\*\*=?|<<=?|>>=?|&&=?|\|\|=?|\?\?=?|=>|[=!<>+\-*%&|^]=|\?\.(?!\d)"
+    r"|\+\+|--|[{}()\[\];,<>+\-*%&|^!~?:=.@#])",
+]))
+
+# 模板字符串中直到 ` 或 ${ 为止的内容
+_TEMPLATE_RE = re.compile(r"(?:[^`\\$]|\\[\s\S]|\$(?!\{))*")
+
+_REGEX_RE = re.compile(r"/(?:[^/\\\[\n\r]|\\.|\[(?:[^\]\\\n\r]|\\.)*\])+/[A-Za-z]*")
+
+# 这些关键字之后的 (...) 是语句的条件，) 之后的 / 是正则字面量的开始
+_KEYWORDS_BEFORE_CONDITION = frozenset(["if", "while", "for", "with"])
+
+# 这些关键字之后的 / 是正则字面量的开始，而不是除号
+_KEYWORDS_BEFORE_EXPRESSION = frozenset([
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw", "case", "do", "else",
+    "yield", "await",
+])
+
+_OPENING = {"(": ")", "[": "]", "{": "}"}
+
+
+def tokenize(code: str) -> Iterator[Token]:
+    """
+    把源码切分为词法单元，包括空白和注释，所有单元首尾相接覆盖整个源码
+
+    模板字符串按 ${ 和 } 切分为多段template单元，其中的表达式照常切分。
+    / 根据前一个有效单元判断是除号还是正则字面量，if/while/for/with 条件的 ) 之后为正则字面量
+
+    Raises:
+        JSSyntaxError: 源码中有无法切分的内容
+    """
+    pos = 0
+    length = len(code)
+    braces = []       # 未闭合的 { 和 ${，区分 } 是普通括号还是模板表达式的结束
+    parens = []       # 未闭合的 (，是否为 if/while/for/with 的条件
+    keyword = None    # 前一个有效单元为名称时的名称
+    regex_allowed = True
+    while pos < length:
+        char = code[pos]
+        if char == "`" or (char == "}" and braces and braces[-1] == "${"):
+            if char == "}":
+                braces.pop()
+            end = _TEMPLATE_RE.match(code, pos + 1).end()
+            if code.startswith("${", end):
+                braces.append("${")
+                end += 2
+                regex_allowed = True
+            elif end < length:
+                end += 1
+                regex_allowed = False
+            else:
+                raise JSSyntaxError(f"未闭合的模板字符串（位置 {pos}）")
+            yield Token("template", pos, end)
+            pos = end
+            keyword = None
+            continue
+
+        if char == "/" and not code.startswith(("//", "/*"), pos):
+            match = _REGEX_RE.match(code, pos) if regex_allowed else None
+            if match:
+                yield Token("regex", pos, match.end())
+                pos = match.end()
+                regex_allowed = False
+                keyword = None
+            else:
+                end = pos + (2 if code.startswith("/=", pos) else 1)
+                yield Token("punct", pos, end)
+                pos = end
+                regex_allowed = True
+                keyword = None
+            continue
+
+        match = _TOKEN_RE.match(code, pos)
+        if not match:
+            if char in "'\"":
+                raise JSSyntaxError(f"未闭合的字符串（位置 {pos}）")
+            if code.startswith("/*", pos):
+                raise JSSyntaxError(f"未闭合的注释（位置 {pos}）")
+            raise JSSyntaxError(f"无法识别的字符 {char!r}（位置 {pos}）")
+        kind = match.lastgroup
+        end = match.end()
+        if kind == "punct":
+            text = code[pos:end]
+            if text == "{":
+                braces.append("{")
+            elif text == "}" and braces:
+                braces.pop()
+            if text == "(":
+                parens.append(keyword in _KEYWORDS_BEFORE_CONDITION)
+            regex_allowed = text not in (")", "]", "++", "--") or (text == ")" and bool(parens) and parens.pop())
+        elif kind == "name":
+            regex_allowed = code[pos:end] in _KEYWORDS_BEFORE_EXPRESSION
+        elif kind in ("string", "number"):
+            regex_allowed = False
+        if kind not in ("whitespace", "comment"):
+            keyword = code[pos:end] if kind == "name" else None
+        yield Token(kind, pos, end)
+        pos = end
+
+
+def significant_tokens(code: str) -> List[Token]:
+    """去掉空白和注释后的词法单元列表"""
+    return [token for token in tokenize(code) if token.kind not in ("whitespace", "comment")]
+
+
+def match_brackets(code: str, tokens: List[Token]) -> List[int]:
+    """
+    计算括号的配对关系
+
+    Returns:
+        与tokens等长的列表，括号位置为与之配对的括号下标，其余为-1
+
+    Raises:
+        JSSyntaxError: 括号不配对
+    """
+    matches = [-1] * len(tokens)
+    stack = []
+    for index, token in enumerate(tokens):
+        if token.kind != "punct":
+            continue
+        text = code[token.start:token.end]
+        if text in _OPENING:
+            stack.append(index)
+        elif text in (")", "]", "}"):
+            if not stack or _OPENING[code[tokens[stack[-1]].start]] != text:
+                raise JSSyntaxError(f"括号不配对（位置 {token.start}）")
+            opening = stack.pop()
+            matches[opening] = index
+            matches[index] = opening
+    if stack:
+        raise JSSyntaxError(f"未闭合的括号（位置 {tokens[stack[-1]].start}）")
+    return matches
+
+
+class _BundleScanner:
+    """在词法单元上查找由模块函数组成的对象或数组字面量"""
+
+    # 模块函数的参数不超过3个：webpack的(module, exports, require)和browserify的(require, module, exports)
+    MAX_PARAMS = 3
+
+    def __init__(self, code):
+        self.code = code
+        self.tokens = significant_tokens(code)
+        self.matches = match_brackets(code, self.tokens)
+
+    def text(self, index):
+        token = self.tokens[index]
+        return self.code[token.start:token.end]
+
+    def find_tables(self):
+        """返回所有模块表，每个为BundleModule列表"""
+        tables = []
+        for index, token in enumerate(self.tokens):
+            if token.kind == "punct" and self.text(index) in ("{", "["):
+                modules = self.parse_table(index)
+                if modules:
+                    tables.append(modules)
+        return tables
+
+    def parse_table(self, opening):
+        """解析一个对象或数组字面量，全部成员都是模块函数时返回模块列表，否则返回None"""
+        closing = self.matches[opening]
+        is_array = self.text(opening) == "["
+        modules = []
+        element = 0
+        pos = opening + 1
+        while pos < closing:
+            if is_array:
+                element += 1
+                if self.text(pos) == ",":
+                    pos += 1
+                    continue
+                key = str(element - 1)
+            else:
+                if self.tokens[pos].kind not in ("string", "number", "name") or self.text(pos + 1) != ":":
+                    return None
+                key = self.text(pos)
+                pos += 2
+
+            function = self.parse_module_value(pos)
+            if function is None:
+                return None
+            start, end, pos = function
+            modules.append(BundleModule(key, self.tokens[start].start, self.tokens[end].end))
+            if pos < closing:
+                if self.text(pos) != ",":
+                    return None
+                pos += 1
+        return modules
+
+    def parse_module_value(self, pos):
+        """
+        解析模块表中的一个值：函数表达式、括号包裹的函数表达式，
+        或browserify的 [函数, 依赖表] 数组
+
+        Returns:
+            (函数首个单元下标, 函数最后一个单元下标, 值之后的下标)，不是模块函数时返回None
+        """
+        text = self.text(pos)
+        if text == "(":
+            function = self.parse_function(pos + 1)
+            if function and function[2] == self.matches[pos]:
+                return function[0], function[1], self.matches[pos] + 1
+            return None
+        if text == "[":
+            function = self.parse_function(pos + 1)
+            closing = self.matches[pos]
+            if (function and self.text(function[2]) == "," and self.text(function[2] + 1) == "{"
+                    and self.matches[function[2] + 1] + 1 == closing):
+                return function[0], function[1], closing + 1
+            return None
+        return self.parse_function(pos)
+
+    def parse_function(self, pos):
+        """解析 function (...) {...}、(...) => {...} 或 name => {...}"""
+        if pos >= len(self.tokens):
+            return None
+        start = pos
+        if self.text(pos) == "function":
+            pos += 1
+            if self.tokens[pos].kind == "name":
+                pos += 1
+            if self.text(pos) != "(" or not self.check_params(pos):
+                return None
+            pos = self.matches[pos] + 1
+        elif self.text(pos) == "(":
+            if not self.check_params(pos):
+                return None
+            pos = self.matches[pos] + 1
+            if self.text(pos) != "=>":
+                return None
+            pos += 1
+        elif self.tokens[pos].kind == "name" and pos + 1 < len(self.tokens) and self.text(pos + 1) == "=>":
+            pos += 2
+        else:
+            return None
+
+        if pos >= len(self.tokens) or self.text(pos) != "{":
+            return None
+        end = self.matches[pos]
+        return start, end, end + 1
+
+    def check_params(self, opening):
+        """参数都是简单标识符且不超过MAX_PARAMS个"""
+        closing = self.matches[opening]
+        params = [self.tokens[index] for index in range(opening + 1, closing)]
+        if not params:
+            return True
+        names = params[0::2]
+        commas = params[1::2]
+        return (len(names) <= self.MAX_PARAMS
+                and all(token.kind == "name" for token in names)
+                and all(self.code[token.start:token.end] == "," for token in commas))
+
+
+def find_bundle_modules(code: str, min_modules: int = 2, min_coverage: float = 0.5) -> Optional[List[BundleModule]]:
+    """
+    识别webpack（对象或数组形式的模块表，含括号包裹的工厂函数和箭头函数）和browserify打包文件中的模块函数
+
+    存在多个候选时选择模块代码总量最大的一个；模块函数总长度占源码的比例低于min_coverage时视为无法识别
+
+    Returns:
+        按位置排序的模块列表，无法识别时返回None
+    """
+    try:
+        tables = _BundleScanner(code).find_tables()
+    except JSSyntaxError:
+        return None
+    tables = [modules for modules in tables if len(modules) >= min_modules]
+    if not tables:
+        return None
+    best = max(tables, key=lambda modules: sum(module.end - module.start for module in modules))
+    if sum(module.end - module.start for module in best) < len(code) * min_coverage:
+        return None
+    return best
+
+
+def identifier_names(code: str) -> set:
+    """源码中出现的全部标识符名称（不区分声明、引用和属性名，包括关键字）"""
+    return {code[token.start:token.end] for token in tokenize(code) if token.kind == "name"}
+
+
+# 之后出现function/class时可以是声明语句的单元
+_STATEMENT_BOUNDARIES = frozenset(["", ";", "}", "{", "export", "default"])
+
+
+def global_declarations(code: str) -> set:
+    """
+    脚本顶层声明的名称，即在浏览器中被所有脚本共享的全局名称：
+    顶层的let/const/class声明，以及不在任何函数中的var和function声明（包括 {} 块和for语句中的）
+
+    函数表达式和类表达式的名称、解构声明中的名称不计入；对象字面量方法中的var会被多算，
+    多算只会让索引多保留名称
+
+    Raises:
+        JSSyntaxError: 源码无法切分
+    """
+    tokens = significant_tokens(code)
+    names = set()
+    scopes = []           # 每层 {} 是否为函数体或类体
+    function_depth = 0    # 外层函数体和类体的层数
+    parens = 0
+    body_parens = None    # function/class关键字所在的括号深度，该深度上的下一个 { 是函数体或类体
+    declaring = None      # 正在解析的var/let/const声明所在的 (花括号层数, 括号深度)
+    expect_name = False   # 下一个名称是被声明的名称
+    previous = ""
+    previous_end = 0
+    for token in tokens:
+        text = code[token.start:token.end]
+        if token.kind == "name":
+            if expect_name:
+                names.add(text)
+                expect_name = False
+            elif previous != ".":
+                if text in ("function", "class"):
+                    if function_depth == 0 and (text == "function" or not scopes) and parens == 0 and (
+                            previous in _STATEMENT_BOUNDARIES or previous == "async"
+                            or "\n" in code[previous_end:token.start]):
+                        expect_name = True
+                    body_parens = parens
+                elif function_depth == 0 and (text == "var" or (text in ("let", "const") and not scopes and parens == 0)):
+                    declaring = (len(scopes), parens)
+                    expect_name = True
+        elif token.kind == "punct":
+            if text == "{":
+                is_body = previous == "=>" or body_parens == parens
+                if is_body:
+                    body_parens = None
+                    function_depth += 1
+                scopes.append(is_body)
+            elif text == "}":
+                if scopes and scopes.pop():
+                    function_depth -= 1
+            elif text in ("(", "["):
+                parens += 1
+            elif text in (")", "]"):
+                parens -= 1
+            if declaring is not None and (len(scopes), parens) < declaring:
+                declaring = None
+            if text == "," and declaring == (len(scopes), parens):
+                expect_name = True
+            elif text == ";" and declaring == (len(scopes), parens):
+                declaring = None
+            elif not (text == "*" and previous == "function"):
+                expect_name = False
+        else:
+            expect_name = False
+        previous = text
+        previous_end = token.end
+    return names
+
+
+# 去掉注释时保留的许可证注释
+_LICENSE_COMMENT_RE = re.compile(r"^/[*/]!|@license|@preserve")
+
+# 前后两个单元直接相连会合并为一个单元时，中间需要保留一个空格
+_IDENTIFIER_CHARS = re.compile(r"[\w$\\]|[^\x00-\x7f]")
+_JOINING_PAIRS = frozenset(["++", "--", "//", "/*", "<!"])
+
+# 这些单元之后或之前的换行不影响自动插入分号，可以去掉
+_NO_NEWLINE_AFTER = frozenset([";", ",", "{", "(", "["])
+_NO_NEWLINE_BEFORE = frozenset(["}", ")", "]", ";", ","])
+
+
+def strip_source(code: str) -> str:
+    """
+    去掉注释和多余的空白，保留许可证注释（/*!、//!开头或包含@license、@preserve的注释）
+
+    包含换行的空白和注释换成一个换行，保持自动插入分号的行为不变；同一行中的空白只在
+    前后两个单元相连会改变切分结果时（如 a in b、a - -b、1 .x）保留一个空格。
+    字符串、模板字符串和正则字面量原样保留，文件开头的 #! 行也原样保留
+
+    Raises:
+        JSSyntaxError: 源码无法切分
+    """
+    parts = []
+    if code.startswith("#!"):
+        end = len(code.split("\n", 1)[0])
+        parts.append(code[:end])
+        code = " " * end + code[end:]    # 保持位置不变，只让第一行作为空白处理
+    previous = None           # 上一个输出单元的 (类型, 文本)
+    gap = False               # 上一个输出单元之后有被去掉的空白或注释
+    newline = False           # 被去掉的部分中有换行
+    for token in tokenize(code):
+        text = code[token.start:token.end]
+        if token.kind == "whitespace" or (token.kind == "comment" and not _LICENSE_COMMENT_RE.search(text)):
+            gap = True
+            newline = newline or any(char in text for char in "\n\r\u2028\u2029")
+            continue
+        if previous is not None and gap:
+            parts.append(_separator(previous, token.kind, text, newline))
+        elif parts and not previous:
+            parts.append("\n")
+        parts.append(text)
+        previous = (token.kind, text)
+        gap = newline = False
+    return "".join(parts)
+
+
+def _separator(previous, kind, text, newline):
+    """被去掉的空白和注释换成的分隔符"""
+    previous_kind, previous_text = previous
+    if previous_kind == "comment" and previous_text.startswith("//"):
+        return "\n"
+    if newline:
+        if ((previous_kind == "punct" and previous_text in _NO_NEWLINE_AFTER)
+                or (kind == "punct" and text in _NO_NEWLINE_BEFORE)):
+            return ""
+        return "\n"
+    last, first = previous_text[-1], text[0]
+    if ((_IDENTIFIER_CHARS.match(last) and _IDENTIFIER_CHARS.match(first)) or last + first in _JOINING_PAIRS
+            or (previous_kind == "number" and first == ".")):
+        return " "
+    return ""
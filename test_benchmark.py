@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+测试benchmark_obfuscation.py的基准测试、混淆后端比较和autotune_obfuscation.py的自动调优功能
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+from js_obfuscator import JSObfuscator, MiniRacer
+from benchmark_obfuscation import (benchmark_profiles, print_results, benchmark_backends, print_backend_results,
+                                   benchmark_startup, print_startup_results, benchmark_strip, print_strip_results)
+from autotune_obfuscation import Autotuner, build_candidates, candidate_options, candidate_strength, write_ini_section
+
+BENCH_ENTRY = """
+function fib(n) {
+    return n < 2 ? n : fib(n - 1) + fib(n - 2);
+}
+
+function workload(i) {
+    return fib(12) + i;
+}
+"""
+
+def test_benchmark_profiles():
+    """测试多个INI section的运行时开销比较"""
+    print("🧪 测试运行时开销基准测试...")
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            entry_file = Path(temp_dir) / "entry.js"
+            entry_file.write_text(BENCH_ENTRY, encoding='utf-8')
+            
+            results = benchmark_profiles(entry_file, "workload", iterations=50, config_file="obfuscator_config.ini",
+                                         sections=["BALANCED", "MINIMAL"], repeat=1)
+        
+        print_results(results)
+        profiles = [result["profile"] for result in results]
+        if profiles == ["original", "BALANCED", "MINIMAL"] and all(result["run_ms"] > 0 for result in results):
+            print("✅ 基准测试结果完整")
+        else:
+            print(f"⚠️  基准测试结果与预期不符: {profiles}")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_benchmark_backends():
+    """测试用同一批文件比较混淆后端"""
+    print("\n🧪 测试混淆后端比较...")
+    
+    backends = ["npx", "worker"]
+    if MiniRacer is not None:
+        backends.append("embedded")
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i in range(3):
+                (Path(temp_dir) / f"snippet{i}.js").write_text(f"function snippet{i}() {{ return {i}; }}\n", encoding='utf-8')
+            results = benchmark_backends(temp_dir, backends)
+        
+        print_backend_results(results)
+        by_backend = {result["backend"]: result for result in results}
+        if list(by_backend) == backends and all(result["files"] == 3 for result in results):
+            print("✅ 所有后端都完成了混淆")
+        else:
+            print("⚠️  后端比较结果与预期不符")
+        
+        # 相同seed下，常驻Node进程与npx调用的是同一个javascript-obfuscator
+        if by_backend["worker"]["same_output"]:
+            print("✅ worker后端的输出与npx一致")
+        else:
+            print("⚠️  worker后端的输出与npx不一致")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_benchmark_strip():
+    """测试比较混淆前是否去掉注释和空白"""
+    print("\n🧪 测试去掉注释和空白的效果...")
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for i in range(2):
+                (Path(temp_dir) / f"doc{i}.js").write_text(
+                    "/*! sample | MIT license */\n" + "/**\n * 说明文档\n */\n" * 20
+                    + f"function doc{i}(a, b) {{\n    // 求和\n    return a + b;\n}}\n", encoding='utf-8')
+            results = benchmark_strip(temp_dir)
+        
+        print_strip_results(results)
+        plain, stripped = results
+        if stripped["strip"] and stripped["input_bytes"] < plain["input_bytes"] / 2 and stripped["size_ratio"] < 1:
+            print("✅ 去掉注释和空白后输入和输出都变小")
+        else:
+            print("⚠️  去掉注释和空白后体积没有减少")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_benchmark_startup():
+    """测试Node编译缓存的冷启动测量"""
+    print("\n🧪 测试冷启动测量...")
+    
+    # 记录每次启动Node时编译缓存目录中已有的文件数，第一次计时时缓存目录应为空
+    original_get_node_env = JSObfuscator._get_node_env
+    existing_files = []
+    
+    def get_node_env(self):
+        cache_dir = self.settings["compileCacheDir"]
+        if cache_dir:
+            existing_files.append(sum(len(files) for _, _, files in os.walk(cache_dir)))
+        return original_get_node_env(self)
+    
+    try:
+        JSObfuscator._get_node_env = get_node_env
+        try:
+            results = benchmark_startup(["npx"], repeat=1)
+        finally:
+            JSObfuscator._get_node_env = original_get_node_env
+        print_startup_results(results)
+        
+        node_version = JSObfuscator().node_version
+        supported = tuple(int(part) for part in node_version.lstrip('v').split('.')[:2]) >= (22, 1)
+        cached = next(result for result in results if result["compile_cache"])
+        if len(results) == 2 and (cached["cache_files"] > 0 or not supported):
+            print(f"✅ 冷启动测量完成（Node {node_version}）")
+        else:
+            print("⚠️  编译缓存没有生成缓存文件")
+        
+        if existing_files and existing_files[0] == 0:
+            print("✅ 第一次计时前编译缓存为空")
+        else:
+            print(f"⚠️  第一次计时前编译缓存中已有文件: {existing_files}")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_autotune():
+    """测试在体积预算内搜索并写入INI section"""
+    print("\n🧪 测试混淆选项自动调优...")
+    
+    grid = {
+        "controlFlowFlatteningThreshold": [0, 0.75],
+        "deadCodeInjectionThreshold": [0, 0.4],
+        "stringArrayThreshold": [0.75],
+        "splitStringsChunkLength": [0],
+    }
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            sample_files = []
+            for i in range(4):
+                sample_file = Path(temp_dir) / f"sample{i}.js"
+                sample_file.write_text(f"function sample{i}(a) {{ var s = 'value {i}'; return s + a; }}\n", encoding='utf-8')
+                sample_files.append(sample_file)
+            
+            obfuscator = JSObfuscator(settings={"reproducible": True})
+            tuner = Autotuner(obfuscator, sample_files, max_expansion=1000)
+            best = tuner.successive_halving(build_candidates(grid))
+            
+            config_file = Path(temp_dir) / "tuned.ini"
+            write_ini_section(config_file, "AUTOTUNED", candidate_options(obfuscator.options, best["candidate"]))
+            tuned = JSObfuscator(config_file=str(config_file), config_section="AUTOTUNED")
+        
+        # 预算足够宽松时应选出强度最高的候选
+        if (tuned.options["controlFlowFlatteningThreshold"] == 0.75 and tuned.options["deadCodeInjection"]
+                and not tuned.options["splitStrings"]):
+            print("✅ 选出了预算内最强的配置并写入INI")
+        else:
+            print(f"⚠️  自动调优结果与预期不符: {best}")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_autotune_halving_fallback():
+    """测试逐轮减半时保留的候选在更多样本上超出预算，退回上一轮被淘汰的候选"""
+    print("\n🧪 测试逐轮减半的回退...")
+    
+    grid = {
+        "controlFlowFlatteningThreshold": [0, 0.25, 0.5, 0.75],
+        "deadCodeInjectionThreshold": [0],
+        "stringArrayThreshold": [0.75],
+        "splitStringsChunkLength": [0],
+    }
+    
+    class MockTuner(Autotuner):
+        # 强的候选只在少量样本上满足预算，全部样本上只有cff<=0.25的满足
+        def evaluate(self, candidate, files):
+            feasible = len(files) < len(self.sample_files) or candidate["controlFlowFlatteningThreshold"] <= 0.25
+            return {"candidate": candidate, "strength": candidate_strength(candidate), "expansion": 1.0,
+                    "slowdown": None, "feasible": feasible}
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            sample_files = []
+            for i in range(4):
+                sample_file = Path(temp_dir) / f"sample{i}.js"
+                sample_file.write_text(f"var sample{i} = {i};\n", encoding='utf-8')
+                sample_files.append(sample_file)
+            tuner = MockTuner(None, sample_files)
+            candidates = build_candidates(grid)
+            best = tuner.successive_halving(candidates)
+            expected = tuner.best([tuner.evaluate(candidate, sample_files) for candidate in candidates])
+        
+        if best is not None and best["candidate"] == expected["candidate"]:
+            print(f"✅ 退回了全部样本上满足预算的最强候选: cff={best['candidate']['controlFlowFlatteningThreshold']}")
+        else:
+            print(f"❌ 逐轮减半的结果 {best} 与完整评估的结果 {expected} 不一致")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+if __name__ == "__main__":
+    print("🚀 开始测试 benchmark_obfuscation.py\n")
+    
+    test_benchmark_profiles()
+    test_benchmark_backends()
+    test_benchmark_strip()
+    test_benchmark_startup()
+    test_autotune()
+    test_autotune_halving_fallback()
+    
+    print("\n🎉 所有测试完成！")
@@ -223,10 +223,64 @@ identifierNamesGenerator = mangled
             os.remove(test_config_file)
             print(f"🗑️  清理测试文件: {test_config_file}")
 
+def test_size_tiers():
+    """测试按文件大小分级的配置"""
+    print("\n\n🧪 测试按文件大小分级的配置...")
+    
+    test_config_content = """[DEFAULT]
+controlFlowFlattening = true
+controlFlowFlatteningThreshold = 0.7
+
+[SIZE_TIER_SMALL]
+minSize = 1KB
+controlFlowFlatteningThreshold = 0.2
+
+[SIZE_TIER_LARGE]
+minSize = 4KB
+controlFlowFlattening = false
+"""
+    
+    test_config_file = "test_tier_config.ini"
+    
+    try:
+        with open(test_config_file, 'w', encoding='utf-8') as f:
+            f.write(test_config_content)
+        
+        obfuscator = JSObfuscator(config_file=test_config_file)
+        print(f"📋 加载的分级: {[tier['name'] for tier in obfuscator.size_tiers]}")
+        
+        cases = [
+            ("var a = 1;\n", True, 0.7),
+            ("var a = 1;\n" * 200, True, 0.2),
+            ("var a = 1;\n" * 1000, False, 0.7),
+        ]
+        all_correct = True
+        for js_code, expected_cff, expected_threshold in cases:
+            options = obfuscator.get_obfuscation_options_for_file("test.js", js_code)
+            actual = (options["controlFlowFlattening"], options["controlFlowFlatteningThreshold"])
+            if actual == (expected_cff, expected_threshold):
+                print(f"  ✅ {len(js_code)} 字节: {actual}")
+            else:
+                print(f"  ❌ {len(js_code)} 字节: 期望 {(expected_cff, expected_threshold)}, 实际 {actual}")
+                all_correct = False
+        
+        if all_correct:
+            print("✅ 分级配置应用正确！")
+        else:
+            print("⚠️  分级配置应用有误")
+        
+    except Exception as e:
+        print(f"❌ 分级配置测试失败: {e}")
+    finally:
+        if os.path.exists(test_config_file):
+            os.remove(test_config_file)
+            print(f"🗑️  清理测试文件: {test_config_file}")
+
 if __name__ == "__main__":
     print("🚀 开始测试 INI 配置文件功能\n")
     
     test_ini_config()
     test_config_file_parsing()
+    test_size_tiers()
     
     print("\n🎉 所有测试完成！")
\ No newline at end of file
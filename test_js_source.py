@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+测试JS源码的词法分析和打包文件模块识别
+"""
+
+from js_source import tokenize, find_bundle_modules, global_declarations, strip_source, JSSyntaxError
+
+def test_tokenize():
+    """测试字符串、模板字符串、正则和除号的切分"""
+    print("🧪 测试词法分析...")
+
+    code = 'var a = b / c; var r = /}[/]/g; var t = `x${ {k: "}"}.k }y`; // }\n/* { */ x = {}/2;'
+    try:
+        tokens = list(tokenize(code))
+        kinds = [(token.kind, code[token.start:token.end]) for token in tokens if token.kind != "whitespace"]
+
+        if "".join(code[token.start:token.end] for token in tokens) == code:
+            print("✅ 词法单元首尾相接覆盖整个源码")
+        else:
+            print("❌ 词法单元没有覆盖整个源码")
+
+        expected = [("punct", "/"), ("regex", "/}[/]/g"), ("template", "`x${"), ("template", "}y`"),
+                    ("comment", "// }"), ("comment", "/* { */")]
+        missing = [item for item in expected if item not in kinds]
+        if not missing and kinds.count(("punct", "/")) == 2:
+            print("✅ 正则、除号、模板字符串和注释切分正确")
+        else:
+            print(f"❌ 切分结果缺少: {missing}")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+    try:
+        list(tokenize('var s = "abc'))
+        print("❌ 未闭合的字符串没有报错")
+    except JSSyntaxError:
+        print("✅ 未闭合的字符串报告为语法错误")
+
+def test_find_bundle_modules():
+    """测试识别webpack和browserify的模块表"""
+    print("\n🧪 测试打包文件模块识别...")
+
+    body = "var data = [" + ",".join(f'"item{i}"' for i in range(50)) + "];"
+    cases = {
+        "webpack5": ("(() => { var __webpack_modules__ = ({\n"
+                     f'"./a.js": ((module) => {{ {body} module.exports = data; }}),\n'
+                     f'"./b.js": (function (module, exports, __webpack_require__) {{ {body} }})\n'
+                     "}); })();", ['"./a.js"', '"./b.js"']),
+        "webpack4": (f"(function(modules){{ return modules[0] }})([function(e,t,n){{ {body} }},,function(e){{ {body} }}])",
+                     ["0", "2"]),
+        "browserify": (f'require=(function(){{}})()({{1:[function(require,module,exports){{ {body} }},{{"./b":2}}],'
+                       f"2:[function(require,module,exports){{ {body} }},{{}}]}},{{}},[1]);", ["1", "2"]),
+    }
+    for name, (code, expected_keys) in cases.items():
+        modules = find_bundle_modules(code)
+        keys = [module.key for module in modules] if modules else None
+        if keys == expected_keys and all(code[module.start:module.end].startswith(("function", "(module"))
+                                         for module in modules):
+            print(f"  ✅ {name}: {keys}")
+        else:
+            print(f"  ❌ {name}: 期望 {expected_keys}, 实际 {keys}")
+
+    if find_bundle_modules("var handlers = {a: function () {}, b: 1}; " + body) is None:
+        print("✅ 普通代码不会被识别为打包文件")
+    else:
+        print("❌ 普通代码被误识别为打包文件")
+
+def test_global_declarations():
+    """测试收集顶层声明的全局名称"""
+    print("\n🧪 测试全局声明收集...")
+
+    code = ("var a = 1, b = [1, 2], c; let d = {x: 1}; const e = () => 1;\n"
+            "function f() { var nested = 1; function inner() {} }\n"
+            "async function g() {} function* h() {} class K {}\n"
+            "for (var i = 0; i < 3; i++) { var blockVar = i; let scoped = 1; }\n"
+            "var expr = function named() {}; obj.function = 1;")
+    declared = global_declarations(code)
+    expected = {"a", "b", "c", "d", "e", "f", "g", "h", "K", "i", "blockVar", "expr"}
+    if declared == expected:
+        print(f"✅ 顶层声明: {sorted(declared)}")
+    else:
+        print(f"❌ 期望 {sorted(expected)}, 实际 {sorted(declared)}")
+
+def test_strip_source():
+    """测试去掉注释和空白、保留许可证注释"""
+    print("\n🧪 测试去掉注释和空白...")
+
+    code = ("/*! lib v1 | MIT license */\n// helper\n/**\n * doc\n */\nfunction add(a, b) {\n"
+            "    return a + b;  // sum\n}\nvar x = add(1, 2)\n(function () {})\n"
+            "var y = a - -b, n = 1 .toString(), r = 4 / /re /.source;\n"
+            "let s = `keep   ${ x  +  1 }`;  // @license keep\nreturn\nx")
+    expected = ("/*! lib v1 | MIT license */\nfunction add(a,b){return a+b;}\nvar x=add(1,2)\n(function(){})\n"
+                "var y=a- -b,n=1 .toString(),r=4/ /re /.source;let s=`keep   ${x+1}`;// @license keep\nreturn\nx")
+    stripped = strip_source(code)
+    if stripped == expected:
+        print("✅ 注释和空白已去掉，许可证注释、换行和必要的空格保留")
+    else:
+        print(f"❌ 结果与预期不符: {stripped!r}")
+
+    # if/while/for/with 条件的 ) 之后是正则字面量，正则中的空白和 // 原样保留
+    cases = {
+        "if (ok) /a  b/.test(y) && go()": "if(ok)/a  b/.test(y)&&go()",
+        "if (a) / +x/.test(y)": "if(a)/ +x/.test(y)",
+        "if (x) /[//]/.test(s) && go()\nfoo()": "if(x)/[//]/.test(s)&&go()\nfoo()",
+        "while (f(g(x))) /x y/.test(z); var r = (a + b) / 2 / c": "while(f(g(x)))/x y/.test(z);var r=(a+b)/2/c",
+    }
+    for code, expected in cases.items():
+        stripped = strip_source(code)
+        if stripped == expected:
+            print(f"  ✅ {code!r}")
+        else:
+            print(f"  ❌ {code!r}: 期望 {expected!r}, 实际 {stripped!r}")
+
+if __name__ == "__main__":
+    print("🚀 开始测试 js_source.py\n")
+
+    test_tokenize()
+    test_find_bundle_modules()
+    test_global_declarations()
+    test_strip_source()
+
+    print("\n🎉 所有测试完成！")
@@ -3,9 +3,41 @@
 测试js_obfuscator.py的混淆功能
 """
 
+import io
 import os
+import re
 import sys
+import json
+import tempfile
+import zipfile
+import threading
+import pstats
+import tracemalloc
+import subprocess
+from contextlib import redirect_stdout
+from pathlib import Path
+import js_obfuscator
 from js_obfuscator import JSObfuscator
+from cache_server import create_server
+
+class RecordingGate(js_obfuscator._MemoryGate):
+    """记录同时预留的内存和同时运行的任务数峰值的准入控制"""
+    gates = []
+    
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.peak = 0
+        self.peak_running = 0
+        self.reservations = 0
+        RecordingGate.gates.append(self)
+    
+    @js_obfuscator.contextmanager
+    def reserve(self, amount):
+        with super().reserve(amount):
+            self.reservations += 1
+            self.peak = max(self.peak, self.in_use)
+            self.peak_running = max(self.peak_running, self.running)
+            yield
 
 def test_single_file():
     """测试单个文件混淆"""
@@ -169,6 +201,1024 @@ function importantFunction() {
     except Exception as e:
         print(f"❌ 测试失败: {e}")
 
+def test_timeout_fallback():
+    """测试超时终止与降级重试"""
+    print("\n🧪 测试混淆超时...")
+    
+    test_input_file = "test_timeout_input.js"
+    test_output_file = "test_timeout_output.js"
+    
+    try:
+        with open(test_input_file, 'w', encoding='utf-8') as f:
+            f.write("function slow() { return 1; }\n")
+        
+        # 超时时间极短，主配置和降级配置都会超时
+        obfuscator = JSObfuscator(settings={"timeout": 0.01})
+        success = obfuscator.obfuscate_file(test_input_file, test_output_file)
+        
+        report = obfuscator.run_report
+        print(f"📊 超时: {report['timed_out']}")
+        print(f"📊 降级: {report['fallback']}")
+        print(f"📊 失败: {report['failed']}")
+        
+        if not success and test_input_file in report["timed_out"] and test_input_file in report["failed"]:
+            print("✅ 超时后已降级重试并记为失败")
+        else:
+            print("⚠️  超时处理结果与预期不符")
+        
+        # 命令行混淆单个文件时，超时后降级成功的文件也列在运行汇总中
+        original_run = JSObfuscator._run_obfuscator
+        calls = []
+        
+        def time_out_once(self, js_code, options):
+            calls.append(1)
+            if len(calls) == 1:
+                raise js_obfuscator.ObfuscationTimeoutError("模拟超时")
+            return original_run(self, js_code, options)
+        
+        JSObfuscator._run_obfuscator = time_out_once
+        original_argv = sys.argv
+        sys.argv = ["js_obfuscator.py", test_input_file, "-o", test_output_file]
+        stdout = io.StringIO()
+        try:
+            with redirect_stdout(stdout):
+                exit_code = js_obfuscator.main()
+        finally:
+            JSObfuscator._run_obfuscator = original_run
+            sys.argv = original_argv
+        output = stdout.getvalue()
+        if exit_code == 0 and "⏱️  混淆超时的文件 (1)" in output and "🔁 使用降级配置混淆的文件 (1)" in output:
+            print("✅ 单文件模式的运行汇总列出了超时和降级的文件")
+        else:
+            print("⚠️  单文件模式没有打印超时和降级的文件")
+        
+        # 命令行混淆目录时，有文件混淆失败则返回非0退出码
+        def always_time_out(self, js_code, options):
+            raise js_obfuscator.ObfuscationTimeoutError("模拟超时")
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            input_dir.mkdir()
+            (input_dir / "slow.js").write_text("function slow() { return 1; }\n", encoding='utf-8')
+            JSObfuscator._run_obfuscator = always_time_out
+            sys.argv = ["js_obfuscator.py", str(input_dir), "-o", str(Path(temp_dir) / "output")]
+            try:
+                with redirect_stdout(io.StringIO()):
+                    directory_exit_code = js_obfuscator.main()
+            finally:
+                JSObfuscator._run_obfuscator = original_run
+                sys.argv = original_argv
+        if directory_exit_code == 1:
+            print("✅ 目录模式有文件混淆失败时返回非0退出码")
+        else:
+            print(f"⚠️  目录模式混淆失败时的退出码为 {directory_exit_code}")
+            
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+    finally:
+        for file in [test_input_file, test_output_file]:
+            if os.path.exists(file):
+                os.remove(file)
+
+def test_directory_dedupe():
+    """测试目录混淆时合并重复文件"""
+    print("\n🧪 测试重复文件只混淆一次...")
+    
+    lib_code = "function sharedHelper(x) { return x * 2; }\n"
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            output_dir = Path(temp_dir) / "output"
+            for sub_dir in ["a", "b", "c"]:
+                (input_dir / sub_dir).mkdir(parents=True)
+                (input_dir / sub_dir / "lib.js").write_text(lib_code, encoding='utf-8')
+            (input_dir / "main.js").write_text("console.log(1);\n", encoding='utf-8')
+            
+            obfuscator = JSObfuscator()
+            success_js, total_js, _, _ = obfuscator.obfuscate_directory(input_dir, output_dir)
+            
+            outputs = [(output_dir / sub_dir / "lib.js").read_text(encoding='utf-8') for sub_dir in ["a", "b", "c"]]
+            print(f"📊 成功: {success_js}/{total_js}，复用: {obfuscator.run_report['duplicates']}")
+            
+            if success_js == total_js == 4 and obfuscator.run_report["duplicates"] == 2 and len(set(outputs)) == 1:
+                print("✅ 重复文件已复用同一份混淆结果")
+            else:
+                print("⚠️  重复文件处理结果与预期不符")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_memory_budget():
+    """测试按估算内存准入混淆任务：同时运行的任务的估算总和不超过内存预算"""
+    print("\n🧪 测试内存预算...")
+    
+    budget = int(js_obfuscator.NODE_BASE_MEMORY * 2.5)
+    RecordingGate.gates = []
+    original_gate = js_obfuscator._MemoryGate
+    js_obfuscator._MemoryGate = RecordingGate
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            output_dir = Path(temp_dir) / "output"
+            input_dir.mkdir()
+            for i in range(6):
+                (input_dir / f"job{i}.js").write_text(f"function job{i}(a, b) {{ return a + b + {i}; }}\n", encoding='utf-8')
+            
+            obfuscator = JSObfuscator(settings={"workers": 4, "memoryBudget": str(budget)})
+            success, total, _, _ = obfuscator.obfuscate_directory(input_dir, output_dir)
+            heap_mb = obfuscator._get_node_heap_limit(100 * 1024 ** 2, obfuscator.options)
+        
+        gate = RecordingGate.gates[0]
+        print(f"📊 结果: {success}/{total}，同时预留的内存峰值 {gate.peak / 1024 ** 2:.0f} MB / 预算 {budget / 1024 ** 2:.0f} MB")
+        if success == total == 6 and 0 < gate.peak <= budget and gate.in_use == 0:
+            print("✅ 同时运行的任务没有超出内存预算")
+        else:
+            print("⚠️  同时运行的任务超出了内存预算")
+        
+        # 堆上限不低于512MB，预算更小时取下限
+        if heap_mb <= max(budget // 1024 ** 2, 512):
+            print(f"✅ Node堆上限 {heap_mb} MB 不超过内存预算")
+        else:
+            print(f"⚠️  Node堆上限 {heap_mb} MB 超出了内存预算")
+        
+        if obfuscator.run_report["peak_rss"] > 0:
+            print("✅ 运行汇总记录了混淆进程树的峰值内存")
+        else:
+            print("⚠️  没有记录峰值内存")
+        
+        # auto预算只读取一次cgroup和物理内存
+        reads = []
+        original_total = js_obfuscator.get_total_memory
+        js_obfuscator.get_total_memory = lambda: reads.append(1) or 8 * 1024 ** 3
+        try:
+            auto_obfuscator = JSObfuscator(settings={"memoryBudget": "auto"})
+            budgets = {auto_obfuscator._get_memory_budget() for _ in range(3)}
+            auto_obfuscator._get_node_heap_limit(1024, auto_obfuscator.options)
+            auto_obfuscator._get_worker_count()
+        finally:
+            js_obfuscator.get_total_memory = original_total
+        if len(reads) == 1 and budgets == {6 * 1024 ** 3}:
+            print("✅ 内存预算只计算一次")
+        else:
+            print(f"⚠️  内存预算计算了 {len(reads)} 次")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+    finally:
+        js_obfuscator._MemoryGate = original_gate
+
+def test_classify_js_file():
+    """测试已压缩和第三方库文件的判断"""
+    print("\n🧪 测试混淆前的文件分类...")
+    
+    cases = {
+        "app.min.js": ("var a=1;", "passthrough"),
+        "vendor/lib.js": ("var b = 2;\n", "passthrough"),
+        "jquery.js": ("/*! jQuery v3.7.1 | (c) OpenJS Foundation | jquery.org/license */\nvar c = 3;\n", "third-party"),
+        "bundle.js": ("function d(){return 4}" * 200, "minified"),
+        "main.js": ("function main() {\n    return 5;\n}\n" * 50, "obfuscate"),
+    }
+    
+    try:
+        obfuscator = JSObfuscator()
+        all_correct = True
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for rel_path, (js_code, expected) in cases.items():
+                file_path = Path(temp_dir) / rel_path
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                file_path.write_text(js_code, encoding='utf-8')
+                
+                category, reason = obfuscator.classify_js_file(file_path, rel_path)
+                if category == expected:
+                    print(f"  ✅ {rel_path}: {category} {reason}")
+                else:
+                    print(f"  ❌ {rel_path}: 期望 {expected}, 实际 {category} {reason}")
+                    all_correct = False
+        
+        if all_correct:
+            print("✅ 文件分类正确！")
+        else:
+            print("⚠️  部分文件分类有误")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_precompress():
+    """测试为输出生成压缩副本，内容未变时跳过重新压缩"""
+    print("\n🧪 测试预压缩副本...")
+    
+    formats = ["gzip"] + (["brotli"] if js_obfuscator.brotli is not None else [])
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            output_dir = Path(temp_dir) / "output"
+            input_dir.mkdir()
+            (input_dir / "app.js").write_text("function calculateSum(a, b) { return a + b; }\n", encoding='utf-8')
+            (input_dir / "style.css").write_text("body { color: red; }\n" * 20, encoding='utf-8')
+            
+            obfuscator = JSObfuscator(settings={"reproducible": True})
+            obfuscator.obfuscate_directory(input_dir, output_dir, precompress=formats)
+            first = obfuscator.run_report
+            
+            mismatched = []
+            for name in ("app.js", "style.css"):
+                data = (output_dir / name).read_bytes()
+                if js_obfuscator.gzip.decompress((output_dir / f"{name}.gz").read_bytes()) != data:
+                    mismatched.append(f"{name}.gz")
+                if "brotli" in formats and js_obfuscator.brotli.decompress((output_dir / f"{name}.br").read_bytes()) != data:
+                    mismatched.append(f"{name}.br")
+            
+            # 第二次运行输出不变，压缩副本全部跳过
+            obfuscator.obfuscate_directory(input_dir, output_dir, precompress=formats)
+            second = obfuscator.run_report
+            
+            # 显式传入空列表时本次运行不生成压缩副本，即使设置中开启了precompress
+            JSObfuscator(settings={"precompress": ["gzip"]}).obfuscate_directory(
+                input_dir, Path(temp_dir) / "plain", precompress=[])
+            opted_out = not list((Path(temp_dir) / "plain").glob("*.gz"))
+        
+        expected = 2 * len(formats)
+        print(f"📊 格式: {formats}，第一次生成 {first['precompressed']} 个，第二次跳过 {second['precompress_unchanged']} 个")
+        if not mismatched and first["precompressed"] == expected and not first["precompress_failed"]:
+            print("✅ 压缩副本解压后与输出一致")
+        else:
+            print(f"⚠️  压缩副本与输出不一致: {mismatched}")
+        
+        if second["precompress_unchanged"] == expected and second["precompressed"] == 0:
+            print("✅ 输出未变时跳过了重新压缩")
+        else:
+            print("⚠️  输出未变时仍重新压缩了副本")
+        
+        if opted_out:
+            print("✅ precompress=[]时没有生成压缩副本")
+        else:
+            print("⚠️  precompress=[]时仍生成了压缩副本")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_reproducible_output():
+    """测试可复现模式在多次运行和不同并行度下输出一致"""
+    print("\n🧪 测试可复现输出...")
+    
+    sources = {
+        "main.js": "function main() { return helper(1) + 2; }\n",
+        "lib/helper.js": "function helper(x) { var secret = 'abc'; return x * secret.length; }\n",
+        "lib/copy/helper.js": "function helper(x) { var secret = 'abc'; return x * secret.length; }\n",
+        "background.js": "chrome.runtime.onMessage.addListener(function (m) { console.log(m); });\n",
+    }
+    
+    def read_tree(root):
+        return {rel_path: (root / rel_path).read_bytes() for rel_path in sources}
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            for rel_path, js_code in sources.items():
+                (input_dir / rel_path).parent.mkdir(parents=True, exist_ok=True)
+                (input_dir / rel_path).write_text(js_code, encoding='utf-8')
+            
+            results = []
+            for run, workers in enumerate([1, 4, 4]):
+                output_dir = Path(temp_dir) / f"output_{run}"
+                obfuscator = JSObfuscator(settings={"reproducible": True, "seedSalt": "test", "workers": workers})
+                obfuscator.obfuscate_directory(input_dir, output_dir)
+                results.append(read_tree(output_dir))
+            
+            other_salt_dir = Path(temp_dir) / "output_salt"
+            JSObfuscator(settings={"reproducible": True, "seedSalt": "other"}).obfuscate_directory(input_dir, other_salt_dir)
+            other_salt = read_tree(other_salt_dir)
+        
+        if results[0] == results[1] == results[2]:
+            print("✅ 多次运行、不同并行度的输出逐字节一致")
+        else:
+            changed = [rel_path for rel_path in sources if len({result[rel_path] for result in results}) > 1]
+            print(f"❌ 输出不一致: {changed}")
+        
+        if other_salt["main.js"] != results[0]["main.js"]:
+            print("✅ 更换seedSalt后输出随之改变")
+        else:
+            print("⚠️  更换seedSalt后输出未改变")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_metrics_export():
+    """测试JSONL和Prometheus指标导出"""
+    print("\n🧪 测试指标导出...")
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            (input_dir / "lib").mkdir(parents=True)
+            (input_dir / "main.js").write_text("function main() { return 1; }\n", encoding='utf-8')
+            (input_dir / "lib" / "jquery.min.js").write_text("var a=1;", encoding='utf-8')
+            metrics_file = Path(temp_dir) / "metrics.jsonl"
+            prometheus_file = Path(temp_dir) / "metrics.prom"
+            
+            obfuscator = JSObfuscator(settings={"metricsFile": str(metrics_file), "prometheusFile": str(prometheus_file)})
+            obfuscator.obfuscate_directory(input_dir, Path(temp_dir) / "output")
+            
+            records = [json.loads(line) for line in metrics_file.read_text(encoding='utf-8').splitlines()]
+            statuses = {record["path"]: record["status"] for record in records}
+            main_record = next(record for record in records if record["path"] == "main.js")
+            prometheus_text = prometheus_file.read_text(encoding='utf-8')
+        
+        print(f"📊 记录: {statuses}")
+        if statuses == {"main.js": "ok", "lib/jquery.min.js": "passthrough"} and main_record["output_bytes"]:
+            print("✅ JSONL记录正确")
+        else:
+            print("⚠️  JSONL记录与预期不符")
+        
+        if 'js_obfuscator_files{status="ok"} 1' in prometheus_text:
+            print("✅ Prometheus指标正确")
+        else:
+            print("⚠️  Prometheus指标与预期不符")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_archive():
+    """测试直接混淆zip归档"""
+    print("\n🧪 测试zip归档混淆...")
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_archive = Path(temp_dir) / "extension.zip"
+            output_archive = Path(temp_dir) / "extension-obfuscated.zip"
+            icon_data = bytes(range(256)) * 16
+            with zipfile.ZipFile(input_archive, 'w', zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr("manifest.json", '{"manifest_version": 3}')
+                archive.writestr("js/popup.js", "function testFunction() { return 1; }\n")
+                archive.writestr("js/vendor.min.js", "var a=1;" * 400)
+                archive.writestr(zipfile.ZipInfo("icons/icon.png"), icon_data)
+            
+            obfuscator = JSObfuscator()
+            success_js, total_js, copied, _ = obfuscator.obfuscate_archive(input_archive, output_archive)
+            
+            with zipfile.ZipFile(input_archive) as source, zipfile.ZipFile(output_archive) as target:
+                names = target.namelist()
+                popup = target.read("js/popup.js").decode('utf-8')
+                unchanged = all(target.read(name) == source.read(name)
+                                for name in ["manifest.json", "js/vendor.min.js", "icons/icon.png"])
+                bad_entry = target.testzip()
+        
+        print(f"📊 成功: {success_js}/{total_js}，原样复制: {copied}")
+        if names == ["manifest.json", "js/popup.js", "js/vendor.min.js", "icons/icon.png"] and bad_entry is None:
+            print("✅ 条目顺序和数据完整")
+        else:
+            print(f"⚠️  归档条目与预期不符: {names}，损坏条目: {bad_entry}")
+        
+        if success_js == total_js == 1 and "testFunction" not in popup and unchanged:
+            print("✅ JS条目已混淆，其余条目原样保留")
+        else:
+            print("⚠️  归档混淆结果与预期不符")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_archive_streaming():
+    """测试归档条目逐个读入，在途的JS条目不超过并行任务数的两倍"""
+    print("\n🧪 测试归档流式混淆...")
+    
+    original_submit = JSObfuscator._submit_archive_entry
+    original_writestr = zipfile.ZipFile.writestr
+    counts = {"submitted": 0, "written": 0, "peak": 0}
+    
+    def submit(self, *args):
+        counts["submitted"] += 1
+        counts["peak"] = max(counts["peak"], counts["submitted"] - counts["written"])
+        return original_submit(self, *args)
+    
+    def writestr(self, *args, **kwargs):
+        counts["written"] += 1
+        return original_writestr(self, *args, **kwargs)
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_archive = Path(temp_dir) / "bundle.zip"
+            output_archive = Path(temp_dir) / "bundle-obfuscated.zip"
+            with zipfile.ZipFile(input_archive, 'w', zipfile.ZIP_DEFLATED) as archive:
+                for i in range(8):
+                    archive.writestr(f"js/module{i}.js", f"function module{i}() {{ return {i}; }}\n")
+            
+            JSObfuscator._submit_archive_entry = submit
+            zipfile.ZipFile.writestr = writestr
+            try:
+                obfuscator = JSObfuscator(settings={"workers": 1})
+                success_js, total_js, _, _ = obfuscator.obfuscate_archive(input_archive, output_archive)
+            finally:
+                JSObfuscator._submit_archive_entry = original_submit
+                zipfile.ZipFile.writestr = original_writestr
+            
+            with zipfile.ZipFile(output_archive) as target:
+                names = target.namelist()
+        
+        print(f"📊 成功: {success_js}/{total_js}，在途JS条目峰值: {counts['peak']}")
+        if success_js == total_js == 8 and names == [f"js/module{i}.js" for i in range(8)] and counts["peak"] <= 2:
+            print("✅ 在途条目数受限，条目按原顺序写入")
+        else:
+            print("⚠️  归档条目没有按窗口逐个处理")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_archive_raw_copy():
+    """测试原样复制zip条目（依赖zipfile内部属性，升级Python时需通过）"""
+    print("\n🧪 测试zip条目原样复制...")
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source_archive = Path(temp_dir) / "source.zip"
+            target_archive = Path(temp_dir) / "target.zip"
+            contents = {
+                "deflated.txt": b"deflated " * 1000,
+                "stored.bin": bytes(range(256)),
+                "streamed.txt": b"streamed " * 1000,
+            }
+            with open(source_archive, 'wb') as raw:
+                # 写入不可定位的流时zipfile使用数据描述符，复制时需要改写本地文件头
+                class Unseekable(io.RawIOBase):
+                    def writable(self):
+                        return True
+                    def write(self, data):
+                        return raw.write(data)
+                
+                with zipfile.ZipFile(Unseekable(), 'w') as archive:
+                    archive.writestr("deflated.txt", contents["deflated.txt"], zipfile.ZIP_DEFLATED)
+                    archive.writestr("stored.bin", contents["stored.bin"], zipfile.ZIP_STORED)
+                    with archive.open("streamed.txt", 'w') as entry:
+                        entry.write(contents["streamed.txt"])
+            
+            with zipfile.ZipFile(source_archive) as source, zipfile.ZipFile(target_archive, 'w') as target:
+                descriptors = [info.filename for info in source.infolist() if info.flag_bits & 0x08]
+                for info in source.infolist():
+                    js_obfuscator._copy_zip_entry_raw(source, target, info)
+                target.writestr("added.txt", b"added")
+            
+            with zipfile.ZipFile(target_archive) as target:
+                bad_entry = target.testzip()
+                copied = {name: target.read(name) for name in contents}
+                names = target.namelist()
+        
+        print(f"📊 使用数据描述符的条目: {descriptors}，损坏条目: {bad_entry}")
+        if bad_entry is None and copied == contents and names == list(contents) + ["added.txt"] and descriptors:
+            print("✅ 原样复制的条目通过testzip校验")
+        else:
+            print(f"⚠️  原样复制的归档与预期不符: {names}")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_extension_manifest():
+    """测试按manifest.json确定扩展中JS文件的角色"""
+    print("\n🧪 测试浏览器扩展模式...")
+    
+    manifest = {
+        "manifest_version": 3,
+        "background": {"service_worker": "sw.js"},
+        "content_scripts": [{"matches": ["<all_urls>"], "js": ["content.js"]}],
+        "action": {"default_popup": "popup.html"},
+        "web_accessible_resources": [{"resources": ["inject/*.js"], "matches": ["<all_urls>"]}],
+    }
+    files = {
+        "manifest.json": json.dumps(manifest),
+        "sw.js": "importScripts('lib/util.js');\nfunction onMessage() { return 1; }\n",
+        "lib/util.js": "function util() { return 2; }\n",
+        "content.js": "function content() { return 3; }\n",
+        "popup.html": '<html><body><script src="popup.js"></script></body></html>',
+        "popup.js": "function popup() { return 4; }\n",
+        "inject/page.js": "function page() { return 5; }\n",
+        "dead.js": "function dead() { return 6; }\n",
+    }
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            output_dir = Path(temp_dir) / "output"
+            for name, content in files.items():
+                (input_dir / name).parent.mkdir(parents=True, exist_ok=True)
+                (input_dir / name).write_text(content, encoding='utf-8')
+            
+            obfuscator = JSObfuscator(config_file="obfuscator_config.ini", settings={
+                "extensionMode": True, "unreferencedJs": "skip", "contentScriptSection": "MINIMAL"})
+            success_js, total_js, _, _ = obfuscator.obfuscate_directory(input_dir, output_dir)
+            
+            profiles = {record["path"]: record["profile"] for record in obfuscator.run_report["files"]}
+            dead_skipped = not (output_dir / "dead.js").exists()
+        
+        print(f"📊 成功: {success_js}/{total_js}，配置: {profiles}")
+        expected = {
+            "sw.js": "DEFAULT+background",
+            "lib/util.js": "DEFAULT+background",
+            "content.js": "MINIMAL+content",
+            "popup.js": "DEFAULT+page",
+            "inject/page.js": "DEFAULT+web_accessible",
+            "dead.js": "unreferenced",
+        }
+        if profiles == expected and success_js == total_js == 5:
+            print("✅ 按manifest选择了各JS文件的配置")
+        else:
+            print("⚠️  扩展模式的配置与预期不符")
+        
+        if dead_skipped and obfuscator.run_report["unreferenced"] == ["dead.js"]:
+            print("✅ 未引用的JS文件已跳过")
+        else:
+            print("⚠️  未引用文件的处理与预期不符")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_result_cache():
+    """测试本地和远程结果缓存"""
+    print("\n🧪 测试结果缓存...")
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            input_dir.mkdir()
+            for i in range(3):
+                (input_dir / f"module{i}.js").write_text(f"// module {i}\nfunction module{i}() {{ return {i}; }}\n",
+                                                         encoding='utf-8')
+            
+            server = create_server(Path(temp_dir) / "server", port=0, quiet=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            cache_url = f"http://127.0.0.1:{server.server_address[1]}"
+            
+            def run(runner, cache_url, **extra):
+                settings = {"reproducible": True, "cacheDir": str(Path(temp_dir) / runner), "cacheUrl": cache_url}
+                obfuscator = JSObfuscator(settings=dict(settings, **extra))
+                output_dir = Path(temp_dir) / f"output-{runner}"
+                obfuscator.obfuscate_directory(input_dir, output_dir)
+                caches = sorted(record["cache"] for record in obfuscator.run_report["files"])
+                outputs = [(output_dir / f"module{i}.js").read_text(encoding='utf-8') for i in range(3)]
+                run.unused_prefetches = len(obfuscator._cache._prefetched)
+                return caches, outputs
+            
+            try:
+                first, first_outputs = run("runner1", cache_url)
+                remote, remote_outputs = run("runner2", cache_url)
+                local, _ = run("runner2", cache_url)
+                # 去掉注释和空白时，提前查询的key与混淆时的key一致，查询结果全部被使用
+                run("runner4", cache_url, stripSource=True)
+                stripped, _ = run("runner5", cache_url, stripSource=True)
+                unused_prefetches = run.unused_prefetches
+                # 远程缓存不可用时按未命中处理，照常混淆
+                offline, offline_outputs = run("runner3", "http://127.0.0.1:9")
+            finally:
+                server.shutdown()
+                server.server_close()
+        
+        print(f"📊 首次: {first}，新runner: {remote}，再次: {local}，远程不可用: {offline}")
+        if first == ["none"] * 3 and remote == ["remote"] * 3 and local == ["local"] * 3 and first_outputs == remote_outputs:
+            print("✅ 新runner命中远程缓存，之后命中本地缓存")
+        else:
+            print("⚠️  结果缓存与预期不符")
+        
+        if stripped == ["remote"] * 3 and unused_prefetches == 0:
+            print("✅ 去掉注释和空白时提前查询的远程缓存全部命中")
+        else:
+            print(f"⚠️  去掉注释和空白时提前查询与实际的缓存key不一致，{unused_prefetches} 个查询结果未被使用")
+        
+        if offline == ["none"] * 3 and offline_outputs == first_outputs:
+            print("✅ 远程缓存不可用时照常混淆")
+        else:
+            print("⚠️  远程缓存不可用时的处理与预期不符")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_output_validation():
+    """测试输出校验：语法错误和冒烟运行失败都记入汇总"""
+    print("\n🧪 测试输出校验...")
+    
+    files = {
+        "background.js": "chrome.runtime.onMessage.addListener(function (m) { return window.foo; });\n",
+        "config.js": "var cfg = {a: 1};\nif (cfg.a !== 1) { throw new Error('bad config'); }\n",
+        "dom.js": "document.getElementById('x').value.trim();\n",
+        "ok.js": "function calculateSum(a, b) { return a + b; }\ncalculateSum(1, 2);\n",
+    }
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            input_dir.mkdir()
+            for name, content in files.items():
+                (input_dir / name).write_text(content, encoding='utf-8')
+            
+            obfuscator = JSObfuscator(settings={"validate": "smoke"})
+            # 模拟background.js修复后语法损坏、config.js混淆后运行出错
+            fix_background = obfuscator._background_js_parts
+            obfuscator._background_js_parts = lambda code: fix_background(code) + ["\n}"]
+            obfuscate_js = obfuscator._obfuscate_js_parts
+            obfuscator._obfuscate_js_parts = lambda js_code, *args: [
+                part.replace("cfg.a", "cfg.b") for part in obfuscate_js(js_code, *args)]
+            obfuscator.obfuscate_directory(input_dir, Path(temp_dir) / "output")
+        
+        validation = {record["path"]: record["validation"] for record in obfuscator.run_report["files"]}
+        print(f"📊 校验结果: {validation}")
+        expected = {"background.js": "parse_failed", "config.js": "smoke_failed", "dom.js": "ok", "ok.js": "ok"}
+        if validation == expected and len(obfuscator.run_report["invalid"]) == 2:
+            print("✅ 损坏的输出已在汇总中列出")
+        else:
+            print("⚠️  校验结果与预期不符")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_variants():
+    """测试一次遍历生成多个变体"""
+    print("\n🧪 测试多变体构建...")
+    
+    config = """[DEFAULT]
+controlFlowFlattening = false
+
+[CUSTOMER_A]
+seed = 111
+domainLock = a.example.com, .a.example.com
+
+[CUSTOMER_B]
+seed = 222
+domainLock = b.example.com
+"""
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            output_dir = Path(temp_dir) / "output"
+            (input_dir / "img").mkdir(parents=True)
+            (input_dir / "app.js").write_text("function calculateSum(a, b) { return a + b; }\n", encoding='utf-8')
+            (input_dir / "img" / "logo.png").write_bytes(b"PNG")
+            config_file = Path(temp_dir) / "variants.ini"
+            config_file.write_text(config, encoding='utf-8')
+            
+            obfuscator = JSObfuscator(config_file=str(config_file))
+            summary = obfuscator.obfuscate_variants(input_dir, output_dir, ["CUSTOMER_A", "CUSTOMER_B"])
+            domain_lock = obfuscator._create_variant("CUSTOMER_A").options.get("domainLock")
+            
+            outputs = {section: (output_dir / section / "app.js").read_text(encoding='utf-8') for section in summary}
+            shared_asset = os.path.samefile(output_dir / "CUSTOMER_A" / "img" / "logo.png",
+                                            output_dir / "CUSTOMER_B" / "img" / "logo.png")
+        
+        print(f"📊 结果: {summary}，CUSTOMER_A的domainLock: {domain_lock}")
+        if summary == {"CUSTOMER_A": (1, 1), "CUSTOMER_B": (1, 1)} and outputs["CUSTOMER_A"] != outputs["CUSTOMER_B"]:
+            print("✅ 每个变体使用各自的配置生成了输出")
+        else:
+            print("⚠️  变体输出与预期不符")
+        
+        if domain_lock == ["a.example.com", ".a.example.com"]:
+            print("✅ section中的domainLock已加载")
+        else:
+            print("⚠️  domainLock未加载")
+        
+        if shared_asset:
+            print("✅ 非JS文件在变体之间共享硬链接")
+        else:
+            print("⚠️  非JS文件没有共享（文件系统可能不支持硬链接）")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_path_rules():
+    """测试按路径规则为性能敏感的文件选择轻量配置"""
+    print("\n🧪 测试按路径选择配置...")
+    
+    config = """[DEFAULT]
+controlFlowFlattening = true
+deadCodeInjection = true
+
+[LIGHTWEIGHT]
+controlFlowFlattening = false
+deadCodeInjection = false
+
+[PATH_RULES]
+hot/keep_strong.js = DEFAULT
+hot/*.js = LIGHTWEIGHT
+**/Crypto*.js = LIGHTWEIGHT
+lib/*.js = LIGHTWEIGHT
+"""
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # 输入目录之外的上级目录名不参与匹配（lib/*.js不应匹配lib/input/app.js）
+            input_dir = Path(temp_dir) / "lib" / "input"
+            output_dir = Path(temp_dir) / "output"
+            for name in ("hot/render.js", "hot/keep_strong.js", "hot/deep/slow.js", "lib/CryptoCore.js", "app.js"):
+                (input_dir / name).parent.mkdir(parents=True, exist_ok=True)
+                (input_dir / name).write_text(f"function calculateSum(a, b) {{ return a + b; }} // {name}\n",
+                                              encoding='utf-8')
+            config_file = Path(temp_dir) / "rules.ini"
+            config_file.write_text(config, encoding='utf-8')
+            
+            obfuscator = JSObfuscator(config_file=str(config_file))
+            success, total, _, _ = obfuscator.obfuscate_directory(input_dir, output_dir)
+            profiles = {Path(path).relative_to(input_dir).as_posix(): profile
+                        for path, profile in obfuscator.run_report["profiles"].items()}
+            rules = {Path(path).relative_to(input_dir).as_posix(): pattern
+                     for path, pattern in obfuscator.run_report["path_rules"].items()}
+            lightweight = obfuscator.get_obfuscation_options_for_file(str(input_dir / "hot" / "render.js"), "")
+        
+        print(f"📊 结果: {success}/{total}，配置: {profiles}")
+        if (profiles == {"hot/render.js": "LIGHTWEIGHT", "hot/keep_strong.js": "DEFAULT", "hot/deep/slow.js": "DEFAULT",
+                         "lib/CryptoCore.js": "LIGHTWEIGHT", "app.js": "DEFAULT"}
+                and not lightweight["controlFlowFlattening"]):
+            print("✅ 按规则顺序为匹配的文件选择了对应section")
+        else:
+            print("⚠️  路径规则选择的配置与预期不符")
+        
+        if rules == {"hot/render.js": "hot/*.js", "hot/keep_strong.js": "hot/keep_strong.js",
+                     "lib/CryptoCore.js": "**/Crypto*.js"}:
+            print("✅ 运行汇总记录了每个文件匹配的规则")
+        else:
+            print(f"⚠️  记录的匹配规则与预期不符: {rules}")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_size_budget():
+    """测试输出体积预算和与基线的比较"""
+    print("\n🧪 测试体积预算...")
+    
+    body = "function calculateSum(a, b) { return a + b; }\n"
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            output_dir = Path(temp_dir) / "output"
+            input_dir.mkdir()
+            (input_dir / "app.js").write_text(body * 20, encoding='utf-8')
+            (input_dir / "util.js").write_text(body * 20, encoding='utf-8')
+            baseline_file = Path(temp_dir) / "baseline.jsonl"
+            
+            JSObfuscator(settings={"metricsFile": str(baseline_file)}).obfuscate_directory(input_dir, output_dir)
+            
+            # app.js变为原来的5倍，超出与基线相比的增长上限
+            (input_dir / "app.js").write_text(body * 100, encoding='utf-8')
+            obfuscator = JSObfuscator(settings={"sizeBaseline": str(baseline_file), "maxSizeGrowth": 0.2,
+                                                "maxExpansionRatio": 1000})
+            obfuscator.obfuscate_directory(input_dir, output_dir)
+            violations = obfuscator.run_report["over_budget"]
+            
+            limited = JSObfuscator(settings={"maxOutputSize": "1KB"})
+            limited.obfuscate_directory(input_dir, output_dir)
+        
+        print(f"📊 超出预算: {violations}")
+        if (any(item.startswith("app.js: 输出比基线增长") for item in violations)
+                and any(item.startswith("合计:") for item in violations)
+                and not any(item.startswith("util.js") for item in violations)):
+            print("✅ 与基线相比增长过多的文件和合计被报告")
+        else:
+            print("⚠️  与基线的比较结果与预期不符")
+        
+        if [item.split(":")[0] for item in limited.run_report["over_budget"]] == ["app.js"]:
+            print("✅ 超过单文件大小上限的文件被报告")
+        else:
+            print(f"⚠️  单文件上限检查与预期不符: {limited.run_report['over_budget']}")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_resource_limits():
+    """测试按cgroup配额确定并行任务数和低优先级模式"""
+    print("\n🧪 测试容器资源限制和低优先级模式...")
+    
+    original_root = js_obfuscator._CGROUP_ROOT
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # 模拟容器内挂载在根目录的cgroup v2：2.5个核、512MB内存
+            (Path(temp_dir) / "cpu.max").write_text("250000 100000\n")
+            (Path(temp_dir) / "memory.max").write_text("536870912\n")
+            js_obfuscator._CGROUP_ROOT = Path(temp_dir)
+            
+            cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+            cpu_limit = js_obfuscator.get_cpu_limit()
+            memory_limit = js_obfuscator.get_cgroup_memory_limit()
+            workers = JSObfuscator()._get_worker_count()
+        
+        print(f"📊 CPU: {cpu_limit}，内存上限: {memory_limit}，并行任务数: {workers}")
+        # 内存预算为512MB的75%，每个任务至少128MB，最多3个任务
+        if cpu_limit == min(cpus, 2) and memory_limit == 512 * 1024 ** 2 and workers == min(cpus, 2, 3):
+            print("✅ 并行任务数受cgroup的CPU配额和内存上限限制")
+        else:
+            print("⚠️  cgroup限制没有生效")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+    finally:
+        js_obfuscator._CGROUP_ROOT = original_root
+    
+    if sys.platform == "win32":
+        return
+    try:
+        script = "import os, js_obfuscator; print(js_obfuscator.lower_process_priority(), os.nice(0))"
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        print(f"📊 低优先级模式: {result.stdout.strip()}")
+        if result.stdout.split()[-1:] == [str(min(os.nice(0) + 10, 19))]:
+            print("✅ 进程的nice值已提高")
+        else:
+            print(f"⚠️  nice值没有变化: {result.stdout}{result.stderr}")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_byte_path():
+    """测试大文件的mmap读入、直接交给npx和分段写出"""
+    print("\n🧪 测试大文件的字节路径...")
+    
+    line = "function calculateSum(a, b) { return a + b; }\n"
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            big_file = Path(temp_dir) / "big.js"
+            big_file.write_bytes((line * 40000).encode('utf-8'))
+            crlf_file = Path(temp_dir) / "crlf.js"
+            crlf_file.write_bytes(b"var a = 1;\r\nvar b = 2;\r\n")
+            background_file = Path(temp_dir) / "background.js"
+            background_file.write_text("chrome.runtime.onMessage.addListener(function () { return window.x; });\n",
+                                       encoding='utf-8')
+            
+            source = js_obfuscator._read_source(big_file)
+            mapped = isinstance(source.data, js_obfuscator.mmap.mmap)
+            source.release()
+            with open(crlf_file, 'r', encoding='utf-8') as f:
+                same_as_text_mode = js_obfuscator._read_source(crlf_file) == f.read()
+            
+            # 原地覆盖：写出前已关闭对输入文件的映射
+            obfuscator = JSObfuscator()
+            tracemalloc.start()
+            in_place = obfuscator.obfuscate_file(str(big_file))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            output = big_file.read_text(encoding='utf-8')
+            syntax_ok = subprocess.run(["node", "--check", str(big_file)], capture_output=True).returncode == 0
+            
+            obfuscator.obfuscate_file(str(background_file))
+            background = background_file.read_text(encoding='utf-8')
+        
+        input_size = len(line) * 40000
+        print(f"📊 mmap: {mapped}，输出 {len(output)} 字节，Python侧峰值内存 {peak / input_size:.1f} 倍输入大小")
+        if mapped and same_as_text_mode:
+            print("✅ 大文件用mmap读入，含\\r的文件与文本模式读取结果相同")
+        else:
+            print("⚠️  读入结果与预期不符")
+        
+        # 函数内的参数a、b一定会被改名（顶层函数名在renameGlobals关闭时保留）
+        if (in_place and output != line * 40000 and syntax_ok
+                and not re.search(r'\(\s*a\s*,\s*b\s*\)', output)):
+            print("✅ 大文件原地混淆成功")
+        else:
+            print("⚠️  原地混淆的输出与预期不符")
+        
+        if background.startswith("\n// 浏览器扩展环境适配") and "window.x" not in background:
+            print("✅ background脚本的环境适配头和代码分段写出")
+        else:
+            print("⚠️  background脚本的输出与预期不符")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_symbol_index():
+    """测试全局符号索引：跨文件使用的全局名称保留原名，只重新分析变化的文件"""
+    print("\n🧪 测试全局符号索引...")
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            output_dir = Path(temp_dir) / "output"
+            input_dir.mkdir()
+            (input_dir / "util.js").write_text(
+                "function formatPrice(v) { return v.toFixed(2); }\nvar cacheTable = {};\n", encoding='utf-8')
+            (input_dir / "app.js").write_text(
+                "var total = formatPrice(3);\nfunction onBuy() { return total; }\n", encoding='utf-8')
+            (input_dir / "index.html").write_text('<button onclick="onBuy()">buy</button>', encoding='utf-8')
+            index_file = Path(temp_dir) / "symbols.json"
+            settings = {"globalSymbolIndex": True, "symbolIndexFile": str(index_file)}
+            
+            obfuscator = JSObfuscator(settings=settings)
+            success, total, _, _ = obfuscator.obfuscate_directory(input_dir, output_dir)
+            util_options = obfuscator.get_obfuscation_options_for_file(str(input_dir / "util.js"), "")
+            app_options = obfuscator.get_obfuscation_options_for_file(str(input_dir / "app.js"), "")
+            
+            # 第二次运行只修改了app.js
+            (input_dir / "app.js").write_text("var total = formatPrice(4);\n", encoding='utf-8')
+            index = js_obfuscator._SymbolIndex(index_file)
+            changed = index.update(input_dir, sorted(input_dir.iterdir()))
+        
+        print(f"📊 结果: {success}/{total}")
+        if (util_options["renameGlobals"] and "^formatPrice$" in util_options["reservedNames"]
+                and "^cacheTable$" not in util_options["reservedNames"]
+                and "^onBuy$" in app_options["reservedNames"] and "^total$" not in app_options["reservedNames"]):
+            print("✅ 被其他文件使用的全局名称加入了reservedNames，其余全局名称可以改名")
+        else:
+            print(f"⚠️  保留的全局名称与预期不符: {util_options['reservedNames']} {app_options['reservedNames']}")
+        
+        if changed == 1 and index.shared_globals()["util.js"] == ["formatPrice"]:
+            print("✅ 增量更新只重新分析了变化的文件")
+        else:
+            print(f"⚠️  增量更新重新分析了 {changed} 个文件")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_python_profiling():
+    """测试Python侧的cProfile和tracemalloc分析"""
+    print("\n🧪 测试Python侧性能分析...")
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_dir = Path(temp_dir) / "input"
+            input_dir.mkdir()
+            for i in range(5):
+                (input_dir / f"file{i}.js").write_text(f"function f{i}(a) {{ return a + {i}; }}\n", encoding='utf-8')
+            profile_file = Path(temp_dir) / "run.pstats"
+            trace_file = Path(temp_dir) / "memory.txt"
+            
+            obfuscator = JSObfuscator()
+            with obfuscator.python_profiling(str(profile_file), str(trace_file), interval=2):
+                obfuscator.obfuscate_directory(input_dir, Path(temp_dir) / "output")
+            
+            stats = pstats.Stats(str(profile_file))
+            profiled = {function for _, _, function in stats.stats}
+            snapshots = trace_file.read_text(encoding='utf-8').count("===") // 2
+        
+        print(f"📊 内存快照 {snapshots} 次")
+        # 工作线程中的obfuscate_file也应被分析到
+        if "obfuscate_file" in profiled and "_run_js_jobs" in profiled:
+            print("✅ pstats包含主线程和工作线程的调用")
+        else:
+            print("⚠️  pstats缺少预期的函数")
+        
+        # 开始、2个文件、4个文件、结束
+        if snapshots == 4:
+            print("✅ 按文件数间隔生成了内存快照")
+        else:
+            print("⚠️  内存快照次数与预期不符")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
+def test_split_bundle():
+    """测试按模块拆分混淆webpack打包文件"""
+    print("\n🧪 测试打包文件按模块拆分混淆...")
+    
+    words = ", ".join(f'"word{i}"' for i in range(60))
+    bundle = """(() => {
+  var __webpack_modules__ = ({
+    "./src/math.js": ((module) => {
+      module.exports = { double: (x) => x * 2, label: `math:${"ok"}` };
+    }),
+    "./src/app.js": ((module, exports, __webpack_require__) => {
+      var math = __webpack_require__("./src/math.js");
+      module.exports = function run(n) { return math.double(n) + shared + "}".replace(/}/g, ")"); };
+    }),
+    "./src/words.js": (function (module) {
+      module.exports = [%s].length;
+    })
+  });
+  var shared = 1;
+  var cache = {};
+  function __webpack_require__(id) {
+    if (cache[id]) return cache[id].exports;
+    var module = cache[id] = { exports: {} };
+    __webpack_modules__[id].call(module.exports, module, module.exports, __webpack_require__);
+    return module.exports;
+  }
+  console.log(__webpack_require__("./src/app.js")(20), __webpack_require__("./src/math.js").label,
+              __webpack_require__("./src/words.js"));
+})();
+""" % words
+    
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            input_file = Path(temp_dir) / "bundle.js"
+            output_file = Path(temp_dir) / "bundle.obf.js"
+            input_file.write_text(bundle, encoding='utf-8')
+            
+            obfuscator = JSObfuscator(settings={
+                "splitBundles": True, "splitMinSize": 0, "cacheDir": str(Path(temp_dir) / "cache")})
+            obfuscator.obfuscate_file(str(input_file), str(output_file))
+            expected = subprocess.run(["node", str(input_file)], capture_output=True, text=True).stdout
+            actual = subprocess.run(["node", str(output_file)], capture_output=True, text=True).stdout
+            
+            # 再次混淆时每个模块都命中结果缓存
+            obfuscator.obfuscate_file(str(input_file), str(output_file))
+            cached_modules = [label for label in obfuscator.run_report["cached"] if "#" in label]
+            
+            # 目录中的多个打包文件：模块任务与文件任务共用准入控制，同时运行的任务数不超过workers
+            input_dir = Path(temp_dir) / "bundles"
+            input_dir.mkdir()
+            for i in range(3):
+                (input_dir / f"bundle{i}.js").write_text(bundle.replace("var shared = 1;", f"var shared = {i};"),
+                                                         encoding='utf-8')
+            RecordingGate.gates = []
+            original_gate = js_obfuscator._MemoryGate
+            js_obfuscator._MemoryGate = RecordingGate
+            try:
+                directory_obfuscator = JSObfuscator(settings={"splitBundles": True, "splitMinSize": 0, "workers": 2})
+                success, total, _, _ = directory_obfuscator.obfuscate_directory(input_dir, Path(temp_dir) / "bundles_out")
+            finally:
+                js_obfuscator._MemoryGate = original_gate
+            gate = RecordingGate.gates[0]
+        
+        print(f"📊 原始输出: {expected.strip()}，混淆后输出: {actual.strip()}")
+        if expected and expected == actual and obfuscator.run_report["profiles"][str(input_file)].endswith("+split"):
+            print("✅ 按模块混淆后重新组装的打包文件运行结果不变")
+        else:
+            print("⚠️  按模块混淆的结果与预期不符")
+        
+        if len(cached_modules) == 3:
+            print("✅ 未变化的模块命中了结果缓存")
+        else:
+            print(f"⚠️  模块缓存命中数与预期不符: {cached_modules}")
+        
+        # 3个文件任务，以及每个文件的运行时代码和3个模块
+        if success == total == 3 and gate.reservations == 3 * 5 and gate.peak_running <= 2 and gate.running == 0:
+            print(f"✅ 拆分出的模块通过同一个准入控制运行，同时运行 {gate.peak_running} 个任务")
+        else:
+            print(f"⚠️  同时运行的任务数 {gate.peak_running} 超出了workers")
+    except Exception as e:
+        print(f"❌ 测试失败: {e}")
+
 if __name__ == "__main__":
     print("🚀 开始测试 js_obfuscator.py\n")
     
@@ -185,5 +1235,26 @@ if __name__ == "__main__":
     test_code_string()
     test_custom_options()
     test_single_file()
+    test_timeout_fallback()
+    test_directory_dedupe()
+    test_memory_budget()
+    test_classify_js_file()
+    test_precompress()
+    test_reproducible_output()
+    test_metrics_export()
+    test_archive()
+    test_archive_streaming()
+    test_archive_raw_copy()
+    test_extension_manifest()
+    test_result_cache()
+    test_output_validation()
+    test_variants()
+    test_path_rules()
+    test_size_budget()
+    test_resource_limits()
+    test_byte_path()
+    test_symbol_index()
+    test_python_profiling()
+    test_split_bundle()
     
     print("\n🎉 所有测试完成！")
\ No newline at end of file